@@ -0,0 +1,124 @@
+"""
+Synthetic data generator for settlement benchmarks.
+
+Seeds users/wallets, assets, one macro event type, events, CLOSED markets (one per
+event/asset pair) and pending bets, deterministically for a given seed.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, NamedTuple, Optional
+from sqlalchemy import insert, select, func
+from src.modules.users.models import User
+from src.modules.assets.models import Asset, AssetCategory, MacroEventType, MacroEventHistory
+from src.modules.markets.models import Market, MarketStatus, Bet, BetDirection, BetResult, Settlement
+from src.modules.wallet.models import Wallet
+from src.jobs.settlement_runner.run_settlement import resolve_outcome
+
+# Rows per executemany batch, keeps memory flat for large bet counts
+INSERT_BATCH = 10000
+
+class SeededMarket(NamedTuple):
+    id: int
+    event_id: int
+    base_price: Optional[float]
+    settlement_price: Optional[float]
+    bets: int
+
+async def _insert_batched(db, model, rows):
+    for i in range(0, len(rows), INSERT_BATCH):
+        await db.execute(insert(model), rows[i:i + INSERT_BATCH])
+
+async def seed_settlement_data(session_factory, users: int, assets: int, events: int, markets: int, bets: int,
+                               refund_ratio: float = 0.0, settled: bool = False, seed: int = 42) -> List[SeededMarket]:
+    """
+    Seeds a settlement workload into an empty database.
+    `markets` is capped at events * assets. A `refund_ratio` share of markets gets no
+    prices (and no snapshots), so settlement cancels and refunds them.
+    With `settled`, every priced market also gets its Settlement row (for the stats path).
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    markets = min(markets, events * assets)
+
+    async with session_factory() as db:
+        # 1. Users and funded wallets
+        await _insert_batched(db, User, [
+            {"id": u, "email": f"bench{u}@example.com", "hashed_password": "x"}
+            for u in range(1, users + 1)
+        ])
+        await _insert_batched(db, Wallet, [
+            {"user_id": u, "balance": Decimal("100000")} for u in range(1, users + 1)
+        ])
+
+        # 2. Assets, event type and published events
+        await _insert_batched(db, Asset, [
+            {
+                "id": a, "asset_id": f"Bench:L1:ASSET{a}", "asset_class": AssetCategory.CRYPTO,
+                "asset_subclass": "L1", "symbol": f"ASSET{a}", "name": f"Bench Asset {a}",
+                "symbol_source": "Bench", "price_type": "Spot", "settlement_source": "Manual",
+            }
+            for a in range(1, assets + 1)
+        ])
+        await db.execute(insert(MacroEventType), [
+            {"id": 1, "code": "BENCH_CPI", "name": "Bench CPI", "tolerance": 0.1}
+        ])
+        await _insert_batched(db, MacroEventHistory, [
+            {
+                "id": e, "type_id": 1, "forecast_value": 3.0,
+                "actual_value": round(rng.uniform(2.5, 3.5), 2),
+                "publish_time": now - timedelta(minutes=45, hours=e),
+            }
+            for e in range(1, events + 1)
+        ])
+
+        # 3. CLOSED markets, one per (event, asset)
+        market_rows = []
+        settlement_rows = []
+        for m_id in range(1, markets + 1):
+            event_id = (m_id - 1) // assets + 1
+            asset_id = (m_id - 1) % assets + 1
+            publish_time = now - timedelta(minutes=45, hours=event_id)
+            base_price = settlement_price = None
+            if rng.random() >= refund_ratio:
+                base_price = round(rng.uniform(10, 1000), 2)
+                settlement_price = round(base_price * (1 + rng.gauss(0, 0.01)), 2)
+            market_rows.append({
+                "id": m_id, "asset_id": asset_id, "event_id": event_id,
+                "status": MarketStatus.SETTLED if settled and base_price is not None else MarketStatus.CLOSED,
+                "close_time": publish_time - timedelta(hours=1),
+                "settle_time": publish_time + timedelta(minutes=30),
+                "base_price": base_price, "settlement_price": settlement_price,
+            })
+            if settled and base_price is not None:
+                return_pct = (settlement_price - base_price) / base_price
+                settlement_rows.append({
+                    "market_id": m_id, "return_pct": return_pct, "outcome": resolve_outcome(return_pct),
+                    "price_at_t0": base_price, "price_at_t30": settlement_price,
+                })
+        await _insert_batched(db, Market, market_rows)
+        if settlement_rows:
+            await _insert_batched(db, Settlement, settlement_rows)
+
+        # 4. Pending bets spread over markets and users
+        if markets:
+            await _insert_batched(db, Bet, [
+                {
+                    "user_id": rng.randint(1, users),
+                    "market_id": rng.randint(1, markets),
+                    "amount": float(rng.choice([10, 25, 50, 100, 250])),
+                    "direction": rng.choice([BetDirection.UP, BetDirection.DOWN]),
+                    "odds": 1.9,
+                    "result": BetResult.PENDING,
+                }
+                for _ in range(bets)
+            ])
+        await db.commit()
+
+        result = await db.execute(
+            select(Market.id, Market.event_id, Market.base_price, Market.settlement_price, func.count(Bet.id))
+            .outerjoin(Bet, Bet.market_id == Market.id)
+            .group_by(Market.id)
+            .order_by(Market.id)
+        )
+        return [SeededMarket(*row) for row in result.all()]
@@ -0,0 +1,82 @@
+"""
+Benchmark: PriceRouter latency with fake sources under failure scenarios.
+
+Each scenario registers three FakeSources (primary/secondary/tertiary) with injected
+latency, failures or a stall, then issues lookups and reports p50/p99/max latency,
+whether p99 stays within the SLO, and per-source call counts and EWMAs.
+
+Usage:
+    python -m src.benchmarks.price_router --requests 500 --hedge-delay-ms 50 --slo-ms 150
+"""
+import argparse
+import asyncio
+import json
+import time
+from src.modules.assets.models import AssetCategory
+from src.utils.price_sources import PriceRouter, FakeSource, SourceConfig
+from src.utils.stats import percentile
+
+REGISTRY = {
+    AssetCategory.CRYPTO: [SourceConfig("primary", 1), SourceConfig("secondary", 2), SourceConfig("tertiary", 3)],
+}
+
+# name -> FakeSource kwargs for (primary, secondary, tertiary)
+SCENARIOS = {
+    "healthy": ({"latency": 0.01}, {"latency": 0.015}, {"latency": 0.02}),
+    "primary_stalled": ({"stall": True}, {"latency": 0.015}, {"latency": 0.02}),
+    "primary_slow": ({"latency": 0.5}, {"latency": 0.015}, {"latency": 0.02}),
+    "primary_failing": ({"latency": 0.01, "fail_rate": 0.5}, {"latency": 0.015}, {"latency": 0.02}),
+    "primary_and_secondary_stalled": ({"stall": True}, {"stall": True}, {"latency": 0.02}),
+}
+
+async def run_scenario(name: str, requests: int, hedge_delay: float, timeout: float, slo: float) -> dict:
+    router = PriceRouter(registry=REGISTRY, hedge_delay=hedge_delay, timeout=timeout)
+    sources = [
+        FakeSource(source_name, jitter=0.002, seed=i, **kwargs)
+        for i, (source_name, kwargs) in enumerate(zip(["primary", "secondary", "tertiary"], SCENARIOS[name]))
+    ]
+    for source in sources:
+        router.register(source)
+
+    latencies = []
+    failed = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            await router.fetch("BTC", AssetCategory.CRYPTO)
+        except Exception:
+            failed += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    p99 = percentile(latencies, 0.99)
+    return {
+        "requests": requests,
+        "failed": failed,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p99": round(p99 * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "within_slo": failed == 0 and p99 <= slo,
+        "calls": {s.name: s.calls for s in sources},
+        "sources": router.stats(),
+    }
+
+async def run_benchmark(requests: int, hedge_delay: float, timeout: float, slo: float) -> dict:
+    return {
+        name: await run_scenario(name, requests, hedge_delay, timeout, slo)
+        for name in SCENARIOS
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark price source failover and hedging.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--hedge-delay-ms", type=float, default=50)
+    parser.add_argument("--timeout-ms", type=float, default=1000)
+    parser.add_argument("--slo-ms", type=float, default=150, help="p99 latency target")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_benchmark(
+        args.requests, args.hedge_delay_ms / 1000, args.timeout_ms / 1000, args.slo_ms / 1000
+    )), indent=2))
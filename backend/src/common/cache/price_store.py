@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from src.common.cache.redis_client import get_redis, redis_available, mark_redis_down
+
+logger = logging.getLogger(__name__)
+
+# One hash per symbol: {"price": ..., "ts": epoch seconds}
+PRICE_KEY = "price:{symbol}"
+# Change notifications: {"<symbol>": {"price": ..., "ts": ...}, ...}
+PRICE_CHANNEL = "prices"
+
+class PriceStore:
+    """
+    Latest price per symbol in Redis, shared by the API, the maintenance task and workers.
+    Every call degrades to a no-op / empty result while Redis is unavailable.
+    """
+    @staticmethod
+    async def publish(prices: Dict[str, Tuple[float, float]]):
+        """
+        Stores symbol -> (price, ts) and notifies subscribers with one message.
+        """
+        if not prices or not redis_available():
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for symbol, (price, ts) in prices.items():
+                pipe.hset(PRICE_KEY.format(symbol=symbol), mapping={"price": price, "ts": ts})
+            pipe.publish(PRICE_CHANNEL, json.dumps({
+                symbol: {"price": price, "ts": ts} for symbol, (price, ts) in prices.items()
+            }))
+            await pipe.execute()
+        except Exception as e:
+            mark_redis_down(e)
+
+    @staticmethod
+    async def get_many(symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, Tuple[float, float]]:
+        """
+        symbol -> (price, ts) for symbols present in Redis (and younger than `max_age` seconds).
+        """
+        symbols = list(symbols)
+        if not symbols or not redis_available():
+            return {}
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for symbol in symbols:
+                pipe.hmget(PRICE_KEY.format(symbol=symbol), "price", "ts")
+            rows = await pipe.execute()
+        except Exception as e:
+            mark_redis_down(e)
+            return {}
+
+        now = time.time()
+        prices = {}
+        for symbol, (price, ts) in zip(symbols, rows):
+            if price is None or ts is None:
+                continue
+            if max_age is not None and now - float(ts) > max_age:
+                continue
+            prices[symbol] = (float(price), float(ts))
+        return prices
+
+class PriceSubscriber:
+    """
+    In-process mirror of the latest prices, kept current through pub/sub.
+    Reads hit memory first and only go to Redis for symbols not seen yet.
+    """
+    def __init__(self):
+        self.prices: Dict[str, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def latest(self, symbols: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+        symbols = list(symbols)
+        found = {s: self.prices[s] for s in symbols if s in self.prices}
+        missing = [s for s in symbols if s not in found]
+        if missing:
+            fetched = await PriceStore.get_many(missing)
+            self.prices.update(fetched)
+            found.update(fetched)
+        return found
+
+    def _apply(self, data: str):
+        for symbol, value in json.loads(data).items():
+            current = self.prices.get(symbol)
+            # Messages can arrive out of order across publishers
+            if current is None or value["ts"] >= current[1]:
+                self.prices[symbol] = (float(value["price"]), float(value["ts"]))
+
+    async def _listen(self):
+        while True:
+            if not redis_available():
+                await asyncio.sleep(1.0)
+                continue
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(PRICE_CHANNEL)
+                # Anything cached before (re)subscribing may have been missed
+                self.prices.clear()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._apply(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                mark_redis_down(e)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Shared by the API process
+price_subscriber = PriceSubscriber()
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+import redis.asyncio as aioredis
+from src.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Clients are bound to the event loop they were created on
+_client: Optional[aioredis.Redis] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# While Redis is marked down, callers skip it instead of waiting on timeouts
+_down_until = 0.0
+
+def get_redis() -> aioredis.Redis:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = aioredis.from_url(
+            settings.redis_connection_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+        )
+        _client_loop = loop
+    return _client
+
+def set_redis(client: Optional[aioredis.Redis]):
+    """
+    Replaces the client (e.g. with fakeredis in tests). None resets to the default.
+    """
+    global _client, _client_loop, _down_until
+    _client = client
+    _client_loop = asyncio.get_running_loop() if client is not None else None
+    _down_until = 0.0
+
+def redis_available() -> bool:
+    return time.monotonic() >= _down_until
+
+def mark_redis_down(error: Exception):
+    global _down_until
+    if redis_available():
+        logger.warning(f"Redis unavailable ({error}), falling back for {settings.REDIS_RETRY_SECONDS}s")
+    _down_until = time.monotonic() + settings.REDIS_RETRY_SECONDS
@@ -0,0 +1,134 @@
+import logging
+import time
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.config.config import settings
+from src.common.locks import LoopLock
+from src.common.versioning import get_version
+from src.modules.assets.models import Asset, MacroEventType
+
+logger = logging.getLogger(__name__)
+
+# Tables whose version counters invalidate the snapshot
+REFERENCE_TABLES = (Asset.__tablename__, MacroEventType.__tablename__)
+
+class _Record:
+    """
+    Read-only copy of one row; fields are the subclass __slots__.
+    """
+    __slots__ = ()
+
+    def __init__(self, row):
+        for field in self.__slots__:
+            object.__setattr__(self, field, getattr(row, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id})"
+
+class AssetRecord(_Record):
+    # Prices are left out: they come from the price store (see listing_service.current_prices)
+    __slots__ = (
+        "id", "asset_id", "asset_class", "asset_subclass", "symbol", "name", "symbol_source",
+        "quote_currency", "price_type", "decimal_precision", "settlement_source", "trading_enabled",
+    )
+
+class EventTypeRecord(_Record):
+    __slots__ = ("id", "code", "name", "source", "frequency", "tolerance")
+
+class ReferenceData:
+    """
+    Immutable snapshot of assets and macro event types, indexed for lookups.
+    """
+    __slots__ = ("version", "loaded_at", "assets", "assets_by_asset_id", "assets_by_symbol",
+                 "event_types", "event_types_by_code")
+
+    def __init__(self, version: Optional[Tuple], assets: Iterable[AssetRecord], event_types: Iterable[EventTypeRecord]):
+        assets = sorted(assets, key=lambda a: a.id)
+        event_types = sorted(event_types, key=lambda t: t.id)
+        by_symbol = {}
+        for asset in assets:
+            # Symbols are not unique; the lowest id wins
+            by_symbol.setdefault(asset.symbol, asset)
+
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.assets: Mapping[int, AssetRecord] = MappingProxyType({a.id: a for a in assets})
+        self.assets_by_asset_id: Mapping[str, AssetRecord] = MappingProxyType({a.asset_id: a for a in assets})
+        self.assets_by_symbol: Mapping[str, AssetRecord] = MappingProxyType(by_symbol)
+        self.event_types: Mapping[int, EventTypeRecord] = MappingProxyType({t.id: t for t in event_types})
+        self.event_types_by_code: Mapping[str, EventTypeRecord] = MappingProxyType({t.code: t for t in event_types})
+
+class ReferenceDataCache:
+    """
+    Per-process cache of the reference tables.
+    The versions of the tables (Redis counters bumped on every commit that writes them)
+    are compared at most every REFERENCE_DATA_CHECK_SECONDS; the snapshot is reloaded
+    only when they moved. While Redis is unavailable the snapshot is reloaded once it
+    is older than REFERENCE_DATA_MAX_AGE_SECONDS.
+    """
+    def __init__(self, check_interval: Optional[float] = None, max_age: Optional[float] = None):
+        self.check_interval = check_interval if check_interval is not None else settings.REFERENCE_DATA_CHECK_SECONDS
+        self.max_age = max_age if max_age is not None else settings.REFERENCE_DATA_MAX_AGE_SECONDS
+        self.snapshot: Optional[ReferenceData] = None
+        self.checked_at = 0.0
+        self.stats = {"hits": 0, "version_checks": 0, "loads": 0}
+        self._lock = LoopLock()
+
+    async def _current_version(self) -> Optional[Tuple]:
+        versions = tuple([await get_version(table) for table in REFERENCE_TABLES])
+        return None if None in versions else versions
+
+    async def _load(self, db: AsyncSession, version: Optional[Tuple]) -> ReferenceData:
+        assets = (await db.execute(select(Asset))).scalars().all()
+        event_types = (await db.execute(select(MacroEventType))).scalars().all()
+        self.stats["loads"] += 1
+        logger.debug(f"Loaded reference data: {len(assets)} assets, {len(event_types)} event types")
+        return ReferenceData(version, [AssetRecord(a) for a in assets], [EventTypeRecord(t) for t in event_types])
+
+    def _fresh(self, now: float) -> bool:
+        return self.snapshot is not None and now - self.checked_at < self.check_interval
+
+    async def get(self, db: AsyncSession, asset_ids: Iterable[int] = ()) -> ReferenceData:
+        """
+        Current snapshot, reloaded through `db` if stale.
+        `asset_ids` that the snapshot does not know yet force a reload (new assets).
+        """
+        asset_ids = set(asset_ids)
+        snapshot = self.snapshot
+        if self._fresh(time.monotonic()) and asset_ids <= snapshot.assets.keys():
+            self.stats["hits"] += 1
+            return snapshot
+
+        async with self._lock:
+            # Another caller may have refreshed it meanwhile
+            snapshot = self.snapshot
+            now = time.monotonic()
+            if self._fresh(now) and asset_ids <= snapshot.assets.keys():
+                self.stats["hits"] += 1
+                return snapshot
+
+            self.stats["version_checks"] += 1
+            version = await self._current_version()
+            reload = (
+                snapshot is None
+                or not asset_ids <= snapshot.assets.keys()
+                or (version is None and now - snapshot.loaded_at >= self.max_age)
+                or (version is not None and version != snapshot.version)
+            )
+            if reload:
+                snapshot = self.snapshot = await self._load(db, version)
+            else:
+                self.stats["hits"] += 1
+            self.checked_at = now
+            return snapshot
+
+    def invalidate(self):
+        self.snapshot = None
+
+# Shared by everything in the process
+reference_data = ReferenceDataCache()
@@ -4,11 +4,23 @@ from sqlalchemy.exc import OperationalError
 from src.config.config import settings
 import logging
 from unittest.mock import AsyncMock
+from src.common.versioning import await_after_commit
 
 logger = logging.getLogger(__name__)
 
 engine = create_async_engine(settings.async_database_url, echo=True)
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+
+class CommitAwareSession(AsyncSession):
+    """
+    AsyncSession whose commit() returns only once the work started by the commit
+    hooks (version counters, cache invalidation) is done, so nothing is lost when
+    the caller's event loop ends right after.
+    """
+    async def commit(self):
+        await super().commit()
+        await await_after_commit(self.sync_session)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
 
 class Base(DeclarativeBase):
     pass
@@ -0,0 +1,26 @@
+import asyncio
+from typing import Optional
+
+class LoopLock:
+    """
+    asyncio.Lock usable from any event loop: locks bind to the loop they are first
+    awaited on, and Celery tasks and scripts may run on a fresh one, so a new lock
+    is made whenever the running loop changes.
+    """
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def __aenter__(self):
+        await self.get().acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self._lock.release()
@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Tuple
+from fastapi import HTTPException
+
+# Default and maximum page sizes of cursor-paginated listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque cursor holding the sort key of the last row of a page.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple:
+    """
+    Inverse of encode_cursor; `types` converts each value (datetime -> fromisoformat).
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(payload) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(
+            datetime.fromisoformat(value) if t is datetime else t(value)
+            for t, value in zip(types, payload)
+        )
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import logging
+from itertools import chain
+from typing import Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.common.cache.redis_client import get_redis, redis_available, mark_redis_down
+
+logger = logging.getLogger(__name__)
+
+# Change counter per table, bumped after every commit that wrote to it
+VERSION_KEY = "version:{table}"
+
+_tracked: Set[str] = set()
+# Work scheduled from commit hooks, kept referenced until done
+_pending: Set[asyncio.Task] = set()
+
+def run_in_background(coro, session: Optional[Session] = None):
+    """
+    Runs a coroutine from a (sync) session hook; commits of AsyncSession run inside
+    the event loop's thread. With `session`, the task is also attached to it so the
+    session's async commit() waits for it (see await_after_commit).
+    """
+    task = asyncio.get_running_loop().create_task(coro)
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    if session is not None:
+        session.info.setdefault("after_commit_tasks", []).append(task)
+    return task
+
+async def await_after_commit(session: Session):
+    """
+    Waits for the work the commit hooks of `session` started (version bumps, cache
+    invalidation), so it is done before commit() returns.
+    """
+    tasks = session.info.pop("after_commit_tasks", None)
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def drain_background():
+    """
+    Waits for every hook task still running, e.g. before an event loop closes.
+    """
+    while _pending:
+        await asyncio.gather(*list(_pending), return_exceptions=True)
+
+def track_table_changes(*tables: str):
+    """
+    Bumps the version of `tables` after each commit that wrote to them, through the
+    ORM or through insert/update/delete statements run on a Session. A statement
+    run with execution_options(track_changes=False) does not count as a change.
+    """
+    _tracked.update(tables)
+
+async def get_version(table: str) -> Optional[int]:
+    """
+    Current change counter of a table; None while Redis is unavailable.
+    """
+    if not redis_available():
+        return None
+    try:
+        value = await get_redis().get(VERSION_KEY.format(table=table))
+    except Exception as e:
+        mark_redis_down(e)
+        return None
+    return int(value or 0)
+
+async def bump_version(*tables: str):
+    if not tables or not redis_available():
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for table in tables:
+            pipe.incr(VERSION_KEY.format(table=table))
+        await pipe.execute()
+    except Exception as e:
+        mark_redis_down(e)
+
+def weak_etag(table: str, version: int, *parts) -> str:
+    """
+    Weak ETag of one view (e.g. a filtered page) of a table at a version.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+    return f'W/"{table}-{version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison against an If-None-Match header.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(",")}
+
+def _mark_changed(session: Session, table: str):
+    if table in _tracked:
+        session.info.setdefault("changed_tables", set()).add(table)
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        _mark_changed(session, getattr(obj, "__tablename__", None))
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if not orm_execute_state.execution_options.get("track_changes", True):
+        return
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark_changed(orm_execute_state.session, table.name)
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        run_in_background(bump_version(*tables), session)
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_tables", None)
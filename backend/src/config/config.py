@@ -34,6 +34,63 @@ class Settings(BaseSettings):
             return self.REDIS_URL
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/0"
 
+    REDIS_TIMEOUT_SECONDS: float = 0.5
+    REDIS_RETRY_SECONDS: float = 5.0
+
+    # Settlement
+    SETTLEMENT_BULK_PAYOUT: bool = False
+    SETTLEMENT_WORKERS: int = 4
+    SETTLEMENT_PROCESSES: int = 1
+    SETTLEMENT_CHUNK_SIZE: int = 5000
+    # Retries of a market whose settlement was a deadlock victim
+    SETTLEMENT_RETRIES: int = 3
+    # A market dispatched for settlement is re-dispatched if still SETTLING after this
+    SETTLEMENT_LEASE_SECONDS: int = 600
+
+    # Market generation and lifecycle
+    MARKET_HORIZON_HOURS: int = 48
+    # Full event x asset reconcile behind the incremental scan
+    MARKET_RECONCILE_SECONDS: int = 3600
+    # Ids are only trusted as a watermark this long after they were seen: serial ids
+    # can commit out of order, so lower ids stay in the incremental scan meanwhile
+    MARKET_WATERMARK_LAG_SECONDS: int = 60
+    # Deadline scheduler reloads close/T0/settle deadlines this often
+    LIFECYCLE_REFRESH_SECONDS: float = 30.0
+    # Backoff of a failed (or unpriced) transition: doubles from the first value up to the second
+    LIFECYCLE_RETRY_SECONDS: float = 2.0
+    LIFECYCLE_RETRY_MAX_SECONDS: float = 60.0
+    # Polling beat kept as a safety net behind the deadline scheduler
+    MARKET_MAINTENANCE_SECONDS: float = 300.0
+
+    # Price lookups
+    PRICE_CACHE_TTL_SECONDS: float = 1.0
+    PRICE_FETCH_CONCURRENCY: int = 16
+    PRICE_HEDGE_DELAY_MS: int = 200
+    PRICE_FETCH_TIMEOUT_MS: int = 2000
+    # Latest prices in Redis younger than this are used instead of an upstream fetch
+    PRICE_STORE_MAX_AGE_SECONDS: float = 5.0
+    PRICE_WRITE_BEHIND_SECONDS: float = 15.0
+
+    # Reference data (assets, event types) cache
+    REFERENCE_DATA_CHECK_SECONDS: float = 1.0
+    # Reload age while the Redis version counters are unavailable
+    REFERENCE_DATA_MAX_AGE_SECONDS: float = 60.0
+    # Asset detail stats blobs in Redis; dropped when settlement updates the stats
+    ASSET_DETAIL_TTL_SECONDS: int = 300
+    # Asset listing change24h / nextEvent, cached per process
+    ASSET_LIST_TTL_SECONDS: float = 5.0
+    # Calendar pages in Redis; keys move with the events / event types change counters
+    CALENDAR_TTL_SECONDS: int = 300
+    # Default calendar window starts this far back, floored to a bucket shared by all requests
+    CALENDAR_LOOKBACK_HOURS: int = 24
+    CALENDAR_BUCKET_SECONDS: int = 3600
+
+    # Price ingestion
+    PRICE_INGEST_QUEUE_SIZE: int = 50000
+    PRICE_INGEST_BATCH_SIZE: int = 2000
+    PRICE_INGEST_FLUSH_INTERVAL: float = 0.5
+    PRICE_INGEST_WRITERS: int = 2
+
     SECRET_KEY: str = "DEVELOPMENT_SECRET_KEY_CHANGE_IN_PRODUCTION"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
 
@@ -0,0 +1,22 @@
+from celery import Celery
+from src.config.config import settings
+
+celery_app = Celery(
+    "macropredict",
+    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0",
+    include=["src.jobs.scheduler", "src.jobs.settlement_runner.worker"],
+)
+
+celery_app.conf.beat_schedule = {
+    'market-maintenance-safety-net': {
+        'task': 'src.jobs.scheduler.run_market_maintenance',
+        'schedule': settings.MARKET_MAINTENANCE_SECONDS,
+    },
+    'price-write-behind': {
+        'task': 'src.jobs.scheduler.write_behind_prices',
+        'schedule': settings.PRICE_WRITE_BEHIND_SECONDS,
+    },
+}
+
+# Per-process event loop and connection pool for async tasks
+from src.jobs import runtime  # noqa: E402,F401
@@ -0,0 +1,255 @@
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy import case, func
+from src.common.database.database import engine, CommitAwareSession
+from src.config.config import settings
+from src.modules.markets.manager import MarketManager
+from src.modules.markets.models import Market, MarketStatus
+from src.modules.assets.models import MacroEventHistory
+from src.jobs.market_generator import generate_markets
+from src.utils.stats import percentile
+from src.jobs.settlement_runner.worker import process_settlement
+from src.utils.data_fetcher import DataFetcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+# Transition kinds, in the order they happen for one event
+CLOSE = "close"  # close_time (T-1h): OPEN -> CLOSED
+T0 = "t0"  # publish_time: capture base_price
+SETTLE = "settle"  # settle_time (T+30m): fetch T30 and dispatch settlement
+
+# Skew samples kept per kind for percentiles
+SKEW_SAMPLES = 10000
+
+class Deadline(NamedTuple):
+    when: datetime
+    kind: str
+    event_id: int
+
+class SkewStats:
+    """
+    Scheduling skew (deadline -> transition started) per transition kind.
+    """
+    def __init__(self):
+        self.skews: Dict[str, deque] = {kind: deque(maxlen=SKEW_SAMPLES) for kind in (CLOSE, T0, SETTLE)}
+        self.fired = {kind: 0 for kind in (CLOSE, T0, SETTLE)}
+        self.failed = {kind: 0 for kind in (CLOSE, T0, SETTLE)}
+
+    def record(self, kind: str, skew: float):
+        self.fired[kind] += 1
+        self.skews[kind].append(skew)
+
+    def to_dict(self) -> dict:
+        result = {}
+        for kind, samples in self.skews.items():
+            skews = sorted(samples)
+            result[kind] = {
+                "fired": self.fired[kind],
+                "failed": self.failed[kind],
+                "skew_ms": {
+                    "p50": round(percentile(skews, 0.50) * 1000, 2),
+                    "p99": round(percentile(skews, 0.99) * 1000, 2),
+                    "max": round(skews[-1] * 1000, 2) if skews else 0.0,
+                },
+            }
+        return result
+
+class LifecycleScheduler:
+    """
+    Fires market transitions at their deadlines instead of on a polling beat.
+    Close, T0 and settle deadlines of events with unsettled markets sit in a heap;
+    the loop sleeps until the earliest one, then runs the matching MarketManager step
+    for that event only. Deadlines are reloaded from the DB every
+    LIFECYCLE_REFRESH_SECONDS, right after an incremental market generation.
+    A deadline already past at load time fires immediately. A transition that fails,
+    or leaves markets without a price, is retried with exponential backoff
+    (LIFECYCLE_RETRY_SECONDS doubling up to LIFECYCLE_RETRY_MAX_SECONDS).
+    `clock` returns the current naive UTC time (injectable for tests).
+    """
+    def __init__(self, price_fetcher=DataFetcher, dispatch_settlement_task=process_settlement,
+                 refresh_interval: Optional[float] = None, clock: Callable[[], datetime] = datetime.utcnow):
+        self.price_fetcher = price_fetcher
+        self.dispatch_settlement_task = dispatch_settlement_task
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.LIFECYCLE_REFRESH_SECONDS
+        self.clock = clock
+        # (fire at, deadline); retried deadlines fire later than their `when`
+        self.heap: List[Tuple[datetime, Deadline]] = []
+        # Deadlines fired successfully (or in flight)
+        self.fired: Set[Deadline] = set()
+        # Deadlines waiting for a retry: deadline -> (attempts so far, retry at)
+        self.retries: Dict[Deadline, Tuple[int, datetime]] = {}
+        self.stats = SkewStats()
+        self._wake = asyncio.Event()
+        self._running: Set[asyncio.Task] = set()
+
+    def _push(self, fire_at: datetime, deadline: Deadline):
+        heapq.heappush(self.heap, (fire_at, deadline))
+        self._wake.set()
+
+    def _retry_later(self, deadline: Deadline):
+        attempts = self.retries.get(deadline, (0, None))[0] + 1
+        delay = min(settings.LIFECYCLE_RETRY_SECONDS * 2 ** (attempts - 1), settings.LIFECYCLE_RETRY_MAX_SECONDS)
+        retry_at = self.clock() + timedelta(seconds=delay)
+        self.retries[deadline] = (attempts, retry_at)
+        self.fired.discard(deadline)
+        self._push(retry_at, deadline)
+        logger.warning(f"Lifecycle {deadline.kind} for event {deadline.event_id} retried in {delay:.1f}s (attempt {attempts})")
+
+    async def load_deadlines(self) -> List[Deadline]:
+        """
+        Close / T0 / settle deadlines of every event that still has OPEN or CLOSED markets.
+        Settle deadlines wait for the event's actual value; once it arrives a past
+        settle_time fires on the next load.
+        """
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(
+                    Market.event_id,
+                    MacroEventHistory.publish_time,
+                    MacroEventHistory.actual_value,
+                    func.min(Market.close_time),
+                    func.min(Market.settle_time),
+                    func.count(case((Market.status == MarketStatus.OPEN, 1))),
+                    func.count(case((Market.base_price == None, 1)))
+                )
+                .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+                .where(Market.status.in_([MarketStatus.OPEN, MarketStatus.CLOSED]))
+                .group_by(Market.event_id, MacroEventHistory.publish_time, MacroEventHistory.actual_value)
+            )
+            rows = result.all()
+
+        deadlines = []
+        for event_id, publish_time, actual_value, close_time, settle_time, open_count, unpriced in rows:
+            if open_count:
+                deadlines.append(Deadline(close_time.replace(tzinfo=None), CLOSE, event_id))
+            if unpriced:
+                deadlines.append(Deadline(publish_time.replace(tzinfo=None), T0, event_id))
+            if actual_value is not None:
+                deadlines.append(Deadline(settle_time.replace(tzinfo=None), SETTLE, event_id))
+        return deadlines
+
+    async def refresh(self):
+        deadlines = await self.load_deadlines()
+        # Forget fired and retried deadlines that are no longer outstanding
+        outstanding = set(deadlines)
+        self.fired &= outstanding
+        self.retries = {d: retry for d, retry in self.retries.items() if d in outstanding}
+        self.heap = [
+            (self.retries[d][1] if d in self.retries else d.when, d)
+            for d in deadlines if d not in self.fired
+        ]
+        heapq.heapify(self.heap)
+        logger.debug(f"Loaded {len(self.heap)} lifecycle deadlines")
+
+    async def _fire(self, deadline: Deadline):
+        if deadline not in self.retries:
+            # Skew of the first attempt only; retries are late on purpose
+            self.stats.record(deadline.kind, (self.clock() - deadline.when).total_seconds())
+        async with SessionLocal() as db:
+            try:
+                unpriced = 0
+                if deadline.kind == CLOSE:
+                    await MarketManager.close_expired_markets(db, event_ids=[deadline.event_id])
+                elif deadline.kind == T0:
+                    unpriced = await MarketManager.capture_t0_prices(db, self.price_fetcher, event_ids=[deadline.event_id])
+                else:
+                    unpriced = await MarketManager.trigger_eligible_settlements(
+                        db, self.price_fetcher, self.dispatch_settlement_task, event_ids=[deadline.event_id]
+                    )
+            except Exception as e:
+                await db.rollback()
+                self.stats.failed[deadline.kind] += 1
+                logger.error(f"Lifecycle {deadline.kind} for event {deadline.event_id} failed: {e}")
+                self._retry_later(deadline)
+                return
+
+        if unpriced:
+            logger.warning(f"Lifecycle {deadline.kind} for event {deadline.event_id} left {unpriced} markets without a price")
+            self._retry_later(deadline)
+        else:
+            self.retries.pop(deadline, None)
+
+    def _fire_due(self, now: datetime):
+        while self.heap and self.heap[0][0] <= now:
+            _, deadline = heapq.heappop(self.heap)
+            if deadline in self.fired:
+                continue
+            self.fired.add(deadline)
+            # Each transition runs on its own, so a slow T0 fetch does not hold up a close
+            task = asyncio.create_task(self._fire(deadline))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _refresh_markets(self):
+        await generate_markets()
+        await self.refresh()
+
+    async def run(self):
+        """
+        Runs until cancelled.
+        """
+        await self._refresh_markets()
+        next_refresh = asyncio.get_running_loop().time() + self.refresh_interval
+        try:
+            while True:
+                loop = asyncio.get_running_loop()
+                if loop.time() >= next_refresh:
+                    try:
+                        await self._refresh_markets()
+                    except Exception as e:
+                        logger.error(f"Lifecycle refresh failed: {e}")
+                    next_refresh = loop.time() + self.refresh_interval
+                    logger.info(f"Lifecycle stats: {json.dumps(self.stats.to_dict())}")
+
+                self._fire_due(self.clock())
+
+                # Sleep until the next deadline, the next refresh, or a wake-up
+                timeout = next_refresh - loop.time()
+                if self.heap:
+                    timeout = min(timeout, (self.heap[0][0] - self.clock()).total_seconds())
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in self._running:
+                task.cancel()
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+async def run_lifecycle_scheduler(duration: Optional[float] = None) -> dict:
+    """
+    Runs the deadline scheduler until cancelled (or for `duration` seconds).
+    Returns the skew stats.
+    """
+    scheduler = LifecycleScheduler()
+    runner = asyncio.create_task(scheduler.run())
+    try:
+        if duration is None:
+            await runner
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    stats = scheduler.stats.to_dict()
+    logger.info(f"Lifecycle scheduler finished: {json.dumps(stats)}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fire market close / T0 / settle transitions at their deadlines.")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_lifecycle_scheduler(duration=args.duration)), indent=2))
@@ -1,89 +1,188 @@
+import argparse
 import asyncio
 import logging
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import and_, exists
-from src.common.database.database import engine
-from src.modules.markets.models import Market, MarketStatus
+from sqlalchemy import and_, or_, exists, case, literal, true, func, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.common.database.database import engine, CommitAwareSession
+from src.config.config import settings
+from src.modules.markets.models import Market, MarketStatus, MarketGenerationState
 from src.modules.assets.models import Asset, MacroEventHistory
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
 
-async def generate_markets():
+def _shift(column, delta: timedelta, dialect: str):
+    """
+    column + delta, evaluated in SQL.
+    """
+    if dialect == "sqlite":
+        return func.datetime(column, f"{int(delta.total_seconds()):+d} seconds", type_=DateTime)
+    return column + delta
+
+def _pairs(event_filter, asset_filter, now: datetime, dialect: str):
+    """
+    (event, asset) pairs without a market, as Market insert rows.
+    """
+    # close_time = T-1h, settle_time = T+30m
+    close_time = _shift(MacroEventHistory.publish_time, -timedelta(hours=1), dialect)
+    settle_time = _shift(MacroEventHistory.publish_time, timedelta(minutes=30), dialect)
+
+    # If now is already past close_time, status should be CLOSED
+    return (
+        select(
+            Asset.id,
+            MacroEventHistory.id,
+            case(
+                (close_time <= now, literal(MarketStatus.CLOSED, Market.status.type)),
+                else_=literal(MarketStatus.OPEN, Market.status.type)
+            ),
+            close_time,
+            settle_time
+        )
+        .select_from(MacroEventHistory)
+        .join(Asset, asset_filter if asset_filter is not None else true())
+        .where(
+            and_(
+                event_filter,
+                ~exists().where(
+                    and_(
+                        Market.asset_id == Asset.id,
+                        Market.event_id == MacroEventHistory.id
+                    )
+                )
+            )
+        )
+    )
+
+async def _insert_pairs(db: AsyncSession, pairs, dialect: str) -> int:
+    # Rows created concurrently by another replica are skipped
+    insert_stmt = sqlite_insert if dialect == "sqlite" else pg_insert
+    result = await db.execute(
+        insert_stmt(Market)
+        .from_select(["asset_id", "event_id", "status", "close_time", "settle_time"], pairs)
+        .on_conflict_do_nothing(index_elements=["asset_id", "event_id"])
+    )
+    return max(result.rowcount, 0)
+
+async def _load_state(db: AsyncSession, dialect: str) -> MarketGenerationState:
+    """
+    The watermark row, locked for the rest of the transaction so replicas take turns.
+    Created first if missing; replicas racing on the first run all land on the same row.
+    """
+    insert_stmt = sqlite_insert if dialect == "sqlite" else pg_insert
+    await db.execute(
+        insert_stmt(MarketGenerationState)
+        .values(id=1, last_event_id=0, last_asset_id=0, pending_event_id=0, pending_asset_id=0)
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    result = await db.execute(
+        select(MarketGenerationState).where(MarketGenerationState.id == 1).with_for_update()
+    )
+    return result.scalar_one()
+
+def _advance(state: MarketGenerationState, max_event_id: int, max_asset_id: int, now: datetime):
+    """
+    Ids seen at least MARKET_WATERMARK_LAG_SECONDS ago become the watermarks, and the
+    current maximums start their wait. A row with a lower id that was still committing
+    when the maximum was read has that long to be picked up by an incremental scan.
+    """
+    pending_since = state.pending_since.replace(tzinfo=None) if state.pending_since else None
+    if pending_since is not None and (now - pending_since).total_seconds() < settings.MARKET_WATERMARK_LAG_SECONDS:
+        return
+    state.last_event_id = max(state.last_event_id, state.pending_event_id)
+    state.last_asset_id = max(state.last_asset_id, state.pending_asset_id)
+    state.pending_event_id = max_event_id
+    state.pending_asset_id = max_asset_id
+    state.pending_since = now
+
+async def generate_markets(full: bool = False) -> int:
     """
     Scans for MacroEventHistory that don't have associated Markets yet and creates them.
     Logic: Link all assets of a relevant category to the event if needed, 
     or simply link specific assets. For MVP, we link all assets to upcoming events.
+    Set-based: INSERT ... SELECT over event x asset pairs, minus existing markets; the
+    (asset_id, event_id) unique constraint with ON CONFLICT DO NOTHING makes concurrent
+    runs on several replicas safe. Returns the number of markets created.
+
+    Incremental: a persisted watermark (MarketGenerationState) limits a regular tick to
+    events and assets added recently plus events that entered the window, so its cost
+    follows the new rows rather than the window size. The id watermarks trail the ids
+    seen by MARKET_WATERMARK_LAG_SECONDS, so ids committed out of order are still
+    scanned. Every MARKET_RECONCILE_SECONDS (or with `full`) the whole window is
+    reconciled instead, catching anything the watermarks cannot see (ids committed
+    later than the lag, moved publish times).
     """
     async with SessionLocal() as db:
         try:
-            # 1. Find upcoming events (T-24h to T+48h for buffer)
-            # focusing on events that don't have a market yet
+            # 1. Upcoming events (T to T+48h)
             now = datetime.utcnow()
-            horizon = now + timedelta(hours=48)
-            
-            # Find all assets
-            asset_result = await db.execute(select(Asset))
-            assets = asset_result.scalars().all()
-            
-            if not assets:
-                logger.warning("No assets found to create markets for.")
-                return
-
-            event_query = (
-                select(MacroEventHistory)
-                .where(
-                    and_(
-                        MacroEventHistory.publish_time > now,
-                        MacroEventHistory.publish_time <= horizon
+            horizon = now + timedelta(hours=settings.MARKET_HORIZON_HOURS)
+            dialect = db.bind.dialect.name
+            in_window = and_(
+                MacroEventHistory.publish_time > now,
+                MacroEventHistory.publish_time <= horizon
+            )
+
+            # 2. Watermarks; the id high-water marks are read before scanning, rows
+            # committed meanwhile are picked up by the next tick
+            state = await _load_state(db, dialect)
+            max_event_id = (await db.execute(select(func.max(MacroEventHistory.id)))).scalar() or 0
+            max_asset_id = (await db.execute(select(func.max(Asset.id)))).scalar() or 0
+
+            reconciled_at = state.reconciled_at.replace(tzinfo=None) if state.reconciled_at else None
+            reconcile = (
+                full
+                or reconciled_at is None
+                or state.horizon_end is None
+                or (now - reconciled_at).total_seconds() >= settings.MARKET_RECONCILE_SECONDS
+            )
+
+            if reconcile:
+                # 3a. Full reconcile: every pair in the window
+                created_count = await _insert_pairs(db, _pairs(in_window, None, now, dialect), dialect)
+                state.reconciled_at = now
+            else:
+                # 3b. New events, and events that crossed into the window, x all assets
+                new_events = and_(
+                    in_window,
+                    or_(
+                        MacroEventHistory.id > state.last_event_id,
+                        MacroEventHistory.publish_time > state.horizon_end
                     )
                 )
-            )
-            event_result = await db.execute(event_query)
-            events = event_result.scalars().all()
-            
-            created_count = 0
-            for event in events:
-                for asset in assets:
-                    # Check if market already exists for this (asset, event)
-                    market_exists = await db.execute(
-                        select(exists().where(
-                            and_(
-                                Market.asset_id == asset.id,
-                                Market.event_id == event.id
-                            )
-                        ))
+                created_count = await _insert_pairs(db, _pairs(new_events, None, now, dialect), dialect)
+
+                # 3c. New assets x events in the window
+                if max_asset_id > state.last_asset_id:
+                    created_count += await _insert_pairs(
+                        db, _pairs(in_window, Asset.id > state.last_asset_id, now, dialect), dialect
                     )
-                    if not market_exists.scalar():
-                        # Create Market
-                        # close_time = T-1h, settle_time = T+30m
-                        market = Market(
-                            asset_id=asset.id,
-                            event_id=event.id,
-                            status=MarketStatus.OPEN, # Or UPCOMING if publish_time is far
-                            close_time=event.publish_time - timedelta(hours=1),
-                            settle_time=event.publish_time + timedelta(minutes=30)
-                        )
-                        # Adjustment: If now is already past close_time, status should be CLOSED
-                        if now >= market.close_time:
-                            market.status = MarketStatus.CLOSED
-                        
-                        db.add(market)
-                        created_count += 1
-            
+
+            # 4. Advance the watermarks (lagged) with the markets, in the same transaction
+            _advance(state, max_event_id, max_asset_id, now)
+            state.horizon_end = horizon
+            await db.commit()
+
+            mode = "full reconcile" if reconcile else "incremental"
             if created_count > 0:
-                await db.commit()
-                logger.info(f"Created {created_count} new markets.")
+                logger.info(f"Created {created_count} new markets ({mode}).")
             else:
-                logger.debug("No new markets to create.")
+                logger.debug(f"No new markets to create ({mode}).")
+            return created_count
 
         except Exception as e:
             await db.rollback()
             logger.error(f"Market generation failed: {e}")
+            return 0
 
 if __name__ == "__main__":
-    asyncio.run(generate_markets())
+    parser = argparse.ArgumentParser(description="Create markets for upcoming macro events.")
+    parser.add_argument("--full", action="store_true", help="Reconcile the whole window instead of the delta")
+    args = parser.parse_args()
+    asyncio.run(generate_markets(full=args.full))
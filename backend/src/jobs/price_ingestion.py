@@ -0,0 +1,329 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy import insert
+from src.common.database.database import engine, CommitAwareSession
+from src.config.config import settings
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, PriceSnapshot, SnapshotType
+from src.utils.data_fetcher import DataFetcher
+from src.common.cache.price_store import PriceStore
+from src.utils.stats import percentile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+# Poll interval in seconds per asset class: (normal, pre-event T-1h, settlement window T0..T30)
+# See docs/Data.md, section 2.2
+POLL_INTERVALS: Dict[AssetCategory, tuple] = {
+    AssetCategory.CRYPTO: (5.0, 1.0, 0.1),
+    AssetCategory.EQUITY: (15.0, 5.0, 1.0),
+    AssetCategory.INDEX: (15.0, 5.0, 1.0),
+    AssetCategory.FOREX: (10.0, 2.0, 0.5),
+    AssetCategory.COMMODITY: (30.0, 10.0, 1.0),
+    AssetCategory.RATES: (60.0, 30.0, 5.0),
+}
+PRE_EVENT_WINDOW = timedelta(hours=1)
+SETTLEMENT_WINDOW = timedelta(minutes=30)
+
+# Lag samples kept for percentiles
+LAG_SAMPLES = 10000
+
+class Tick(NamedTuple):
+    asset_id: int
+    price: float
+    timestamp: datetime
+
+class IngestAsset(NamedTuple):
+    id: int
+    symbol: str
+    asset_class: AssetCategory
+
+class EventCalendar:
+    """
+    Publish times around now, used to pick each asset's poll interval.
+    """
+    def __init__(self):
+        self.publish_times: List[datetime] = []
+
+    async def refresh(self):
+        now = datetime.utcnow()
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(MacroEventHistory.publish_time).where(
+                    MacroEventHistory.publish_time >= now - SETTLEMENT_WINDOW,
+                    MacroEventHistory.publish_time <= now + PRE_EVENT_WINDOW
+                )
+            )
+            self.publish_times = [t.replace(tzinfo=None) for t in result.scalars().all()]
+
+    def interval_for(self, asset_class: AssetCategory, now: datetime) -> float:
+        normal, pre_event, settlement = POLL_INTERVALS.get(asset_class, POLL_INTERVALS[AssetCategory.EQUITY])
+        interval = normal
+        for publish_time in self.publish_times:
+            if publish_time <= now <= publish_time + SETTLEMENT_WINDOW:
+                return settlement
+            if publish_time - PRE_EVENT_WINDOW <= now < publish_time:
+                interval = pre_event
+        return interval
+
+class IngestStats:
+    """
+    Throughput, ingest lag (tick timestamp -> committed) and backpressure counters.
+    """
+    def __init__(self):
+        self.received = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_rows = 0
+        self.backpressure_waits = 0
+        self.max_queue_depth = 0
+        self.lags = deque(maxlen=LAG_SAMPLES)
+        self.started_at = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        lags = sorted(self.lags)
+        return {
+            "received": self.received,
+            "written": self.written,
+            "failed_rows": self.failed_rows,
+            "flushes": self.flushes,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_sec": round(self.written / elapsed, 2) if elapsed > 0 else 0.0,
+            "backpressure_waits": self.backpressure_waits,
+            "max_queue_depth": self.max_queue_depth,
+            "lag_ms": {
+                "p50": round(percentile(lags, 0.50) * 1000, 2),
+                "p99": round(percentile(lags, 0.99) * 1000, 2),
+                "max": round(lags[-1] * 1000, 2) if lags else 0.0,
+            },
+        }
+
+class PriceIngestor:
+    """
+    Buffers ticks in a bounded queue and flushes them to price_snapshots in batches.
+    When the queue is full, `put` waits, so producers slow down instead of piling up memory.
+    """
+    def __init__(self, queue_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, writers: Optional[int] = None,
+                 symbols: Optional[Dict[int, str]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.PRICE_INGEST_QUEUE_SIZE)
+        self.batch_size = batch_size or settings.PRICE_INGEST_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.PRICE_INGEST_FLUSH_INTERVAL
+        self.writers = writers or settings.PRICE_INGEST_WRITERS
+        # asset_id -> symbol, for publishing the latest prices to the shared store
+        self.symbols = symbols or {}
+        self.stats = IngestStats()
+        self._tasks: List[asyncio.Task] = []
+
+    async def put(self, tick: Tick):
+        if self.queue.full():
+            self.stats.backpressure_waits += 1
+        await self.queue.put(tick)
+        self.stats.received += 1
+        depth = self.queue.qsize()
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+
+    async def _next_batch(self) -> List[Tick]:
+        """
+        Waits for one tick, then collects up to batch_size ticks or until flush_interval passes.
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[Tick]):
+        async with SessionLocal() as db:
+            try:
+                # One batched INSERT per flush
+                await db.execute(
+                    insert(PriceSnapshot),
+                    [
+                        {
+                            "asset_id": tick.asset_id,
+                            "timestamp": tick.timestamp,
+                            "price": tick.price,
+                            "snapshot_type": SnapshotType.TICK,
+                        }
+                        for tick in batch
+                    ]
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                self.stats.failed_rows += len(batch)
+                logger.error(f"Failed to flush {len(batch)} ticks: {str(e)}")
+                return
+
+        now = datetime.utcnow()
+        self.stats.written += len(batch)
+        self.stats.flushes += 1
+        self.stats.lags.extend((now - tick.timestamp).total_seconds() for tick in batch)
+
+        # Latest tick per asset to the shared store (later ticks overwrite earlier ones)
+        latest = {}
+        for tick in batch:
+            symbol = self.symbols.get(tick.asset_id)
+            if symbol is not None:
+                latest[symbol] = (tick.price, tick.timestamp.replace(tzinfo=timezone.utc).timestamp())
+        await PriceStore.publish(latest)
+
+    async def _writer(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._writer()) for _ in range(self.writers)]
+
+    async def stop(self):
+        """
+        Flushes everything still queued, then stops the writers.
+        """
+        await self.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+class PollingTickSource:
+    """
+    Polls each asset at its asset-class interval (faster around events).
+    """
+    def __init__(self, fetch: Callable[[str, AssetCategory], Awaitable[float]] = DataFetcher.fetch_live_price,
+                 calendar_refresh: float = 60.0):
+        self.fetch = fetch
+        self.calendar = EventCalendar()
+        self.calendar_refresh = calendar_refresh
+
+    async def _refresh_calendar(self):
+        while True:
+            try:
+                await self.calendar.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh event calendar: {str(e)}")
+            await asyncio.sleep(self.calendar_refresh)
+
+    async def _poll_asset(self, ingestor: PriceIngestor, asset: IngestAsset):
+        while True:
+            started = time.perf_counter()
+            try:
+                price = await self.fetch(asset.symbol, asset.asset_class)
+                await ingestor.put(Tick(asset.id, price, datetime.utcnow()))
+            except Exception as e:
+                logger.error(f"Failed to fetch price for {asset.symbol}: {str(e)}")
+            interval = self.calendar.interval_for(asset.asset_class, datetime.utcnow())
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    async def run(self, ingestor: PriceIngestor, assets: List[IngestAsset]):
+        await self.calendar.refresh()
+        await asyncio.gather(
+            self._refresh_calendar(),
+            *[self._poll_asset(ingestor, asset) for asset in assets]
+        )
+
+class FakeTickSource:
+    """
+    Random-walk ticks at a fixed total rate, spread round-robin over the assets.
+    Used for load tests of the ingestion path.
+    """
+    def __init__(self, rate: float, seed: int = 42):
+        self.rate = rate
+        self.rng = random.Random(seed)
+
+    async def run(self, ingestor: PriceIngestor, assets: List[IngestAsset]):
+        prices = {asset.id: 100.0 for asset in assets}
+        start = time.perf_counter()
+        produced = 0
+        i = 0
+        while True:
+            due = int((time.perf_counter() - start) * self.rate) - produced
+            now = datetime.utcnow()
+            for _ in range(due):
+                asset = assets[i % len(assets)]
+                i += 1
+                prices[asset.id] *= 1 + self.rng.gauss(0, 0.0005)
+                await ingestor.put(Tick(asset.id, round(prices[asset.id], 8), now))
+            produced += due
+            await asyncio.sleep(0.01)
+
+async def load_ingest_assets() -> List[IngestAsset]:
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(Asset.id, Asset.symbol, Asset.asset_class).where(Asset.trading_enabled == 1)
+        )
+        return [IngestAsset(*row) for row in result.all()]
+
+async def _report(ingestor: PriceIngestor, every: float):
+    while True:
+        await asyncio.sleep(every)
+        logger.info(f"Ingestion stats: {json.dumps(ingestor.stats.to_dict())}")
+
+async def run_ingestion(fake: bool = False, rate: float = 1000.0, duration: Optional[float] = None,
+                        report_every: float = 10.0) -> dict:
+    """
+    Runs the ingestion service until cancelled (or for `duration` seconds).
+    Returns the final stats.
+    """
+    assets = await load_ingest_assets()
+    if not assets:
+        logger.warning("No assets to ingest prices for.")
+        return {}
+
+    source = FakeTickSource(rate) if fake else PollingTickSource()
+    ingestor = PriceIngestor(symbols={asset.id: asset.symbol for asset in assets})
+    ingestor.start()
+    reporter = asyncio.create_task(_report(ingestor, report_every))
+    producer = asyncio.create_task(source.run(ingestor, assets))
+    logger.info(f"Ingesting prices for {len(assets)} assets ({'fake source' if fake else 'polling'})")
+
+    try:
+        if duration is None:
+            await producer
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        await ingestor.stop()
+        reporter.cancel()
+
+    stats = ingestor.stats.to_dict()
+    logger.info(f"Ingestion finished: {json.dumps(stats)}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest price ticks into price_snapshots.")
+    parser.add_argument("--fake", action="store_true", help="Use the random-walk fake source")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Fake source ticks per second")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_ingestion(fake=args.fake, rate=args.rate, duration=args.duration)), indent=2))
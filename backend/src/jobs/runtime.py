@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Dict, Optional, TypeVar
+from celery.signals import worker_process_init, worker_process_shutdown
+from sqlalchemy import event
+from src.common.database.database import engine
+from src.common.versioning import drain_background
+from src.utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Latency samples kept per task for percentiles
+LATENCY_SAMPLES = 1000
+# A summary of the stats is logged every this many tasks
+LOG_STATS_EVERY = 100
+
+class TaskStats:
+    """
+    Latency and connection pool usage of one task name in this process.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.failed = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "failed": self.failed,
+            "checkouts_per_call": round(self.checkouts / self.calls, 2) if self.calls else 0.0,
+            "new_connections": self.connects,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_events = {"checkouts": 0, "connects": 0}
+_task_stats: Dict[str, TaskStats] = {}
+_tasks_run = 0
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_events["checkouts"] += 1
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    _pool_events["connects"] += 1
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop of this process, reused by every task so the pool's connections
+    (bound to the loop they were opened on) survive between tasks.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """
+    Runs in each prefork child right after the fork.
+    """
+    global _loop
+    # Connections inherited from the parent share its sockets: forget them without
+    # closing, so this process opens its own pool on first use
+    engine.sync_engine.dispose(close=False)
+    _loop = None
+    get_loop()
+    _task_stats.clear()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        _loop.run_until_complete(drain_background())
+        _loop.run_until_complete(engine.dispose())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.error(f"Worker runtime shutdown failed: {e}")
+    finally:
+        _loop.close()
+        _loop = None
+    log_stats()
+
+def run_async(coro: Awaitable[T], name: Optional[str] = None) -> T:
+    """
+    Runs a coroutine to completion on this process's loop and records its stats.
+    Entry point for Celery tasks wrapping async code.
+    """
+    global _tasks_run
+    name = name or getattr(coro, "__qualname__", "task")
+    stats = _task_stats.setdefault(name, TaskStats())
+    checkouts, connects = _pool_events["checkouts"], _pool_events["connects"]
+    start = time.perf_counter()
+    try:
+        return get_loop().run_until_complete(coro)
+    except Exception:
+        stats.failed += 1
+        raise
+    finally:
+        # Hook work of sessions outside CommitAwareSession must not wait for the next task
+        get_loop().run_until_complete(drain_background())
+        stats.calls += 1
+        stats.latencies.append(time.perf_counter() - start)
+        stats.checkouts += _pool_events["checkouts"] - checkouts
+        stats.connects += _pool_events["connects"] - connects
+        _tasks_run += 1
+        if _tasks_run % LOG_STATS_EVERY == 0:
+            log_stats()
+
+def pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    status = {"pool": type(pool).__name__}
+    for attr in ("size", "checkedout", "overflow", "checkedin"):
+        if hasattr(pool, attr):
+            status[attr] = getattr(pool, attr)()
+    return status
+
+def runtime_stats() -> dict:
+    """
+    Per-task latency and pool checkout stats of this process, plus the pool state.
+    """
+    return {
+        "tasks": {name: stats.to_dict() for name, stats in _task_stats.items()},
+        "pool": pool_status(),
+    }
+
+def log_stats():
+    if _task_stats:
+        logger.info(f"Worker runtime stats: {json.dumps(runtime_stats())}")
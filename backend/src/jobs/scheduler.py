@@ -1,28 +1,25 @@
-from celery import Celery
-from celery.schedules import crontab
-from src.config.config import settings
 from src.modules.markets.manager import MarketManager
+from src.jobs.celery_app import celery_app
 from src.jobs.market_generator import generate_markets
+from src.jobs.runtime import run_async
 from src.utils.data_fetcher import DataFetcher
 from src.jobs.settlement_runner.worker import process_settlement
-from src.common.database.database import engine
+from src.jobs.update_prices import update_prices
+from src.common.database.database import engine, CommitAwareSession
 from sqlalchemy.ext.asyncio import async_sessionmaker
-import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-celery_app = Celery("macropredict", broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0")
-
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
 
 @celery_app.task
 def run_market_maintenance():
     """
     Scheduled task to handle market lifecycle transitions.
+    Transitions normally fire at their deadlines from lifecycle_scheduler.py; this
+    sweep runs every MARKET_MAINTENANCE_SECONDS as a safety net.
     """
-    loop = asyncio.get_event_loop()
-    
     async def _run():
         async with SessionLocal() as db:
             # 1. Generate Markets for upcoming events
@@ -41,12 +38,11 @@ def run_market_maintenance():
                 process_settlement
             )
 
-    loop.run_until_complete(_run())
+    run_async(_run(), name="run_market_maintenance")
 
-# Example configuration for beat (usually in a separate config or main entry)
-celery_app.conf.beat_schedule = {
-    'market-maintenance-every-minute': {
-        'task': 'src.jobs.scheduler.run_market_maintenance',
-        'schedule': 60.0,
-    },
-}
+@celery_app.task
+def write_behind_prices():
+    """
+    Periodic write-behind of the latest Redis prices to assets.current_price.
+    """
+    run_async(update_prices(), name="write_behind_prices")
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy import and_, or_, exists, insert
+from src.common.database.database import engine, CommitAwareSession
+from src.modules.markets.models import Market, MarketStatus, Settlement
+from src.modules.assets.models import MacroEventHistory, MacroEventType
+from src.modules.assets.price_lookup import PriceLookup
+from src.modules.assets.stats_service import classify_scenario, update_asset_stats_bulk
+from src.jobs.settlement_runner.run_settlement import (
+    resolve_outcome, settle_bets_bulk, refund_market_bets, ready_for_settlement,
+    resumable_settlement, resume_interrupted_settlements
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+async def fetch_t0_t30_prices(db: AsyncSession, asset_ids: Iterable[int], t0: datetime, t30: datetime) -> Dict[int, Tuple[Optional[float], Optional[float]]]:
+    """
+    Latest snapshot price at or before T0 and T30 for many assets, in one as-of query.
+    Returns asset_id -> (price_t0, price_t30).
+    """
+    return await PriceLookup.as_of_multi(db, asset_ids, [t0, t30])
+
+async def settle_event(event_id: int) -> dict:
+    """
+    Settles every ready market of one MacroEventHistory in a single pass.
+    The event, T0/T30 prices, settlements, payouts and stats are each handled
+    with a constant number of statements, regardless of how many markets the event has.
+    Interrupted chunked settlements of the event are resumed first.
+    """
+    await resume_interrupted_settlements(event_ids=[event_id])
+
+    async with SessionLocal() as db:
+        try:
+            # 1. Load event and its type once
+            result = await db.execute(
+                select(MacroEventHistory, MacroEventType)
+                .join(MacroEventType, MacroEventHistory.type_id == MacroEventType.id)
+                .where(MacroEventHistory.id == event_id)
+            )
+            row = result.first()
+            if not row:
+                raise Exception(f"Event {event_id} not found")
+            event, event_type = row
+
+            if event.actual_value is None:
+                raise Exception(f"Event {event_id} actual value is missing")
+
+            # 2. Lock all ready markets of the event (id order avoids deadlocks)
+            result = await db.execute(
+                select(Market)
+                .where(
+                    and_(
+                        Market.event_id == event_id,
+                        Market.status == MarketStatus.CLOSED,
+                        ~exists().where(Settlement.market_id == Market.id)
+                    )
+                )
+                .order_by(Market.id)
+                .with_for_update(of=Market)
+            )
+            markets = result.scalars().all()
+
+            if not markets:
+                logger.info(f"No markets ready for settlement for event {event_id}.")
+                return {"event_id": event_id, "settled": 0, "refunded": 0}
+
+            # 3. T0/T30 snapshot fallback for all assets in one query
+            t0 = event.publish_time
+            t30 = event.publish_time + timedelta(minutes=30)
+            missing_assets = {
+                m.asset_id for m in markets
+                if m.base_price is None or m.settlement_price is None
+            }
+            snapshot_prices = await fetch_t0_t30_prices(db, missing_assets, t0, t30)
+
+            # 4. Resolve outcomes
+            resolved = {}
+            refunded = []
+            for market in markets:
+                snap_t0, snap_t30 = snapshot_prices.get(market.asset_id, (None, None))
+                price_t0 = market.base_price if market.base_price is not None else snap_t0
+                price_t30 = market.settlement_price if market.settlement_price is not None else snap_t30
+
+                if price_t0 is None or price_t30 is None:
+                    refunded.append(market)
+                    continue
+
+                return_pct = (price_t30 - price_t0) / price_t0
+                resolved[market.id] = (market, price_t0, price_t30, return_pct, resolve_outcome(return_pct))
+
+            # 5. Insert all Settlements in one statement (Idempotency Guard)
+            settlement_ids = {}
+            if resolved:
+                result = await db.execute(
+                    insert(Settlement).returning(Settlement.market_id, Settlement.id),
+                    [
+                        {
+                            "market_id": m_id,
+                            "return_pct": return_pct,
+                            "outcome": outcome,
+                            "price_at_t0": price_t0,
+                            "price_at_t30": price_t30,
+                        }
+                        for m_id, (_, price_t0, price_t30, return_pct, outcome) in resolved.items()
+                    ]
+                )
+                settlement_ids = dict(result.all())
+
+            # 6. Settle bets and payouts for all markets at once
+            await settle_bets_bulk(db, {
+                m_id: (outcome, settlement_ids[m_id])
+                for m_id, (_, _, _, _, outcome) in resolved.items()
+            })
+
+            # Markets without prices are cancelled and refunded
+            for market in refunded:
+                logger.warning(f"Missing price snapshots for market {market.id}. Cancelling market.")
+                await refund_market_bets(db, market.id)
+                market.status = MarketStatus.SETTLED
+
+            # 7. Update Market Status
+            for market, _, price_t30, _, _ in resolved.values():
+                market.status = MarketStatus.SETTLED
+                market.settlement_price = price_t30
+
+            # 8. Update Historical Stats in bulk
+            scenario = classify_scenario(event.actual_value, event.forecast_value, event_type.tolerance)
+            await update_asset_stats_bulk(db, event_type.id, scenario, [
+                (market.asset_id, return_pct, outcome)
+                for market, _, _, return_pct, outcome in resolved.values()
+            ])
+
+            await db.commit()
+            logger.info(f"Event {event_id} settled: {len(resolved)} markets settled, {len(refunded)} refunded")
+            return {"event_id": event_id, "settled": len(resolved), "refunded": len(refunded)}
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to settle event {event_id}: {str(e)}")
+            raise
+
+async def run_event_settlement_job():
+    """
+    Job entry point: settle every event that has markets ready for settlement.
+    """
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(Market.event_id)
+            .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+            .where(or_(ready_for_settlement(), resumable_settlement()))
+            .distinct()
+        )
+        event_ids = result.scalars().all()
+
+    if not event_ids:
+        logger.info("No events ready for settlement.")
+        return
+
+    logger.info(f"Found {len(event_ids)} events ready for settlement.")
+
+    for e_id in event_ids:
+        try:
+            await settle_event(e_id)
+        except Exception:
+            # Individual event failures shouldn't stop the job
+            continue
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Settle all ready markets of an event in one pass.")
+    parser.add_argument("event_id", type=int, nargs="?", help="Event to settle (default: all ready events)")
+    args = parser.parse_args()
+    if args.event_id is None:
+        asyncio.run(run_event_settlement_job())
+    else:
+        asyncio.run(settle_event(args.event_id))
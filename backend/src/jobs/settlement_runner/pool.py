@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy.exc import DBAPIError
+from src.common.database.database import engine, CommitAwareSession
+from src.config.config import settings
+from src.modules.markets.models import Market
+from src.modules.assets.models import MacroEventHistory
+from src.jobs.settlement_runner.run_settlement import (
+    settle_locked_market, ready_for_settlement, resume_interrupted_settlements
+)
+from src.utils.stats import percentile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+# deadlock_detected, serialization_failure
+TRANSIENT_SQLSTATES = ("40P01", "40001")
+
+class SettlementRunStats:
+    """
+    Throughput and per-market latency for one settlement run.
+    """
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.failed = 0
+        self.refunded = 0
+        self.started_at = time.perf_counter()
+        self.elapsed: Optional[float] = None
+
+    def record(self, latency: float, refunded: bool = False):
+        self.latencies.append(latency)
+        if refunded:
+            self.refunded += 1
+
+    def merge(self, other: "SettlementRunStats"):
+        self.latencies.extend(other.latencies)
+        self.failed += other.failed
+        self.refunded += other.refunded
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def to_dict(self) -> dict:
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started_at
+        latencies = sorted(self.latencies)
+        return {
+            "markets_settled": len(latencies),
+            "markets_refunded": self.refunded,
+            "markets_failed": self.failed,
+            "elapsed_s": round(elapsed, 4),
+            "markets_per_sec": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+async def claim_next_market(db: AsyncSession, exclude: Sequence[int] = (), market_ids: Optional[Sequence[int]] = None) -> Optional[Market]:
+    """
+    Claims one ready market with FOR UPDATE SKIP LOCKED.
+    Markets locked by another worker or replica are skipped instead of waited on.
+    The lock is held until the caller's transaction ends.
+    """
+    query = (
+        select(Market)
+        .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+        .where(ready_for_settlement())
+        .order_by(Market.id)
+        .limit(1)
+        .with_for_update(skip_locked=True, of=Market)
+    )
+    if exclude:
+        query = query.where(Market.id.notin_(list(exclude)))
+    if market_ids is not None:
+        query = query.where(Market.id.in_(list(market_ids)))
+
+    result = await db.execute(query)
+    return result.scalars().first()
+
+def is_transient(error: Exception) -> bool:
+    """
+    Deadlock victims and serialization failures: the transaction is safe to retry.
+    """
+    if not isinstance(error, DBAPIError):
+        return False
+    orig = error.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code in TRANSIENT_SQLSTATES or "deadlock detected" in str(orig)
+
+async def _settlement_worker(worker_id: int, stats: SettlementRunStats, failed: set, retries: Counter,
+                             market_ids: Optional[Sequence[int]], bulk: Optional[bool]):
+    """
+    Claims and settles markets until none are left.
+    Each market is settled in the same transaction that claimed it; a deadlock victim
+    is re-claimed up to SETTLEMENT_RETRIES times.
+    """
+    while True:
+        async with SessionLocal() as db:
+            market = await claim_next_market(db, exclude=failed, market_ids=market_ids)
+            if market is None:
+                return
+
+            market_id = market.id
+            start = time.perf_counter()
+            try:
+                outcome = await settle_locked_market(db, market, bulk=bulk)
+                await db.commit()
+                stats.record(time.perf_counter() - start, refunded=outcome is None)
+                logger.info(f"[worker {worker_id}] Market {market_id} settled. Outcome: {outcome}")
+            except Exception as e:
+                await db.rollback()
+                if is_transient(e) and retries[market_id] < settings.SETTLEMENT_RETRIES:
+                    retries[market_id] += 1
+                    logger.warning(f"[worker {worker_id}] Market {market_id} hit a transient error, retrying: {e}")
+                    continue
+                # Don't re-claim a failing market within this run
+                failed.add(market_id)
+                stats.failed += 1
+                logger.error(f"[worker {worker_id}] Failed to settle market {market_id}: {str(e)}")
+
+async def _run_workers(workers: int, market_ids: Optional[Sequence[int]], bulk: Optional[bool]) -> SettlementRunStats:
+    stats = SettlementRunStats()
+    failed: set = set()
+    retries: Counter = Counter()
+    await asyncio.gather(*[
+        _settlement_worker(i, stats, failed, retries, market_ids, bulk) for i in range(workers)
+    ])
+    stats.finish()
+    return stats
+
+def _run_process(workers: int, market_ids: Optional[Sequence[int]], bulk: Optional[bool]) -> dict:
+    """
+    Entry point for a worker process. Returns raw stats so the parent can merge them.
+    """
+    async def _run():
+        try:
+            return await _run_workers(workers, market_ids, bulk)
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(_run())
+    return {"latencies": stats.latencies, "failed": stats.failed, "refunded": stats.refunded}
+
+async def run_settlement_pool(workers: Optional[int] = None, processes: Optional[int] = None,
+                              market_ids: Optional[Sequence[int]] = None, bulk: Optional[bool] = None) -> dict:
+    """
+    Settles all ready markets with `workers` async workers in each of `processes` processes.
+    Workers claim markets with SKIP LOCKED, so several pools (or replicas) can run at once.
+    Returns throughput and latency stats for the run.
+    """
+    workers = workers or settings.SETTLEMENT_WORKERS
+    processes = processes or settings.SETTLEMENT_PROCESSES
+
+    # Interrupted chunked settlements are not claimable (they have a Settlement row)
+    resumed = await resume_interrupted_settlements(market_ids=market_ids)
+    if resumed:
+        logger.info(f"Resumed {resumed} interrupted chunked settlements")
+
+    if processes <= 1:
+        stats = await _run_workers(workers, market_ids, bulk)
+    else:
+        stats = SettlementRunStats()
+        loop = asyncio.get_running_loop()
+        # spawn: each child builds its own engine/pool instead of inheriting sockets
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _run_process, workers, market_ids, bulk)
+                for _ in range(processes)
+            ])
+        for r in results:
+            child = SettlementRunStats()
+            child.latencies = r["latencies"]
+            child.failed = r["failed"]
+            child.refunded = r["refunded"]
+            stats.merge(child)
+        stats.finish()
+
+    summary = {"workers": workers, "processes": processes, **stats.to_dict()}
+    logger.info(f"Settlement run finished: {json.dumps(summary)}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Settle ready markets with a concurrent worker pool.")
+    parser.add_argument("--workers", type=int, default=None, help="Async workers per process")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes")
+    parser.add_argument("--bulk", action="store_true", default=None, help="Use the set-based payout path")
+    parser.add_argument("market_ids", type=int, nargs="*", help="Restrict the run to these markets")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run_settlement_pool(
+        workers=args.workers,
+        processes=args.processes,
+        market_ids=args.market_ids or None,
+        bulk=args.bulk,
+    )), indent=2))
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+from sqlalchemy import case, func
+from src.common.database.database import engine, CommitAwareSession
+from src.modules.markets.models import Market, Bet, BetResult, BetDirection
+from src.modules.assets.models import MacroEventHistory
+from src.jobs.settlement_runner.run_settlement import FLAT_THRESHOLD, ready_for_settlement
+from src.jobs.settlement_runner.event_settlement import fetch_t0_t30_prices
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+# Outcome codes used in the vectorized path
+UP, DOWN, FLAT = 1, -1, 0
+OUTCOME_NAMES = {UP: "UP", DOWN: "DOWN", FLAT: "FLAT"}
+
+def resolve_outcomes(return_pct: np.ndarray) -> np.ndarray:
+    """
+    Vectorized resolve_outcome: 1 = UP, -1 = DOWN, 0 = FLAT.
+    """
+    return np.where(return_pct > FLAT_THRESHOLD, UP, np.where(return_pct < -FLAT_THRESHOLD, DOWN, FLAT))
+
+async def _load_markets(db: AsyncSession):
+    """
+    Eligible markets with T0/T30 prices (market columns first, snapshots as fallback).
+    Missing prices come back as NaN, meaning the market would be refunded.
+    """
+    result = await db.execute(
+        select(Market.id, Market.asset_id, Market.base_price, Market.settlement_price, MacroEventHistory.publish_time)
+        .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+        .where(ready_for_settlement())
+        .order_by(Market.id)
+    )
+    rows = result.all()
+
+    # Snapshot fallback: one windowed query per publish time with missing prices
+    missing = defaultdict(set)
+    for _, asset_id, base_price, settlement_price, publish_time in rows:
+        if base_price is None or settlement_price is None:
+            missing[publish_time].add(asset_id)
+    snapshots = {}
+    for publish_time, asset_ids in missing.items():
+        prices = await fetch_t0_t30_prices(db, asset_ids, publish_time, publish_time + timedelta(minutes=30))
+        for asset_id, pair in prices.items():
+            snapshots[(publish_time, asset_id)] = pair
+
+    market_ids = np.empty(len(rows), dtype=np.int64)
+    t0 = np.full(len(rows), np.nan)
+    t30 = np.full(len(rows), np.nan)
+    for i, (m_id, asset_id, base_price, settlement_price, publish_time) in enumerate(rows):
+        snap_t0, snap_t30 = snapshots.get((publish_time, asset_id), (None, None))
+        market_ids[i] = m_id
+        price_t0 = base_price if base_price is not None else snap_t0
+        price_t30 = settlement_price if settlement_price is not None else snap_t30
+        if price_t0 is not None:
+            t0[i] = price_t0
+        if price_t30 is not None:
+            t30[i] = price_t30
+    return market_ids, t0, t30
+
+def _empty_bets():
+    empty_i, empty_f = np.empty(0, dtype=np.int64), np.empty(0)
+    return empty_i, empty_i, empty_i, empty_i, empty_f, empty_f
+
+async def _load_bets(db: AsyncSession, market_ids: np.ndarray):
+    """
+    Pending bets of the given markets as columnar arrays.
+    Bets are pre-aggregated per (market, user, direction, odds): every bet in such a
+    group wins or loses together, so the totals are exact while far fewer rows cross
+    the wire. The payout (stake * odds) is multiplied in Decimal, as settlement does.
+    """
+    direction = case((Bet.direction == BetDirection.UP, UP), else_=DOWN)
+    result = await db.execute(
+        select(
+            Bet.market_id,
+            Bet.user_id,
+            direction,
+            Bet.odds,
+            func.count(),
+            func.sum(Bet.amount)
+        )
+        .where(Bet.market_id.in_(market_ids.tolist()), Bet.result == BetResult.PENDING)
+        .group_by(Bet.market_id, Bet.user_id, direction, Bet.odds)
+    )
+    rows = result.all()
+    if not rows:
+        return _empty_bets()
+
+    bet_market, bet_user, bet_dir, bet_odds, bet_count, bet_staked = zip(*rows)
+    bet_gross = [
+        Decimal(str(staked)) * Decimal(str(odds)) for staked, odds in zip(bet_staked, bet_odds)
+    ]
+    return (
+        np.asarray(bet_market, dtype=np.int64),
+        np.asarray(bet_user, dtype=np.int64),
+        np.asarray(bet_dir, dtype=np.int64),
+        np.asarray(bet_count, dtype=np.int64),
+        np.asarray(bet_staked, dtype=np.float64),
+        np.asarray(bet_gross, dtype=np.float64),
+    )
+
+def _breakdown(mask_markets: np.ndarray, mask_bets: np.ndarray, count: np.ndarray,
+               staked: np.ndarray, liability: np.ndarray) -> dict:
+    return {
+        "markets": int(mask_markets.sum()),
+        "bets": int(count[mask_bets].sum()),
+        "staked": round(float(staked[mask_bets].sum()), 8),
+        "liability": round(float(liability[mask_bets].sum()), 8),
+    }
+
+def compute_preview(market_ids, t0, t30, bet_market, bet_user, bet_dir, bet_count, bet_staked, bet_gross,
+                    top: int = 10) -> dict:
+    """
+    Vectorized settlement of every pending bet group. Nothing is written.
+    """
+    refund = np.isnan(t0) | np.isnan(t30)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = (t30 - t0) / t0
+    outcome = resolve_outcomes(return_pct)
+
+    # market_ids is sorted, so each group's market index is a binary search away
+    idx = np.searchsorted(market_ids, bet_market)
+    bet_refund = refund[idx]
+    bet_win = ~bet_refund & (bet_dir == outcome[idx])
+
+    # Payout is amount * odds for winners; cancelled markets refund the stake
+    payout = np.where(bet_win, bet_gross, 0.0)
+    refunds = np.where(bet_refund, bet_staked, 0.0)
+    liability = payout + refunds
+
+    by_outcome = {
+        name: _breakdown(~refund & (outcome == code), ~bet_refund & (outcome[idx] == code),
+                         bet_count, bet_staked, liability)
+        for code, name in OUTCOME_NAMES.items()
+    }
+    by_outcome["REFUND"] = _breakdown(refund, bet_refund, bet_count, bet_staked, liability)
+
+    # Largest winners: aggregate payouts per user
+    top_winners = []
+    if bet_user.size:
+        users, inverse = np.unique(bet_user, return_inverse=True)
+        user_payout = np.bincount(inverse, weights=payout)
+        user_stake = np.bincount(inverse, weights=bet_staked)
+        order = np.argsort(-user_payout)[:top]
+        top_winners = [
+            {
+                "user_id": int(users[i]),
+                "payout": round(float(user_payout[i]), 8),
+                "net": round(float(user_payout[i] - user_stake[i]), 8),
+            }
+            for i in order if user_payout[i] > 0
+        ]
+
+    # Largest markets by liability
+    market_liability = np.bincount(idx, weights=liability, minlength=market_ids.size)
+    order = np.argsort(-market_liability)[:top]
+    top_markets = [
+        {
+            "market_id": int(market_ids[i]),
+            "outcome": "REFUND" if refund[i] else OUTCOME_NAMES[int(outcome[i])],
+            "liability": round(float(market_liability[i]), 8),
+        }
+        for i in order if market_liability[i] > 0
+    ]
+
+    total_staked = float(bet_staked.sum())
+    total_liability = float(liability.sum())
+    return {
+        "markets": int(market_ids.size),
+        "bets": int(bet_count.sum()),
+        "total_staked": round(total_staked, 8),
+        "payout_liability": round(float(payout.sum()), 8),
+        "refund_liability": round(float(refunds.sum()), 8),
+        "total_liability": round(total_liability, 8),
+        "house_net": round(total_staked - total_liability, 8),
+        "by_outcome": by_outcome,
+        "top_winners": top_winners,
+        "top_markets": top_markets,
+    }
+
+async def preview_settlement(top: int = 10) -> dict:
+    """
+    Read-only preview of the next settlement wave: total payout liability,
+    per-outcome split and the largest winners across all eligible markets.
+    """
+    async with SessionLocal() as db:
+        try:
+            start = time.perf_counter()
+            market_ids, t0, t30 = await _load_markets(db)
+            bets = await _load_bets(db, market_ids) if market_ids.size else _empty_bets()
+            loaded = time.perf_counter()
+
+            preview = compute_preview(market_ids, t0, t30, *bets, top=top)
+            done = time.perf_counter()
+        finally:
+            # Never write anything
+            await db.rollback()
+
+    preview["timing_ms"] = {
+        "load": round((loaded - start) * 1000, 2),
+        "compute": round((done - loaded) * 1000, 2),
+    }
+    return preview
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preview the liability of settling all eligible markets (read-only).")
+    parser.add_argument("--top", type=int, default=10, help="Number of largest winners/markets to list")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(preview_settlement(top=args.top)), indent=2))
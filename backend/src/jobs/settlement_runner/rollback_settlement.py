@@ -1,17 +1,23 @@
+import argparse
 import asyncio
+import json
 import logging
 from decimal import Decimal
+from typing import List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import delete
-from src.common.database.database import engine
+from sqlalchemy import delete, func, insert, literal
+from src.common.database.database import engine, CommitAwareSession
 from src.modules.markets.models import Market, MarketStatus, Bet, BetResult, Settlement
 from src.modules.wallet.models import Wallet, WalletLedger, TransactionType
+from src.modules.users.models import User  # registers users table for wallet FKs
+from src.modules.assets.detail_service import mark_details_stale
+from src.modules.assets.stats_service import revert_asset_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
 
 async def rollback_market_settlement(market_id: int):
     """
@@ -82,9 +88,13 @@ async def rollback_market_settlement(market_id: int):
             market.status = MarketStatus.CLOSED
             market.settlement_price = None
 
-            # 5. Remove Settlement Record (to allow re-settlement)
+            # 5. Take the outcome back out of the asset stats, then remove the
+            # Settlement Record (to allow re-settlement)
+            await revert_asset_stats(db, [market_id])
             await db.delete(settlement)
 
+            # The asset's forecast vs actual series no longer includes this market
+            mark_details_stale(db.sync_session, [market.asset_id])
             await db.commit()
             logger.info(f"Market {market_id} settlement rolled back successfully.")
 
@@ -103,11 +113,148 @@ async def rollback_and_recalculate(market_id: int):
     from src.jobs.settlement_runner.run_settlement import settle_market
     await settle_market(market_id)
 
+async def market_ids_for_event(db: AsyncSession, event_id: int) -> List[int]:
+    """
+    Settled markets of an event.
+    """
+    result = await db.execute(
+        select(Market.id)
+        .where(Market.event_id == event_id, Market.status == MarketStatus.SETTLED)
+        .order_by(Market.id)
+    )
+    return list(result.scalars().all())
+
+async def rollback_markets(market_ids: Optional[Sequence[int]] = None, event_id: Optional[int] = None) -> List[int]:
+    """
+    Undoes the settlement of many markets in a single transaction.
+    Payouts are reversed with one aggregated per-wallet UPDATE and one
+    INSERT ... SELECT of reversal ledger rows. Returns the rolled back market ids.
+    """
+    async with SessionLocal() as db:
+        try:
+            if event_id is not None:
+                market_ids = list(market_ids or []) + await market_ids_for_event(db, event_id)
+            market_ids = sorted(set(market_ids or []))
+            if not market_ids:
+                logger.warning("No markets to roll back.")
+                return []
+
+            # 1. Lock settled markets in id order and find their settlements
+            result = await db.execute(
+                select(Market.id, Settlement.id, Market.asset_id)
+                .join(Settlement, Settlement.market_id == Market.id)
+                .where(Market.id.in_(market_ids), Market.status == MarketStatus.SETTLED)
+                .order_by(Market.id)
+                .with_for_update(of=Market)
+            )
+            rows = result.all()
+            settled = {m_id: s_id for m_id, s_id, _ in rows}
+
+            skipped = [m_id for m_id in market_ids if m_id not in settled]
+            if skipped:
+                logger.warning(f"Skipping markets without a settlement record: {skipped}")
+            if not settled:
+                return []
+
+            locked_ids = list(settled)
+            settlement_refs = [f"settlement:{s_id}" for s_id in settled.values()]
+            payouts = WalletLedger.reference_id.in_(settlement_refs)
+
+            # 2. Lock affected wallets once, in user_id order
+            await db.execute(
+                select(Wallet.user_id)
+                .where(Wallet.user_id.in_(select(WalletLedger.wallet_id).where(payouts)))
+                .order_by(Wallet.user_id)
+                .with_for_update()
+            )
+
+            # 3. Reverse balances with one aggregated UPDATE ... FROM
+            totals = (
+                select(WalletLedger.wallet_id, func.sum(WalletLedger.amount).label("total"))
+                .where(payouts)
+                .group_by(WalletLedger.wallet_id)
+                .subquery()
+            )
+            result = await db.execute(
+                Wallet.__table__.update()
+                .where(Wallet.user_id == totals.c.wallet_id)
+                .values(balance=Wallet.balance - totals.c.total)
+            )
+            wallets_updated = result.rowcount
+
+            # 4. Insert all reversal ledger entries in one statement
+            result = await db.execute(
+                insert(WalletLedger).from_select(
+                    ["wallet_id", "type", "amount", "reference_id"],
+                    select(
+                        WalletLedger.wallet_id,
+                        literal(TransactionType.SETTLEMENT_REVERSAL, WalletLedger.type.type),
+                        -WalletLedger.amount,
+                        literal("reversal:") + WalletLedger.reference_id
+                    ).where(payouts)
+                )
+            )
+            reversals = result.rowcount
+
+            # 5. Reset Bets to PENDING
+            await db.execute(
+                Bet.__table__.update()
+                .where(Bet.market_id.in_(locked_ids))
+                .values(result=BetResult.PENDING)
+            )
+
+            # 6. Reset Markets to CLOSED
+            await db.execute(
+                Market.__table__.update()
+                .where(Market.id.in_(locked_ids))
+                .values(status=MarketStatus.CLOSED, settlement_price=None)
+            )
+
+            # 7. Take the outcomes back out of the asset stats, then remove the
+            # Settlement Records (to allow re-settlement)
+            await revert_asset_stats(db, locked_ids)
+            await db.execute(
+                delete(Settlement).where(Settlement.market_id.in_(locked_ids))
+            )
+
+            # Forecast vs actual series of the assets drop these markets
+            mark_details_stale(db.sync_session, {asset_id for _, _, asset_id in rows})
+            await db.commit()
+            logger.info(f"Rolled back {len(locked_ids)} markets: {reversals} payouts reversed across {wallets_updated} wallets.")
+            return locked_ids
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Batch rollback failed for markets {market_ids}: {str(e)}")
+            raise
+
+async def rollback_and_resettle(market_ids: Optional[Sequence[int]] = None, event_id: Optional[int] = None,
+                                workers: Optional[int] = None, bulk: Optional[bool] = None) -> dict:
+    """
+    Batch rollback, then re-settle the same markets through the concurrent worker pool.
+    """
+    rolled_back = await rollback_markets(market_ids=market_ids, event_id=event_id)
+    if not rolled_back:
+        return {"rolled_back": []}
+
+    from src.jobs.settlement_runner.pool import run_settlement_pool
+    stats = await run_settlement_pool(workers=workers, market_ids=rolled_back, bulk=bulk)
+    return {"rolled_back": rolled_back, "resettlement": stats}
+
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python -m src.jobs.settlement_runner.rollback_settlement <market_id>")
-        sys.exit(1)
-    
-    m_id = int(sys.argv[1])
-    asyncio.run(rollback_market_settlement(m_id))
+    parser = argparse.ArgumentParser(description="Roll back settled markets.")
+    parser.add_argument("market_ids", type=int, nargs="*", help="Markets to roll back")
+    parser.add_argument("--event-id", type=int, default=None, help="Roll back every settled market of this event")
+    parser.add_argument("--resettle", action="store_true", help="Re-settle the markets through the worker pool afterwards")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if not args.market_ids and args.event_id is None:
+        parser.error("pass market ids and/or --event-id")
+
+    if args.resettle:
+        print(json.dumps(asyncio.run(rollback_and_resettle(args.market_ids, args.event_id, args.workers)), indent=2))
+    elif args.event_id is None and len(args.market_ids) == 1:
+        asyncio.run(rollback_market_settlement(args.market_ids[0]))
+    else:
+        asyncio.run(rollback_markets(args.market_ids, args.event_id))
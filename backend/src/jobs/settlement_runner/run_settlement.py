@@ -1,28 +1,37 @@
+import argparse
 import asyncio
 import logging
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
+from typing import Dict, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import and_, exists, text
-from src.common.database.database import engine
+from sqlalchemy import and_, or_, exists, text, case, literal, false, insert, bindparam
+from src.common.database.database import engine, CommitAwareSession
+from src.config.config import settings
 from src.modules.markets.models import Market, MarketStatus, Bet, BetResult, Settlement
-from src.modules.assets.models import MacroEventHistory, PriceSnapshot, SnapshotType
+from src.modules.assets.models import MacroEventHistory, SnapshotType
+from src.modules.assets.price_lookup import PriceLookup
 from src.modules.wallet.models import Wallet, WalletLedger, TransactionType
+from src.modules.users.models import User  # registers users table for wallet FKs
 from src.modules.assets.stats_service import update_asset_stats
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
+
+# Returns within +/- this threshold resolve as FLAT
+FLAT_THRESHOLD = 0.0001
 
 def resolve_outcome(return_pct: float) -> str:
     """
     Direction resolution logic.
     """
-    if return_pct > 0.0001: # Small threshold for 'UP'
+    if return_pct > FLAT_THRESHOLD: # Small threshold for 'UP'
         return 'UP'
-    elif return_pct < -0.0001: # Small threshold for 'DOWN'
+    elif return_pct < -FLAT_THRESHOLD: # Small threshold for 'DOWN'
         return 'DOWN'
     else:
         return 'FLAT'
@@ -53,15 +62,34 @@ async def apply_wallet_payout(db: AsyncSession, user_id: int, amount: Decimal, r
     wallet.balance += amount
     logger.info(f"Payout {amount} applied to user {user_id}. Ref: {ref}")
 
+async def lock_wallets(db: AsyncSession, user_ids) -> set:
+    """
+    Locks the wallets of `user_ids` (FOR UPDATE) in user_id order, so transactions
+    settling markets with overlapping users cannot deadlock. Returns the locked ids.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return set()
+    result = await db.execute(
+        select(Wallet.user_id)
+        .where(Wallet.user_id.in_(user_ids))
+        .order_by(Wallet.user_id)
+        .with_for_update()
+    )
+    return set(result.scalars().all())
+
 async def settle_all_bets(db: AsyncSession, market_id: int, outcome: str, settlement_id: int):
     """
     Iterate and settle all bets for a market.
     """
     result = await db.execute(
-        select(Bet).where(Bet.market_id == market_id, Bet.result == BetResult.PENDING)
+        select(Bet).where(Bet.market_id == market_id, Bet.result == BetResult.PENDING).order_by(Bet.id)
     )
     bets = result.scalars().all()
 
+    # Take every wallet lock up front, in user_id order; the per-bet locks below are then re-entrant
+    await lock_wallets(db, [bet.user_id for bet in bets if bet.direction.value == outcome])
+
     for bet in bets:
         is_win = (bet.direction.value == outcome)
         
@@ -84,15 +112,104 @@ async def settle_all_bets(db: AsyncSession, market_id: int, outcome: str, settle
                 ref=f"settlement:{settlement_id}"
             )
 
+def _pending_bets(market_ids, bet_id_range: Optional[Tuple[int, int]] = None):
+    conditions = [Bet.market_id.in_(list(market_ids)), Bet.result == BetResult.PENDING]
+    if bet_id_range is not None:
+        conditions += [Bet.id > bet_id_range[0], Bet.id <= bet_id_range[1]]
+    return and_(*conditions)
+
+async def settle_bets_bulk(db: AsyncSession, outcomes: Dict[int, Tuple[str, int]],
+                           bet_id_range: Optional[Tuple[int, int]] = None):
+    """
+    Set-based settlement of all pending bets for one or more markets.
+    `outcomes` maps market_id -> (outcome, settlement_id).
+    `bet_id_range` (exclusive, inclusive] restricts the run to one chunk of bets.
+    Produces the same ledger rows and balances as settle_all_bets.
+    """
+    if not outcomes:
+        return
+
+    pending = _pending_bets(outcomes, bet_id_range)
+    win_conditions = [
+        and_(Bet.market_id == m_id, Bet.direction == outcome)
+        for m_id, (outcome, _) in outcomes.items()
+        if outcome in ('UP', 'DOWN')
+    ]
+    is_win = or_(*win_conditions) if win_conditions else false()
+
+    # 1. Fetch winning bets as plain rows (no ORM objects)
+    result = await db.execute(
+        select(Bet.id, Bet.user_id, Bet.market_id, Bet.amount, Bet.odds)
+        .where(pending, is_win)
+        .order_by(Bet.id)
+    )
+    winners = result.all()
+
+    # 2. Mark WON/LOST with a single UPDATE
+    await db.execute(
+        Bet.__table__.update()
+        .where(pending)
+        .values(result=case(
+            (is_win, literal(BetResult.WON, Bet.result.type)),
+            else_=literal(BetResult.LOST, Bet.result.type)
+        ))
+    )
+
+    # 3. Sum payouts per user, one ledger row per winning bet
+    payouts = defaultdict(Decimal)
+    ledger_rows = []
+    for bet_id, user_id, m_id, amount, odds in winners:
+        payout = Decimal(str(amount)) * Decimal(str(odds))
+        if payout <= 0:
+            continue
+        payouts[user_id] += payout
+        ledger_rows.append({
+            "wallet_id": user_id,
+            "type": TransactionType.PAYOUT,
+            "amount": payout,
+            "reference_id": f"settlement:{outcomes[m_id][1]}"
+        })
+
+    if not payouts:
+        return
+
+    # 4. Lock affected wallets once, in user_id order to avoid deadlocks
+    user_ids = sorted(payouts)
+    locked = await lock_wallets(db, user_ids)
+    missing = [u for u in user_ids if u not in locked]
+    if missing:
+        raise Exception(f"Wallet not found for user {missing[0]}")
+
+    # 5. Apply aggregated balance updates (executemany)
+    await db.execute(
+        Wallet.__table__.update()
+        .where(Wallet.user_id == bindparam("b_user_id"))
+        .values(balance=Wallet.balance + bindparam("b_amount")),
+        [{"b_user_id": u, "b_amount": payouts[u]} for u in user_ids]
+    )
+
+    # 6. Multi-row insert of ledger entries
+    await db.execute(insert(WalletLedger), ledger_rows)
+    logger.info(f"Bulk payout of {len(ledger_rows)} bets to {len(user_ids)} users for markets {list(outcomes)}")
+
+async def settle_all_bets_bulk(db: AsyncSession, market_id: int, outcome: str, settlement_id: int):
+    """
+    Bulk variant of settle_all_bets for a single market.
+    """
+    await settle_bets_bulk(db, {market_id: (outcome, settlement_id)})
+
 async def refund_market_bets(db: AsyncSession, market_id: int):
     """
     Refunds all pending bets for a cancelled market.
     """
     result = await db.execute(
-        select(Bet).where(Bet.market_id == market_id, Bet.result == BetResult.PENDING)
+        select(Bet).where(Bet.market_id == market_id, Bet.result == BetResult.PENDING).order_by(Bet.id)
     )
     bets = result.scalars().all()
 
+    # Take every wallet lock up front, in user_id order; the per-bet locks below are then re-entrant
+    await lock_wallets(db, [bet.user_id for bet in bets])
+
     for bet in bets:
         # Create refund ledger entry
         refund_amount = Decimal(str(bet.amount))
@@ -117,9 +234,149 @@ async def refund_market_bets(db: AsyncSession, market_id: int):
             bet.result = BetResult.CANCELLED
             logger.info(f"Refunded {refund_amount} to user {bet.user_id} for market {market_id}")
 
-async def settle_market(market_id: int):
+async def refund_market_bets_bulk(db: AsyncSession, market_id: int,
+                                  bet_id_range: Optional[Tuple[int, int]] = None):
+    """
+    Set-based variant of refund_market_bets.
+    Wallets are locked once in user_id order; bets of users without a wallet stay PENDING.
+    """
+    result = await db.execute(
+        select(Bet.id, Bet.user_id, Bet.amount)
+        .where(_pending_bets([market_id], bet_id_range))
+        .order_by(Bet.id)
+    )
+    bets = result.all()
+    if not bets:
+        return
+
+    locked = await lock_wallets(db, [user_id for _, user_id, _ in bets])
+
+    refunds = defaultdict(Decimal)
+    refunded_ids = []
+    ledger_rows = []
+    for bet_id, user_id, amount in bets:
+        if user_id not in locked:
+            continue
+        refund_amount = Decimal(str(amount))
+        refunds[user_id] += refund_amount
+        refunded_ids.append(bet_id)
+        ledger_rows.append({
+            "wallet_id": user_id,
+            "type": TransactionType.REFUND,
+            "amount": refund_amount,
+            "reference_id": f"refund:market:{market_id}"
+        })
+
+    if not refunded_ids:
+        return
+
+    await db.execute(
+        Bet.__table__.update()
+        .where(Bet.id.in_(refunded_ids))
+        .values(result=BetResult.CANCELLED)
+    )
+    await db.execute(
+        Wallet.__table__.update()
+        .where(Wallet.user_id == bindparam("b_user_id"))
+        .values(balance=Wallet.balance + bindparam("b_amount")),
+        [{"b_user_id": u, "b_amount": amount} for u, amount in sorted(refunds.items())]
+    )
+    await db.execute(insert(WalletLedger), ledger_rows)
+    logger.info(f"Refunded {len(refunded_ids)} bets to {len(refunds)} users for market {market_id}")
+
+async def resolve_settlement_prices(db: AsyncSession, market: Market) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Validates the market's event and returns its (T0, T30) prices.
+    Either price is None if neither the market nor the snapshots have it.
+    """
+    # 2. Fetch event data
+    result = await db.execute(
+        select(MacroEventHistory).where(MacroEventHistory.id == market.event_id)
+    )
+    event = result.scalars().first()
+
+    if not event or event.actual_value is None:
+        raise Exception(f"Event {market.event_id} actual value is missing")
+
+    # SETTLING: claimed by the lifecycle dispatch (or resumed chunked run)
+    assert market.status in (MarketStatus.CLOSED, MarketStatus.SETTLING)
+
+    # 3. Get Price Snapshots (T0 and T30)
+    # T0: event.publish_time
+    # T30: event.publish_time + 30m
+    
+    # Use market's stored prices as primary, fallback to snapshots
+    price_t0 = market.base_price
+    price_t30 = market.settlement_price
+
+    # If not in market, try PriceSnapshot table (one as-of query for both points)
+    if price_t0 is None or price_t30 is None:
+        prices = await PriceLookup.as_of_multi(
+            db, [market.asset_id], [event.publish_time, event.publish_time + timedelta(minutes=30)]
+        )
+        snap_t0, snap_t30 = prices[market.asset_id]
+        if price_t0 is None:
+            price_t0 = snap_t0
+        if price_t30 is None:
+            price_t30 = snap_t30
+
+    return price_t0, price_t30
+
+async def settle_locked_market(db: AsyncSession, market: Market, bulk: Optional[bool] = None) -> Optional[str]:
+    """
+    Settles a market the caller has already locked, inside the caller's transaction.
+    Returns the outcome, or None if the market was cancelled and refunded.
+    The caller is responsible for commit/rollback.
+    """
+    if bulk is None:
+        bulk = settings.SETTLEMENT_BULK_PAYOUT
+    settle_bets = settle_all_bets_bulk if bulk else settle_all_bets
+    refund_bets = refund_market_bets_bulk if bulk else refund_market_bets
+    market_id = market.id
+
+    price_t0, price_t30 = await resolve_settlement_prices(db, market)
+
+    if price_t0 is None or price_t30 is None:
+        logger.warning(f"Missing price snapshots for market {market_id}. Cancelling market.")
+        await refund_bets(db, market_id)
+        market.status = MarketStatus.SETTLED # Or add CANCELLED status, for now SETTLED with no log
+        return None
+
+    # 4. Resolve Outcome
+    return_pct = (price_t30 - price_t0) / price_t0
+    outcome = resolve_outcome(return_pct)
+
+    # 5. Insert Settlement (Idempotency Guard)
+    settlement = Settlement(
+        market_id=market_id,
+        return_pct=return_pct,
+        outcome=outcome,
+        price_at_t0=price_t0,
+        price_at_t30=price_t30
+    )
+    db.add(settlement)
+    await db.flush() # Get settlement.id
+
+    # 6. Settle Bets and Payout
+    await settle_bets(
+        db=db,
+        market_id=market_id,
+        outcome=outcome,
+        settlement_id=settlement.id
+    )
+
+    # 7. Update Market Status
+    market.status = MarketStatus.SETTLED
+    market.settlement_price = price_t30
+    
+    # 8. Update Historical Stats
+    await update_asset_stats(db, market_id)
+    return outcome
+
+async def settle_market(market_id: int, bulk: Optional[bool] = None):
     """
     Core settlement logic for a single market.
+    `bulk` selects the set-based payout path (defaults to SETTLEMENT_BULK_PAYOUT).
     """
     async with SessionLocal() as db:
         try:
@@ -132,109 +389,222 @@ async def settle_market(market_id: int):
             if not market:
                 raise Exception(f"Market {market_id} not found")
 
-            # 2. Fetch event data
-            result = await db.execute(
-                select(MacroEventHistory).where(MacroEventHistory.id == market.event_id)
-            )
-            event = result.scalars().first()
+            outcome = await settle_locked_market(db, market, bulk=bulk)
+            
+            await db.commit()
+            if outcome is not None:
+                logger.info(f"Market {market_id} settled successfully. Outcome: {outcome}")
 
-            if not event or event.actual_value is None:
-                raise Exception(f"Event {market.event_id} actual value is missing")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to settle market {market_id}: {str(e)}")
+            raise
 
-            assert market.status == MarketStatus.CLOSED
+async def _lock_market(db: AsyncSession, market_id: int) -> Market:
+    result = await db.execute(
+        select(Market).where(Market.id == market_id).with_for_update()
+    )
+    market = result.scalars().first()
+    if not market:
+        raise Exception(f"Market {market_id} not found")
+    return market
 
-            # 3. Get Price Snapshots (T0 and T30)
-            # T0: event.publish_time
-            # T30: event.publish_time + 30m
-            
-            # Use market's stored prices as primary, fallback to snapshots
-            price_t0 = market.base_price
-            price_t30 = market.settlement_price
-
-            # If not in market, try PriceSnapshot table
-            if price_t0 is None:
-                res_t0 = await db.execute(
-                    select(PriceSnapshot.price).where(
-                        PriceSnapshot.asset_id == market.asset_id,
-                        PriceSnapshot.timestamp <= event.publish_time
-                    ).order_by(PriceSnapshot.timestamp.desc()).limit(1)
-                )
-                price_t0 = res_t0.scalar()
-
-            if price_t30 is None:
-                res_t30 = await db.execute(
-                    select(PriceSnapshot.price).where(
-                        PriceSnapshot.asset_id == market.asset_id,
-                        PriceSnapshot.timestamp <= event.publish_time + timedelta(minutes=30)
-                    ).order_by(PriceSnapshot.timestamp.desc()).limit(1)
+async def refund_market_chunked(market_id: int, chunk_size: Optional[int] = None):
+    """
+    Refunds a cancelled market in chunks of `chunk_size` bets, committing after each chunk.
+    Refunded bets leave PENDING, so a restarted run continues where it stopped.
+    """
+    chunk_size = chunk_size or settings.SETTLEMENT_CHUNK_SIZE
+    last_id = 0
+    while True:
+        async with SessionLocal() as db:
+            try:
+                market = await _lock_market(db, market_id)
+                result = await db.execute(
+                    select(Bet.id)
+                    .where(Bet.market_id == market_id, Bet.result == BetResult.PENDING, Bet.id > last_id)
+                    .order_by(Bet.id)
+                    .limit(chunk_size)
                 )
-                price_t30 = res_t30.scalar()
+                bet_ids = result.scalars().all()
+
+                if not bet_ids:
+                    market.status = MarketStatus.SETTLED # Or add CANCELLED status, for now SETTLED with no log
+                    await db.commit()
+                    logger.info(f"Market {market_id} cancelled and refunded.")
+                    return
 
-            if price_t0 is None or price_t30 is None:
-                logger.warning(f"Missing price snapshots for market {market_id}. Cancelling market.")
-                await refund_market_bets(db, market_id)
-                market.status = MarketStatus.SETTLED # Or add CANCELLED status, for now SETTLED with no log
+                await refund_market_bets_bulk(db, market_id, bet_id_range=(last_id, bet_ids[-1]))
                 await db.commit()
-                return
+                last_id = bet_ids[-1]
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to refund market {market_id} after bet {last_id}: {str(e)}")
+                raise
 
-            # 4. Resolve Outcome
-            return_pct = (price_t30 - price_t0) / price_t0
-            outcome = resolve_outcome(return_pct)
-
-            # 5. Insert Settlement (Idempotency Guard)
-            settlement = Settlement(
-                market_id=market.id,
-                return_pct=return_pct,
-                outcome=outcome,
-                price_at_t0=price_t0,
-                price_at_t30=price_t30
-            )
-            db.add(settlement)
-            await db.flush() # Get settlement.id
+async def settle_market_chunked(market_id: int, chunk_size: Optional[int] = None):
+    """
+    Settles a market in chunks of `chunk_size` bets (keyset pagination on Bet.id).
+    Each chunk commits together with the checkpoint on its Settlement row, so memory
+    stays flat, locks are held for one chunk at a time, and a restarted run resumes
+    from the last committed checkpoint.
+    """
+    chunk_size = chunk_size or settings.SETTLEMENT_CHUNK_SIZE
 
-            # 6. Settle Bets and Payout
-            await settle_all_bets(
-                db=db,
-                market_id=market.id,
-                outcome=outcome,
-                settlement_id=settlement.id
+    # 1. Create (or pick up) the Settlement row under the market lock
+    settlement_id = None
+    async with SessionLocal() as db:
+        try:
+            market = await _lock_market(db, market_id)
+            result = await db.execute(
+                select(Settlement).where(Settlement.market_id == market_id)
             )
+            settlement = result.scalars().first()
 
-            # 7. Update Market Status
-            market.status = MarketStatus.SETTLED
-            market.settlement_price = price_t30
-            
-            # 8. Update Historical Stats
-            await update_asset_stats(db, market_id)
-            
-            await db.commit()
-            logger.info(f"Market {market_id} settled successfully. Outcome: {outcome}")
+            if settlement is not None and settlement.is_complete:
+                logger.warning(f"Market {market_id} already settled")
+                return
 
+            if settlement is not None:
+                logger.info(f"Resuming settlement of market {market_id} after bet {settlement.last_bet_id}")
+                market.status = MarketStatus.SETTLING
+            else:
+                price_t0, price_t30 = await resolve_settlement_prices(db, market)
+
+                if price_t0 is not None and price_t30 is not None:
+                    return_pct = (price_t30 - price_t0) / price_t0
+                    settlement = Settlement(
+                        market_id=market_id,
+                        return_pct=return_pct,
+                        outcome=resolve_outcome(return_pct),
+                        price_at_t0=price_t0,
+                        price_at_t30=price_t30,
+                        last_bet_id=0,
+                        is_complete=False
+                    )
+                    db.add(settlement)
+                    await db.flush()
+                    # In progress: other settlement paths leave the market alone between chunks
+                    market.status = MarketStatus.SETTLING
+
+            if settlement is not None:
+                settlement_id = settlement.id
+                outcome = settlement.outcome
+            await db.commit()
         except Exception as e:
             await db.rollback()
-            logger.error(f"Failed to settle market {market_id}: {str(e)}")
+            logger.error(f"Failed to start settlement for market {market_id}: {str(e)}")
             raise
 
-async def run_settlement_job():
+    if settlement_id is None:
+        logger.warning(f"Missing price snapshots for market {market_id}. Cancelling market.")
+        await refund_market_chunked(market_id, chunk_size)
+        return
+
+    # 2. Settle one chunk per transaction, advancing the checkpoint
+    while True:
+        async with SessionLocal() as db:
+            try:
+                # The checkpoint row lock serialises concurrent runners of the same market
+                result = await db.execute(
+                    select(Settlement).where(Settlement.id == settlement_id).with_for_update()
+                )
+                settlement = result.scalars().first()
+                if settlement.is_complete:
+                    return
+
+                checkpoint = settlement.last_bet_id
+                result = await db.execute(
+                    select(Bet.id)
+                    .where(Bet.market_id == market_id, Bet.result == BetResult.PENDING, Bet.id > checkpoint)
+                    .order_by(Bet.id)
+                    .limit(chunk_size)
+                )
+                bet_ids = result.scalars().all()
+
+                if not bet_ids:
+                    # 3. Finalize: market status, stats, completion flag
+                    market = await _lock_market(db, market_id)
+                    market.status = MarketStatus.SETTLED
+                    market.settlement_price = settlement.price_at_t30
+                    settlement.is_complete = True
+                    await update_asset_stats(db, market_id)
+                    await db.commit()
+                    logger.info(f"Market {market_id} settled successfully. Outcome: {outcome}")
+                    return
+
+                await settle_bets_bulk(
+                    db, {market_id: (outcome, settlement_id)},
+                    bet_id_range=(checkpoint, bet_ids[-1])
+                )
+                settlement.last_bet_id = bet_ids[-1]
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Failed to settle chunk of market {market_id}: {str(e)}")
+                raise
+
+def ready_for_settlement():
+    """
+    Conditions for a market to be ready for settlement (Idempotency check included):
+    1. Status is CLOSED
+    2. Event has actual_value (requires a join on MacroEventHistory)
+    3. NOT EXISTS in settlement_logs
+    """
+    return and_(
+        Market.status == MarketStatus.CLOSED,
+        MacroEventHistory.actual_value != None,
+        ~exists().where(Settlement.market_id == Market.id)
+    )
+
+def resumable_settlement():
+    """
+    Markets whose chunked settlement was interrupted: an incomplete Settlement row
+    (SETTLING; CLOSED for rows written before the status was set).
+    """
+    return and_(
+        Market.status.in_([MarketStatus.CLOSED, MarketStatus.SETTLING]),
+        exists().where(Settlement.market_id == Market.id, Settlement.is_complete == False)
+    )
+
+async def resume_interrupted_settlements(market_ids: Optional[Sequence[int]] = None,
+                                         event_ids: Optional[Sequence[int]] = None,
+                                         chunk_size: Optional[int] = None) -> int:
+    """
+    Finishes interrupted chunked settlements, optionally only of some markets / events.
+    Every runner calls this first: their ready_for_settlement scans skip markets that
+    already have a Settlement row. Returns the number of markets resumed.
+    """
+    async with SessionLocal() as db:
+        query = select(Market.id).where(resumable_settlement()).order_by(Market.id)
+        if market_ids is not None:
+            query = query.where(Market.id.in_(list(market_ids)))
+        if event_ids is not None:
+            query = query.where(Market.event_id.in_(list(event_ids)))
+        result = await db.execute(query)
+        resumable = result.scalars().all()
+
+    for m_id in resumable:
+        try:
+            await settle_market_chunked(m_id, chunk_size=chunk_size)
+        except Exception:
+            # Picked up again by the next run
+            continue
+    return len(resumable)
+
+async def run_settlement_job(bulk: Optional[bool] = None, chunked: bool = False, chunk_size: Optional[int] = None):
     """
     Job entry point: Scan ready markets and settle them.
+    Interrupted chunked settlements are resumed first, whatever the mode.
     """
+    await resume_interrupted_settlements(chunk_size=chunk_size)
+
     async with SessionLocal() as db:
-        # Find markets ready for settlement (Idempotency check included)
-        # 1. Status is CLOSED
-        # 2. Event has actual_value
-        # 3. NOT EXISTS in settlement_logs
-        
         query = (
             select(Market.id)
             .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
-            .where(
-                and_(
-                    Market.status == MarketStatus.CLOSED,
-                    MacroEventHistory.actual_value != None,
-                    ~exists().where(Settlement.market_id == Market.id)
-                )
-            )
+            .where(ready_for_settlement())
+            .order_by(Market.id)
         )
         
         result = await db.execute(query)
@@ -248,10 +618,18 @@ async def run_settlement_job():
 
         for m_id in market_ids:
             try:
-                await settle_market(m_id)
+                if chunked:
+                    await settle_market_chunked(m_id, chunk_size=chunk_size)
+                else:
+                    await settle_market(m_id, bulk=bulk)
             except Exception:
                 # Individual market failures shouldn't stop the job
                 continue
 
 if __name__ == "__main__":
-    asyncio.run(run_settlement_job())
+    parser = argparse.ArgumentParser(description="Settle all markets that are ready for settlement.")
+    parser.add_argument("--bulk", action="store_true", default=None, help="Use the set-based payout path")
+    parser.add_argument("--chunked", action="store_true", help="Settle in resumable chunks of bets")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(run_settlement_job(bulk=args.bulk, chunked=args.chunked, chunk_size=args.chunk_size))
@@ -1,12 +1,10 @@
-from src.config.config import settings
+from src.jobs.celery_app import celery_app
+from src.jobs.runtime import run_async
 from src.modules.settlement.service import SettlementService
 
-import asyncio
-
 @celery_app.task(name="app.workers.settlement.process_settlement")
 def process_settlement(market_id: int, settlement_price: float):
     """
     Background worker task to trigger settlement.
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(SettlementService.settle_market(market_id, settlement_price))
+    return run_async(SettlementService.settle_market(market_id, settlement_price), name="process_settlement")
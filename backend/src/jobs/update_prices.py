@@ -1,60 +1,76 @@
+import argparse
 import asyncio
 import logging
-from sqlalchemy import select
+from sqlalchemy import select, update, bindparam
 from src.common.database.database import engine, SessionLocal
+from src.config.config import settings
+from src.common.cache.price_store import PriceStore
 from src.modules.assets.models import Asset, AssetCategory
+from src.utils.data_fetcher import DataFetcher
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def update_prices():
+    """
+    Write-behind of the latest prices to assets.current_price.
+    Prices come from the shared Redis store; symbols missing there (or Redis being
+    down) are fetched through DataFetcher. Only changed prices are written.
+    """
     async with SessionLocal() as db:
         try:
-            # Current approximate prices as of late 2025
-            updates = {
-                # Symbol: Price
-                "BTC": 88084.01,
-                "ETH": 2975.37,
-                "SP500": 6834.50,
-                "GOLD": 4354.50,
-                "SILVER": 67.14,
-                "US10Y": 4.14,
-                # Add some others if they exist in potential seed data
-                "USCPI": 3.4, # YoY inflation assumption
-                "USUNEMP": 4.2 # Unemployment assumption
-            }
+            result = await db.execute(select(Asset.id, Asset.symbol, Asset.asset_class, Asset.current_price))
+            assets = result.all()
+            if not assets:
+                logger.warning("No assets found to update.")
+                return
 
-            result = await db.execute(select(Asset))
-            assets = result.scalars().all()
-            
-            updated_count = 0
-            for asset in assets:
-                # Flexible matching: try direct symbol match or if symbol is part of the key
-                price = updates.get(asset.symbol)
-                
-                # Special cases for mapping if symbols differ
-                if not price:
-                    if "BTC" in asset.symbol: price = updates["BTC"]
-                    elif "ETH" in asset.symbol: price = updates["ETH"]
-                    elif "SPX" in asset.symbol: price = updates["SP500"]
-                    elif "XAU" in asset.symbol: price = updates["GOLD"]
-                    elif "XAG" in asset.symbol: price = updates["SILVER"]
-                
-                if price is not None:
-                    logger.info(f"Updating {asset.symbol} from {asset.current_price} to {price}")
-                    asset.current_price = price
-                    updated_count += 1
-            
-            if updated_count > 0:
+            latest = {symbol: price for symbol, (price, _) in (await PriceStore.get_many(a.symbol for a in assets)).items()}
+            missing = [a for a in assets if a.symbol not in latest]
+            if missing:
+                latest.update(await DataFetcher.fetch_prices(
+                    [a.symbol for a in missing],
+                    {a.symbol: a.asset_class for a in missing}
+                ))
+
+            changes = [
+                {"b_id": a.id, "b_price": latest[a.symbol]}
+                for a in assets
+                if a.symbol in latest and latest[a.symbol] != a.current_price
+            ]
+            if changes:
+                # One executemany UPDATE for all changed assets. Price-only writes leave
+                # the assets version alone: nothing cached from the table holds prices
+                await db.execute(
+                    update(Asset.__table__)
+                    .where(Asset.__table__.c.id == bindparam("b_id"))
+                    .values(current_price=bindparam("b_price"))
+                    .execution_options(track_changes=False),
+                    changes
+                )
                 await db.commit()
-                logger.info(f"Successfully updated {updated_count} assets.")
-            else:
-                logger.warning("No matching assets found to update.")
+            logger.info(f"Write-behind updated {len(changes)} of {len(assets)} asset prices.")
 
         except Exception as e:
             await db.rollback()
             logger.error(f"Failed to update prices: {e}")
             raise
 
+async def run_write_behind(interval: float = None):
+    """
+    Runs update_prices every `interval` seconds until cancelled.
+    """
+    interval = interval or settings.PRICE_WRITE_BEHIND_SECONDS
+    while True:
+        try:
+            await update_prices()
+        except Exception:
+            # Keep the loop alive; the next round retries
+            pass
+        await asyncio.sleep(interval)
+
 if __name__ == "__main__":
-    asyncio.run(update_prices())
+    parser = argparse.ArgumentParser(description="Write the latest prices back to assets.current_price.")
+    parser.add_argument("--loop", action="store_true", help="Keep running every PRICE_WRITE_BEHIND_SECONDS")
+    args = parser.parse_args()
+    asyncio.run(run_write_behind() if args.loop else update_prices())
@@ -1,16 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.config.config import settings
+from src.common.cache.price_store import price_subscriber
 # Routers will be imported from modules
 from src.modules.auth.router import router as auth_router
 from src.modules.assets.router import router as assets_router
 from src.modules.bets.router import router as bets_router
+from src.modules.markets.router import router as markets_router
 from src.modules.wallet.router import router as wallet_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keeps an in-process mirror of the latest Redis prices for the API
+    price_subscriber.start()
+    try:
+        yield
+    finally:
+        await price_subscriber.stop()
+
 app = FastAPI(
     title="MacroPredict Market API",
     description="Backend for Macro-event driven prediction market system",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -33,6 +46,7 @@ app.add_middleware(
 app.include_router(auth_router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(assets_router, prefix=f"{settings.API_V1_STR}/assets", tags=["assets"])
 app.include_router(bets_router, prefix=f"{settings.API_V1_STR}/bets", tags=["bets"])
+app.include_router(markets_router, prefix=f"{settings.API_V1_STR}/markets", tags=["markets"])
 app.include_router(wallet_router, prefix=f"{settings.API_V1_STR}/wallets", tags=["wallets"])
 
 @app.get("/health")
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import exists, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+from src.config.config import settings
+from src.common.cache.redis_client import get_redis, redis_available, mark_redis_down
+from src.common.cache.reference_data import reference_data
+from src.common.pagination import encode_cursor, decode_cursor
+from src.common.versioning import get_version
+from src.modules.assets.models import MacroEventHistory, MacroEventType
+from src.modules.markets.models import Market
+
+logger = logging.getLogger(__name__)
+
+# One calendar page (JSON), keyed by the versions of the tables it was read from
+CALENDAR_KEY = "calendar:{versions}:{digest}"
+
+def default_window_start(now: datetime) -> datetime:
+    """
+    Start of the default window: CALENDAR_LOOKBACK_HOURS back, floored to a
+    CALENDAR_BUCKET_SECONDS bucket so every request in the bucket shares a cache entry.
+    """
+    epoch = datetime(1970, 1, 1)
+    seconds = (now - timedelta(hours=settings.CALENDAR_LOOKBACK_HOURS) - epoch).total_seconds()
+    return epoch + timedelta(seconds=seconds // settings.CALENDAR_BUCKET_SECONDS * settings.CALENDAR_BUCKET_SECONDS)
+
+def _previous_actual():
+    # Correlated top-1: the last known actual of the same event type, a backward
+    # range scan on (type_id, publish_time)
+    prior = aliased(MacroEventHistory)
+    return (
+        select(prior.actual_value)
+        .where(
+            prior.type_id == MacroEventHistory.type_id,
+            prior.publish_time < MacroEventHistory.publish_time,
+            prior.actual_value != None
+        )
+        .order_by(prior.publish_time.desc())
+        .limit(1)
+        .correlate(MacroEventHistory)
+        .scalar_subquery()
+    )
+
+async def query_calendar(db: AsyncSession, publish_from: datetime, publish_to: Optional[datetime],
+                         asset_id: Optional[int], type_id: Optional[int], cursor: Optional[str], limit: int) -> dict:
+    """
+    Events ordered by (publish_time, id) within [publish_from, publish_to), one page at a time.
+    `asset_id` keeps events with a market on that asset.
+    """
+    query = select(
+        MacroEventHistory.id,
+        MacroEventHistory.type_id,
+        MacroEventHistory.publish_time,
+        MacroEventHistory.forecast_value,
+        MacroEventHistory.actual_value,
+        _previous_actual()
+    ).where(MacroEventHistory.publish_time >= publish_from)
+    if publish_to is not None:
+        query = query.where(MacroEventHistory.publish_time < publish_to)
+    if type_id is not None:
+        query = query.where(MacroEventHistory.type_id == type_id)
+    if asset_id is not None:
+        query = query.where(
+            exists().where(Market.event_id == MacroEventHistory.id, Market.asset_id == asset_id)
+        )
+    if cursor:
+        publish_time, event_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(MacroEventHistory.publish_time, MacroEventHistory.id) > tuple_(publish_time, event_id)
+        )
+
+    # One extra row tells whether there is a next page
+    result = await db.execute(
+        query.order_by(MacroEventHistory.publish_time, MacroEventHistory.id).limit(limit + 1)
+    )
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].publish_time, rows[-1].id)
+
+    event_types = (await reference_data.get(db)).event_types
+    return {
+        "items": [
+            {
+                "id": str(event_id),
+                "name": event_types[type_id].name if type_id in event_types else "",
+                "publishTime": publish_time.isoformat(),
+                "forecast": forecast,
+                "previous": previous,
+                "actual": actual,
+            }
+            for event_id, type_id, publish_time, forecast, actual, previous in rows
+        ],
+        "nextCursor": next_cursor,
+    }
+
+async def get_calendar_page(db: AsyncSession, publish_from: datetime, publish_to: Optional[datetime],
+                            asset_id: Optional[int], type_id: Optional[int], cursor: Optional[str], limit: int) -> dict:
+    """
+    query_calendar behind a Redis cache. Keys embed the change counters of the events
+    and event types (and markets, for an asset filter), so ingesting an event or an
+    actual value makes every cached page unreachable; entries expire after
+    CALENDAR_TTL_SECONDS. Uncached while Redis is unavailable.
+    """
+    tables = [MacroEventHistory.__tablename__, MacroEventType.__tablename__]
+    if asset_id is not None:
+        tables.append(Market.__tablename__)
+    versions = [await get_version(table) for table in tables]
+
+    key = None
+    if None not in versions:
+        parts = (publish_from, publish_to, asset_id, type_id, cursor, limit)
+        key = CALENDAR_KEY.format(
+            versions="-".join(str(v) for v in versions),
+            digest=hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+        )
+        try:
+            cached = await get_redis().get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            mark_redis_down(e)
+
+    page = await query_calendar(db, publish_from, publish_to, asset_id, type_id, cursor, limit)
+    if key is not None and redis_available():
+        try:
+            await get_redis().set(key, json.dumps(page), ex=settings.CALENDAR_TTL_SECONDS)
+        except Exception as e:
+            mark_redis_down(e)
+    return page
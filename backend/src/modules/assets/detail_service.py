@@ -0,0 +1,157 @@
+import json
+import logging
+from itertools import chain
+from typing import Dict, Iterable
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from src.config.config import settings
+from src.common.cache.redis_client import get_redis, redis_available, mark_redis_down
+from src.common.versioning import run_in_background
+from src.modules.assets.models import AssetEventStats, MacroEventHistory, ScenarioType
+from src.modules.markets.models import Market, Settlement
+
+logger = logging.getLogger(__name__)
+
+# Precomputed scenarioStats + forecastVsActual of one asset (JSON)
+DETAIL_KEY = "asset_detail:{asset_id}"
+# Settled events shown in the forecast vs actual series
+HISTORY_POINTS = 12
+
+SCENARIO_FIELDS = {
+    ScenarioType.ABOVE: "aboveForecast",
+    ScenarioType.NEAR: "nearForecast",
+    ScenarioType.BELOW: "belowForecast",
+}
+
+def _scenario_detail(count: int, up: int, down: int, weighted_move: float) -> dict:
+    return {
+        "count": count,
+        "upProbability": round(up / count, 4) if count else 0.0,
+        "downProbability": round(down / count, 4) if count else 0.0,
+        "avgMove30m": round(weighted_move / count, 6) if count else 0.0,
+    }
+
+def empty_detail() -> dict:
+    return {
+        "scenarioStats": {field: _scenario_detail(0, 0, 0, 0.0) for field in SCENARIO_FIELDS.values()},
+        "forecastVsActual": [],
+    }
+
+async def compute_asset_details(db: AsyncSession, asset_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    scenarioStats and forecastVsActual of many assets, with one aggregate per part.
+    Scenario stats are summed over event types (avg moves weighted by occurrences);
+    the series holds the last HISTORY_POINTS settled events with a forecast.
+    """
+    asset_ids = list(set(asset_ids))
+    details = {asset_id: empty_detail() for asset_id in asset_ids}
+    if not asset_ids:
+        return details
+
+    # 1. Scenario stats per (asset, scenario)
+    result = await db.execute(
+        select(
+            AssetEventStats.asset_id,
+            AssetEventStats.scenario,
+            func.sum(AssetEventStats.occurrence_count),
+            func.sum(AssetEventStats.up_count),
+            func.sum(AssetEventStats.down_count),
+            func.sum(AssetEventStats.avg_move_30m * AssetEventStats.occurrence_count)
+        )
+        .where(AssetEventStats.asset_id.in_(asset_ids))
+        .group_by(AssetEventStats.asset_id, AssetEventStats.scenario)
+    )
+    for asset_id, scenario, count, up, down, weighted_move in result.all():
+        details[asset_id]["scenarioStats"][SCENARIO_FIELDS[scenario]] = _scenario_detail(
+            count or 0, up or 0, down or 0, weighted_move or 0.0
+        )
+
+    # 2. Latest settled events per asset
+    ranked = (
+        select(
+            Market.asset_id,
+            MacroEventHistory.publish_time,
+            MacroEventHistory.forecast_value,
+            MacroEventHistory.actual_value,
+            func.row_number().over(
+                partition_by=Market.asset_id,
+                order_by=MacroEventHistory.publish_time.desc()
+            ).label("rank")
+        )
+        .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+        .join(Settlement, Settlement.market_id == Market.id)
+        .where(
+            Market.asset_id.in_(asset_ids),
+            MacroEventHistory.forecast_value != None,
+            MacroEventHistory.actual_value != None
+        )
+        .subquery()
+    )
+    result = await db.execute(
+        select(ranked.c.asset_id, ranked.c.publish_time, ranked.c.forecast_value, ranked.c.actual_value)
+        .where(ranked.c.rank <= HISTORY_POINTS)
+        .order_by(ranked.c.asset_id, ranked.c.publish_time)
+    )
+    for asset_id, publish_time, forecast, actual in result.all():
+        details[asset_id]["forecastVsActual"].append({
+            "time": publish_time.strftime("%Y-%m-%d"),
+            "forecast": forecast,
+            "actual": actual,
+        })
+    return details
+
+async def get_asset_detail(db: AsyncSession, asset_id: int) -> dict:
+    """
+    Detail stats of one asset: one Redis read when cached, computed and stored otherwise.
+    """
+    key = DETAIL_KEY.format(asset_id=asset_id)
+    if redis_available():
+        try:
+            cached = await get_redis().get(key)
+            if cached is not None:
+                return json.loads(cached)
+        except Exception as e:
+            mark_redis_down(e)
+
+    detail = (await compute_asset_details(db, [asset_id]))[asset_id]
+    if redis_available():
+        try:
+            await get_redis().set(key, json.dumps(detail), ex=settings.ASSET_DETAIL_TTL_SECONDS)
+        except Exception as e:
+            mark_redis_down(e)
+    return detail
+
+async def invalidate_asset_details(asset_ids: Iterable[int]):
+    keys = [DETAIL_KEY.format(asset_id=asset_id) for asset_id in asset_ids]
+    if not keys or not redis_available():
+        return
+    try:
+        await get_redis().delete(*keys)
+    except Exception as e:
+        mark_redis_down(e)
+
+def mark_details_stale(session: Session, asset_ids: Iterable[int]):
+    """
+    Drops the cached details of `asset_ids` once `session` commits, for writes the
+    flush hook does not see (statements, settlement rows behind forecastVsActual).
+    """
+    session.info.setdefault("stale_asset_details", set()).update(asset_ids)
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_details(session, flush_context):
+    mark_details_stale(session, (
+        obj.asset_id for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, AssetEventStats)
+    ))
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_details(session):
+    asset_ids = session.info.pop("stale_asset_details", None)
+    if asset_ids:
+        run_in_background(invalidate_asset_details(asset_ids), session)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_details(session):
+    session.info.pop("stale_asset_details", None)
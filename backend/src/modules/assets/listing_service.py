@@ -0,0 +1,117 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.config.config import settings
+from src.common.locks import LoopLock
+from src.common.cache.price_store import price_subscriber
+from src.modules.assets.models import Asset, MacroEventHistory
+from src.modules.assets.price_lookup import PriceLookup
+from src.modules.markets.models import Market
+
+logger = logging.getLogger(__name__)
+
+# Markets close this long before publish_time (see market_generator)
+CLOSE_BEFORE_PUBLISH = timedelta(hours=1)
+
+class Enrichment(NamedTuple):
+    price_24h: Optional[float]
+    next_event_type_id: Optional[int]
+
+def _next_event_type():
+    # Correlated top-1 per asset over its markets; the close_time bound keeps it an
+    # index range scan on (asset_id, close_time) instead of the asset's whole history
+    now = datetime.utcnow()
+    return (
+        select(MacroEventHistory.type_id)
+        .select_from(Market)
+        .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+        .where(
+            Market.asset_id == Asset.id,
+            Market.close_time > now - CLOSE_BEFORE_PUBLISH,
+            MacroEventHistory.publish_time > now
+        )
+        .order_by(MacroEventHistory.publish_time, MacroEventHistory.id)
+        .limit(1)
+        .correlate(Asset)
+        .scalar_subquery()
+    )
+
+async def load_enrichment(db: AsyncSession) -> Dict[int, Enrichment]:
+    """
+    As-of price 24h ago and next upcoming event type of every asset, in one statement.
+    """
+    result = await db.execute(
+        select(
+            Asset.id,
+            PriceLookup.latest_before(datetime.utcnow() - timedelta(hours=24)),
+            _next_event_type()
+        )
+    )
+    return {asset_id: Enrichment(price_24h, type_id) for asset_id, price_24h, type_id in result.all()}
+
+async def current_prices(db: AsyncSession, assets: Iterable) -> Dict[int, Optional[float]]:
+    """
+    asset id -> latest price from the price store. Assets without a price there
+    (or with Redis down) fall back to the write-behind column, in one query.
+    """
+    assets = list(assets)
+    latest = await price_subscriber.latest(a.symbol for a in assets)
+    prices = {a.id: latest[a.symbol][0] for a in assets if a.symbol in latest}
+    missing = [a.id for a in assets if a.id not in prices]
+    if missing:
+        result = await db.execute(select(Asset.id, Asset.current_price).where(Asset.id.in_(missing)))
+        prices.update(result.all())
+    return prices
+
+def change_24h(current: Optional[float], past: Optional[float]) -> Optional[float]:
+    if current is None or not past:
+        return None
+    return round((current - past) / past * 100, 2)
+
+class AssetListingCache:
+    """
+    Per-process cache of the listing enrichment, reloaded after ASSET_LIST_TTL_SECONDS.
+    Only the 24h-ago price and the next event are cached; the change is computed per
+    request against the live price, so quotes are never older than the price feed.
+    """
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.ASSET_LIST_TTL_SECONDS
+        self.rows: Optional[Dict[int, Enrichment]] = None
+        self.loaded_at = 0.0
+        self.stats = {"hits": 0, "loads": 0}
+        self._lock = LoopLock()
+
+    def _fresh(self, asset_ids) -> bool:
+        return (
+            self.rows is not None
+            and time.monotonic() - self.loaded_at < self.ttl
+            and asset_ids <= self.rows.keys()
+        )
+
+    async def get(self, db: AsyncSession, asset_ids=()) -> Dict[int, Enrichment]:
+        """
+        Enrichment rows, reloaded through `db` when expired or missing `asset_ids`.
+        """
+        asset_ids = set(asset_ids)
+        if self._fresh(asset_ids):
+            self.stats["hits"] += 1
+            return self.rows
+
+        # One load per expiry, however many requests are waiting
+        async with self._lock:
+            if self._fresh(asset_ids):
+                self.stats["hits"] += 1
+                return self.rows
+            self.rows = await load_enrichment(db)
+            self.loaded_at = time.monotonic()
+            self.stats["loads"] += 1
+            logger.debug(f"Loaded listing enrichment for {len(self.rows)} assets")
+            return self.rows
+
+    def invalidate(self):
+        self.rows = None
+
+asset_listing = AssetListingCache()
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 from src.common.database.database import Base
+from src.common.versioning import track_table_changes
 
 class AssetCategory(str, enum.Enum):
     CRYPTO = "CRYPTO"
@@ -20,6 +21,7 @@ class ScenarioType(str, enum.Enum):
 class SnapshotType(str, enum.Enum):
     T0 = "T0"
     T30 = "T30"
+    TICK = "TICK"
 
 class Asset(Base):
     __tablename__ = "assets"
@@ -66,12 +68,20 @@ class MacroEventHistory(Base):
     type_id = Column(Integer, ForeignKey("macro_event_types.id"), nullable=False)
     forecast_value = Column(Float, nullable=True)
     actual_value = Column(Float, nullable=True)
-    publish_time = Column(DateTime(timezone=True), nullable=False)
+    publish_time = Column(DateTime(timezone=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Calendar filtered by event type; previous actual of the same type
+        Index('ix_macro_events_history_type_id_publish_time', 'type_id', 'publish_time'),
+    )
+
     # Relationships
     event_type = relationship("MacroEventType", back_populates="events")
 
+# Version counters behind the reference data cache and the calendar cache
+track_table_changes(Asset.__tablename__, MacroEventType.__tablename__, MacroEventHistory.__tablename__)
+
 class PriceSnapshot(Base):
     __tablename__ = "price_snapshots"
 
@@ -81,6 +91,11 @@ class PriceSnapshot(Base):
     price = Column(Float, nullable=False)
     snapshot_type = Column(SQLEnum(SnapshotType), nullable=False)
 
+    __table_args__ = (
+        # As-of lookups: latest snapshot of one asset at or before a timestamp
+        Index('ix_price_snapshots_asset_id_timestamp', 'asset_id', 'timestamp'),
+    )
+
     # Relationships
     asset = relationship("Asset", back_populates="snapshots")
 
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.modules.assets.models import Asset, PriceSnapshot
+
+class PriceLookup:
+    """
+    As-of price lookups: the latest snapshot price at or before a timestamp.
+    """
+    @staticmethod
+    def latest_before(ts: datetime):
+        """
+        Scalar subquery: price of the latest snapshot of the outer query's Asset at or
+        before `ts`. Select it next to Asset.id.
+        """
+        # Correlated top-1 per asset: an index range scan on (asset_id, timestamp),
+        # the same plan as a LATERAL join, but portable to SQLite
+        return (
+            select(PriceSnapshot.price)
+            .where(
+                PriceSnapshot.asset_id == Asset.id,
+                PriceSnapshot.timestamp <= ts
+            )
+            .order_by(PriceSnapshot.timestamp.desc(), PriceSnapshot.id.desc())
+            .limit(1)
+            .correlate(Asset)
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    async def as_of_multi(db: AsyncSession, asset_ids: Iterable[int], timestamps: Sequence[datetime]) -> Dict[int, Tuple[Optional[float], ...]]:
+        """
+        As-of prices of many assets at several timestamps, in one statement.
+        Returns asset_id -> one price (or None) per timestamp.
+        """
+        asset_ids = list(asset_ids)
+        if not asset_ids or not timestamps:
+            return {}
+
+        result = await db.execute(
+            select(Asset.id, *[PriceLookup.latest_before(ts) for ts in timestamps])
+            .where(Asset.id.in_(asset_ids))
+        )
+        prices = {asset_id: (None,) * len(timestamps) for asset_id in asset_ids}
+        for row in result.all():
+            prices[row[0]] = tuple(row[1:])
+        return prices
+
+    @staticmethod
+    async def as_of(db: AsyncSession, asset_ids: Iterable[int], ts: datetime) -> Dict[int, Optional[float]]:
+        """
+        As-of price of many assets at one timestamp, in one statement.
+        """
+        prices = await PriceLookup.as_of_multi(db, asset_ids, [ts])
+        return {asset_id: p[0] for asset_id, p in prices.items()}
@@ -1,26 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List, Optional
 from src.common.database.database import get_db, MockSession
-from src.modules.assets.models import Asset as AssetModel, MacroEventHistory as MacroEventModel, AssetCategory
-from src.modules.assets.schemas import Asset, AssetDetail, MacroEvent
+from src.modules.assets.models import Asset as AssetModel, AssetCategory
+from src.modules.assets.schemas import Asset, AssetDetail, CalendarPage
 from src.utils.data_fetcher import DataFetcher
+from src.common.cache.reference_data import reference_data
+from src.modules.assets.detail_service import get_asset_detail, empty_detail
+from src.modules.assets.listing_service import asset_listing, change_24h, current_prices
+from src.modules.assets.calendar_service import get_calendar_page, default_window_start
+from src.common.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter()
 
 async def get_simulated_assets():
     """Helper to generate simulated assets if DB is down"""
-    symbols = {
-        "BTC": {"class": AssetCategory.CRYPTO, "price": await DataFetcher.fetch_current_price("BTC")},
-        "ETH": {"class": AssetCategory.CRYPTO, "price": await DataFetcher.fetch_current_price("ETH")},
-        "SP500": {"class": AssetCategory.INDEX, "price": await DataFetcher.fetch_current_price("SP500")},
-        "GOLD": {"class": AssetCategory.COMMODITY, "price": await DataFetcher.fetch_current_price("GOLD")},
-        "SILVER": {"class": AssetCategory.COMMODITY, "price": await DataFetcher.fetch_current_price("SILVER")},
-        "US10Y": {"class": AssetCategory.RATES, "price": await DataFetcher.fetch_current_price("US10Y")},
+    classes = {
+        "BTC": AssetCategory.CRYPTO,
+        "ETH": AssetCategory.CRYPTO,
+        "SP500": AssetCategory.INDEX,
+        "GOLD": AssetCategory.COMMODITY,
+        "SILVER": AssetCategory.COMMODITY,
+        "US10Y": AssetCategory.RATES,
     }
+    prices = await DataFetcher.fetch_prices(classes, classes)
+    symbols = {sym: {"class": cls, "price": prices.get(sym)} for sym, cls in classes.items()}
     assets = []
     for i, (sym, data) in enumerate(symbols.items()):
         assets.append(AssetModel(
@@ -41,33 +48,112 @@ async def get_simulated_assets():
         ))
     return assets
 
+def simulated_event() -> dict:
+    """Placeholder calendar entry if DB is down"""
+    return {
+        "id": "1",
+        "name": "US CPI YoY",
+        "publishTime": datetime.utcnow() + timedelta(hours=24),
+        "forecast": 3.4,
+        "previous": None,
+        "actual": None,
+    }
+
 @router.get("/", response_model=List[Asset])
 async def list_assets(db: AsyncSession = Depends(get_db)):
     try:
         if isinstance(db, MockSession):
             return await get_simulated_assets()
             
-        result = await db.execute(select(AssetModel))
-        assets = result.scalars().all()
-        
+        # Reference data cache; the DB is only hit when the assets table changed
+        refs = await reference_data.get(db)
+        assets = list(refs.assets.values())
+
         if not assets:
             return await get_simulated_assets()
-            
-        return assets
+
+        # 24h-ago prices and next events of all assets: one query, cached for a few seconds
+        enrichment = await asset_listing.get(db, refs.assets.keys())
+
+        # Latest prices from Redis; the DB column (write-behind) is the fallback
+        prices = await current_prices(db, assets)
+        listing = []
+        for a in assets:
+            price = prices.get(a.id)
+            price_24h, next_type_id = enrichment.get(a.id, (None, None))
+            next_type = refs.event_types.get(next_type_id)
+            listing.append(Asset.model_validate(a).model_copy(update={
+                "current_price": price,
+                "change24h": change_24h(price, price_24h),
+                "nextEvent": next_type.name if next_type else None,
+            }))
+        return listing
     except Exception:
         # Fallback if query fails even with valid session
         return await get_simulated_assets()
 
+def _naive_utc(value: datetime) -> datetime:
+    # Offsets are converted, not dropped: 10:00+02:00 is 08:00 UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.replace(tzinfo=None)
+
+@router.get("/calendar", response_model=CalendarPage)
+async def list_calendar(
+    assetId: Optional[str] = None,
+    eventType: Optional[str] = None,
+    publishFrom: Optional[datetime] = None,
+    publishTo: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Macro events ordered by (publish_time, id), one page at a time.
+    Without `publishFrom` the window starts CALENDAR_LOOKBACK_HOURS back (bucketed);
+    `assetId` keeps events with a market on that asset, `eventType` is an event type code.
+    """
+    if isinstance(db, MockSession):
+        # Return dummy calendar
+        return {"items": [simulated_event()], "nextCursor": None}
+
+    try:
+        refs = await reference_data.get(db)
+    except Exception:
+        return {"items": [simulated_event()], "nextCursor": None}
+
+    asset_pk = None
+    if assetId is not None:
+        asset = refs.assets_by_asset_id.get(assetId)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Asset not found")
+        asset_pk = asset.id
+    type_id = None
+    if eventType is not None:
+        event_type = refs.event_types_by_code.get(eventType)
+        if event_type is None:
+            raise HTTPException(status_code=404, detail="Event type not found")
+        type_id = event_type.id
+
+    if publishFrom is None:
+        publishFrom = default_window_start(datetime.utcnow())
+    # Stored times are naive UTC
+    publishFrom = _naive_utc(publishFrom)
+    if publishTo is not None:
+        publishTo = _naive_utc(publishTo)
+
+    return await get_calendar_page(db, publishFrom, publishTo, asset_pk, type_id, cursor, limit)
+
 @router.get("/{assetId}", response_model=AssetDetail)
 async def get_asset(assetId: str, db: AsyncSession = Depends(get_db)):
     asset = None
     if not isinstance(db, MockSession):
         try:
-            result = await db.execute(select(AssetModel).where(AssetModel.asset_id == assetId))
-            asset = result.scalars().first()
+            asset = (await reference_data.get(db)).assets_by_asset_id.get(assetId)
         except Exception:
             pass
             
+    simulated = asset is None
     if not asset:
         # Check simulation
         sim_assets = await get_simulated_assets()
@@ -76,60 +162,16 @@ async def get_asset(assetId: str, db: AsyncSession = Depends(get_db)):
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
-    # In a real app, we would fetch scenario stats and historical points here
-    # Putting dummy data for now to match the schema
-    dummy_stats = {
-        "aboveForecast": {"count": 10, "upProbability": 0.6, "downProbability": 0.4, "avgMove30m": 0.005},
-        "nearForecast": {"count": 20, "upProbability": 0.5, "downProbability": 0.5, "avgMove30m": 0.002},
-        "belowForecast": {"count": 15, "upProbability": 0.3, "downProbability": 0.7, "avgMove30m": 0.008}
-    }
-    dummy_points = [
-        {"time": "2025-01-01", "forecast": 100.0, "actual": 102.0},
-        {"time": "2025-02-01", "forecast": 101.0, "actual": 100.5}
-    ]
-    
+    # Scenario stats and forecast vs actual series, precomputed in Redis
+    if simulated:
+        detail = empty_detail()
+        price = asset.current_price
+    else:
+        detail = await get_asset_detail(db, asset.id)
+        price = (await current_prices(db, [asset])).get(asset.id)
+
     return {
-        **asset.__dict__,
-        "scenarioStats": dummy_stats,
-        "forecastVsActual": dummy_points
+        **Asset.model_validate(asset).model_dump(),
+        "current_price": price,
+        **detail
     }
-
-@router.get("/calendar", response_model=List[MacroEvent])
-async def list_calendar(assetId: Optional[str] = None, db: AsyncSession = Depends(get_db)):
-    if isinstance(db, MockSession):
-        # Return dummy calendar
-        return [
-            MacroEventModel(
-                id=1,
-                type_id=1,
-                publish_time=datetime.utcnow() + timedelta(hours=24),
-                forecast_value=3.4,
-                actual_value=None
-            )
-        ]
-
-    # In a real app, we would filter by assetId if provided
-    try:
-        result = await db.execute(select(MacroEventModel).order_by(MacroEventModel.publish_time.asc()))
-        events = result.scalars().all()
-        if not events:
-             return [
-                MacroEventModel(
-                    id=1,
-                    type_id=1,
-                    publish_time=datetime.utcnow() + timedelta(hours=24),
-                    forecast_value=3.4,
-                    actual_value=None
-                )
-            ]
-        return events
-    except Exception:
-          return [
-                MacroEventModel(
-                    id=1,
-                    type_id=1,
-                    publish_time=datetime.utcnow() + timedelta(hours=24),
-                    forecast_value=3.4,
-                    actual_value=None
-                )
-            ]
@@ -46,9 +46,14 @@ class MacroEvent(BaseModel):
     id: str
     name: str
     publishTime: datetime
-    forecast: float
-    previous: float
+    forecast: Optional[float] = None
+    previous: Optional[float] = None
     actual: Optional[float] = None
 
     class Config:
         from_attributes = True
+
+class CalendarPage(BaseModel):
+    items: List[MacroEvent]
+    # Pass as `cursor` for the next page; None on the last page
+    nextCursor: Optional[str] = None
@@ -1,12 +1,63 @@
 import logging
+from typing import List, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_
-from src.modules.assets.models import AssetEventStats, MacroEventHistory, MacroEventType, ScenarioType
+from src.modules.assets.models import AssetEventStats, MacroEventHistory, ScenarioType
+from src.common.cache.reference_data import reference_data
+# Registers the asset detail cache invalidation on stats writes
+from src.modules.assets import detail_service  # noqa: F401
 from src.modules.markets.models import Settlement, Market
 
 logger = logging.getLogger(__name__)
 
+def classify_scenario(actual: float, forecast: float, tolerance: float) -> ScenarioType:
+    """
+    Determine Scenario (Above/Near/Below Forecast).
+    """
+    tolerance = tolerance or 0.0001
+    if actual > forecast + tolerance:
+        return ScenarioType.ABOVE
+    elif actual < forecast - tolerance:
+        return ScenarioType.BELOW
+    return ScenarioType.NEAR
+
+def _new_stats(asset_id: int, event_type_id: int, scenario: ScenarioType) -> AssetEventStats:
+    return AssetEventStats(
+        asset_id=asset_id,
+        event_type_id=event_type_id,
+        scenario=scenario,
+        occurrence_count=0,
+        up_count=0,
+        down_count=0,
+        avg_move_30m=0.0
+    )
+
+def _apply_outcome(stats: AssetEventStats, return_pct: float, outcome: str):
+    # Incremental average move: new_avg = (old_avg * count + new_val) / (count + 1)
+    move = abs(return_pct)
+    stats.avg_move_30m = (stats.avg_move_30m * stats.occurrence_count + move) / (stats.occurrence_count + 1)
+    
+    stats.occurrence_count += 1
+    
+    if outcome == "UP":
+        stats.up_count += 1
+    elif outcome == "DOWN":
+        stats.down_count += 1
+
+def _revert_outcome(stats: AssetEventStats, return_pct: float, outcome: str):
+    # Inverse of _apply_outcome: old_avg = (new_avg * count - val) / (count - 1)
+    move = abs(return_pct)
+    count = stats.occurrence_count or 0
+    stats.avg_move_30m = (stats.avg_move_30m * count - move) / (count - 1) if count > 1 else 0.0
+
+    stats.occurrence_count = max(0, count - 1)
+
+    if outcome == "UP":
+        stats.up_count = max(0, stats.up_count - 1)
+    elif outcome == "DOWN":
+        stats.down_count = max(0, stats.down_count - 1)
+
 async def update_asset_stats(db: AsyncSession, market_id: int):
     """
     Updates the AssetEventStats based on the outcome of a settled market.
@@ -14,10 +65,9 @@ async def update_asset_stats(db: AsyncSession, market_id: int):
     try:
         # 1. Fetch relevant data
         query = (
-            select(Market, Settlement, MacroEventHistory, MacroEventType)
+            select(Market, Settlement, MacroEventHistory)
             .join(Settlement, Market.id == Settlement.market_id)
             .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
-            .join(MacroEventType, MacroEventHistory.type_id == MacroEventType.id)
             .where(Market.id == market_id)
         )
         result = await db.execute(query)
@@ -27,19 +77,15 @@ async def update_asset_stats(db: AsyncSession, market_id: int):
             logger.error(f"Could not find settlement data for market {market_id}")
             return
 
-        market, settlement, event, event_type = data
+        market, settlement, event = data
+        # Event type (tolerance) from the reference data cache
+        event_type = (await reference_data.get(db)).event_types.get(event.type_id)
+        if event_type is None:
+            logger.error(f"Event type {event.type_id} not found for market {market_id}")
+            return
         
         # 2. Determine Scenario (Above/Near/Below Forecast)
-        actual = event.actual_value
-        forecast = event.forecast_value
-        tolerance = event_type.tolerance or 0.0001
-        
-        if actual > forecast + tolerance:
-            scenario = ScenarioType.ABOVE
-        elif actual < forecast - tolerance:
-            scenario = ScenarioType.BELOW
-        else:
-            scenario = ScenarioType.NEAR
+        scenario = classify_scenario(event.actual_value, event.forecast_value, event_type.tolerance)
             
         # 3. Fetch or Create AssetEventStats
         stats_query = select(AssetEventStats).where(
@@ -53,31 +99,94 @@ async def update_asset_stats(db: AsyncSession, market_id: int):
         stats = stats_result.scalars().first()
         
         if not stats:
-            stats = AssetEventStats(
-                asset_id=market.asset_id,
-                event_type_id=event_type.id,
-                scenario=scenario,
-                occurrence_count=0,
-                up_count=0,
-                down_count=0,
-                avg_move_30m=0.0
-            )
+            stats = _new_stats(market.asset_id, event_type.id, scenario)
             db.add(stats)
             
         # 4. Update Stats
-        # Incremental average move: new_avg = (old_avg * count + new_val) / (count + 1)
-        move = abs(settlement.return_pct)
-        stats.avg_move_30m = (stats.avg_move_30m * stats.occurrence_count + move) / (stats.occurrence_count + 1)
-        
-        stats.occurrence_count += 1
-        
-        if settlement.outcome == "UP":
-            stats.up_count += 1
-        elif settlement.outcome == "DOWN":
-            stats.down_count += 1
+        _apply_outcome(stats, settlement.return_pct, settlement.outcome)
 
         logger.info(f"Updated stats for Asset {market.asset_id}, EventType {event_type.id}, Scenario {scenario}")
 
     except Exception as e:
         logger.error(f"Failed to update asset stats for market {market_id}: {e}")
         # We don't raise here to avoid failing the whole settlement if stats update fails
+
+async def update_asset_stats_bulk(db: AsyncSession, event_type_id: int, scenario: ScenarioType,
+                                  results: List[Tuple[int, float, str]]):
+    """
+    Applies the stats increments of many settled markets of one event.
+    `results` is a list of (asset_id, return_pct, outcome).
+    All affected stats rows are loaded with a single query.
+    """
+    if not results:
+        return
+    try:
+        asset_ids = {asset_id for asset_id, _, _ in results}
+        stats_result = await db.execute(
+            select(AssetEventStats).where(
+                and_(
+                    AssetEventStats.asset_id.in_(asset_ids),
+                    AssetEventStats.event_type_id == event_type_id,
+                    AssetEventStats.scenario == scenario
+                )
+            )
+        )
+        by_asset = {s.asset_id: s for s in stats_result.scalars().all()}
+
+        for asset_id, return_pct, outcome in results:
+            stats = by_asset.get(asset_id)
+            if stats is None:
+                stats = _new_stats(asset_id, event_type_id, scenario)
+                db.add(stats)
+                by_asset[asset_id] = stats
+            _apply_outcome(stats, return_pct, outcome)
+
+        logger.info(f"Updated stats for {len(asset_ids)} assets, EventType {event_type_id}, Scenario {scenario}")
+
+    except Exception as e:
+        logger.error(f"Failed to bulk update asset stats for event type {event_type_id}: {e}")
+
+async def revert_asset_stats(db: AsyncSession, market_ids: Sequence[int]):
+    """
+    Takes the outcomes of settled markets back out of AssetEventStats, e.g. before a
+    rollback deletes their Settlement rows. Runs in the caller's transaction and,
+    unlike the updates, raises on failure so the rollback does not commit half-done.
+    """
+    if not market_ids:
+        return
+    result = await db.execute(
+        select(Market.asset_id, MacroEventHistory, Settlement.return_pct, Settlement.outcome)
+        .join(Settlement, Market.id == Settlement.market_id)
+        .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
+        .where(Market.id.in_(market_ids))
+    )
+    rows = result.all()
+    event_types = (await reference_data.get(db)).event_types
+
+    # (asset_id, event_type_id, scenario) -> [(return_pct, outcome)]
+    reverted = {}
+    for asset_id, event, return_pct, outcome in rows:
+        event_type = event_types.get(event.type_id)
+        if event_type is None:
+            logger.error(f"Event type {event.type_id} not found, stats of asset {asset_id} not reverted")
+            continue
+        scenario = classify_scenario(event.actual_value, event.forecast_value, event_type.tolerance)
+        reverted.setdefault((asset_id, event_type.id, scenario), []).append((return_pct, outcome))
+
+    for (asset_id, event_type_id, scenario), outcomes in reverted.items():
+        stats_result = await db.execute(
+            select(AssetEventStats).where(
+                and_(
+                    AssetEventStats.asset_id == asset_id,
+                    AssetEventStats.event_type_id == event_type_id,
+                    AssetEventStats.scenario == scenario
+                )
+            )
+        )
+        stats = stats_result.scalars().first()
+        if stats is None:
+            continue
+        for return_pct, outcome in outcomes:
+            _revert_outcome(stats, return_pct, outcome)
+
+    logger.info(f"Reverted stats of {len(rows)} markets across {len(reverted)} asset/scenario rows")
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from sqlalchemy import case, func, tuple_
+from typing import List, Optional
+from datetime import datetime
 from src.common import guards
 from src.common.database.database import get_db
+from src.common.pagination import encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from src.modules.users.models import User
-from src.modules.markets.models import Bet as BetModel
-from src.modules.bets.schemas import BetRequest, Bet as BetSchema
+from src.modules.markets.models import Bet as BetModel, BetResult as BetResultModel
+from src.modules.bets.schemas import BetRequest, Bet as BetSchema, BetHistoryPage, BetResult, BetBatchRequest, BetBatchResult
 from src.modules.bets import service as betting_service
 
 router = APIRouter()
@@ -14,30 +17,99 @@ router = APIRouter()
 @router.post("/", response_model=BetSchema)
 async def create_bet(
     bet_in: BetRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(guards.get_current_user)
 ):
-    # Mapping BetRequest to service format if needed
-    return await betting_service.place_bet(db=db, user=current_user, bet_in=bet_in)
+    """
+    Places one bet. Clients may send an Idempotency-Key header; retrying with the
+    same key returns the original bet instead of placing another one.
+    """
+    return await betting_service.place_bet(db=db, user=current_user, bet_in=bet_in, idempotency_key=idempotency_key)
 
-@router.get("/history", response_model=List[BetSchema])
+@router.post("/batch", response_model=BetBatchResult)
+async def create_bets(
+    batch_in: BetBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(guards.get_current_user)
+):
+    """
+    Places up to MAX_BATCH_SIZE bets with one wallet debit.
+    ALL_OR_NOTHING rejects the whole batch (400, per-item errors) if any bet fails;
+    PER_ITEM places the valid bets and reports each item's bet or error.
+    """
+    return await betting_service.place_bets(db=db, user=current_user, bets=batch_in.bets, mode=batch_in.mode)
+
+@router.get("/history", response_model=BetHistoryPage)
 async def get_bet_history(
+    marketId: Optional[int] = None,
+    result: Optional[BetResult] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    includeSummary: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(guards.get_current_user)
 ):
-    result = await db.execute(
-        select(BetModel).where(BetModel.user_id == current_user.id).order_by(BetModel.created_at.desc())
-    )
-    bets = result.scalars().all()
-    
+    """
+    The user's bets, newest first, one page at a time.
+    With includeSummary, the response also carries a summary (counts, stake, PnL) of
+    every bet matching the filters. It scans all of them, so clients ask for it once
+    rather than on every page load.
+    """
+    conditions = [BetModel.user_id == current_user.id]
+    if marketId is not None:
+        conditions.append(BetModel.market_id == marketId)
+    if result is not None:
+        conditions.append(BetModel.result == BetResultModel(result.value))
+
+    query = select(
+        BetModel.id, BetModel.market_id, BetModel.direction, BetModel.amount, BetModel.result, BetModel.created_at
+    ).where(*conditions)
+    if cursor:
+        created_at, bet_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(BetModel.created_at, BetModel.id) < tuple_(created_at, bet_id))
+
+    # One extra row tells whether there is a next page
+    rows = (await db.execute(
+        query.order_by(BetModel.created_at.desc(), BetModel.id.desc()).limit(limit + 1)
+    )).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    summary = None
+    if includeSummary:
+        # Aggregated in SQL over the same (covering) index
+        totals = (await db.execute(
+            select(
+                func.count(),
+                func.count(case((BetModel.result == BetResultModel.PENDING, 1))),
+                func.count(case((BetModel.result == BetResultModel.WON, 1))),
+                func.count(case((BetModel.result == BetResultModel.LOST, 1))),
+                func.count(case((BetModel.result == BetResultModel.CANCELLED, 1))),
+                func.coalesce(func.sum(BetModel.amount), 0.0),
+                func.coalesce(func.sum(case(
+                    (BetModel.result == BetResultModel.WON, BetModel.amount * BetModel.odds - BetModel.amount),
+                    (BetModel.result == BetResultModel.LOST, -BetModel.amount),
+                    else_=0.0
+                )), 0.0)
+            ).where(*conditions)
+        )).one()
+        summary = dict(zip(["total", "pending", "won", "lost", "cancelled", "staked", "pnl"], totals))
+
     # Transform to match schema
-    return [
-        {
-            "id": str(b.id),
-            "marketId": str(b.market_id),
-            "direction": b.direction,
-            "amount": b.amount,
-            "result": b.result
-        }
-        for b in bets
-    ]
+    return {
+        "items": [
+            {
+                "id": str(b.id),
+                "marketId": str(b.market_id),
+                "direction": b.direction,
+                "amount": b.amount,
+                "result": b.result
+            }
+            for b in rows
+        ],
+        "nextCursor": next_cursor,
+        "summary": summary,
+    }
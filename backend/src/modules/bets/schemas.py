@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from enum import Enum
 
 class BetDirection(str, Enum):
@@ -6,14 +7,15 @@ class BetDirection(str, Enum):
     DOWN = "DOWN"
 
 class BetResult(str, Enum):
-    WIN = "WIN"
-    LOSE = "LOSE"
     PENDING = "PENDING"
+    WON = "WON"
+    LOST = "LOST"
+    CANCELLED = "CANCELLED"
 
 class BetRequest(BaseModel):
     marketId: str
     direction: BetDirection
-    amount: float
+    amount: float = Field(gt=0)
 
 class Bet(BaseModel):
     id: str
@@ -25,4 +27,44 @@ class Bet(BaseModel):
     class Config:
         from_attributes = True
 
+class BetSummary(BaseModel):
+    total: int
+    pending: int
+    won: int
+    lost: int
+    cancelled: int
+    staked: float
+    pnl: float
+
+class BetHistoryPage(BaseModel):
+    items: List[Bet]
+    # Pass as `cursor` for the next page; None on the last page
+    nextCursor: Optional[str] = None
+    # Only when requested with includeSummary=true (scans every matching bet)
+    summary: Optional[BetSummary] = None
+
+# Largest accepted POST /bets/batch
+MAX_BATCH_SIZE = 200
+
+class BatchMode(str, Enum):
+    # Every bet is placed, or none (400 listing the failing items)
+    ALL_OR_NOTHING = "ALL_OR_NOTHING"
+    # Valid bets are placed; each item reports its bet or its error
+    PER_ITEM = "PER_ITEM"
+
+class BetBatchRequest(BaseModel):
+    bets: List[BetRequest] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+    mode: BatchMode = BatchMode.ALL_OR_NOTHING
+
+class BetBatchItem(BaseModel):
+    # Position in the request
+    index: int
+    bet: Optional[Bet] = None
+    error: Optional[str] = None
+
+class BetBatchResult(BaseModel):
+    items: List[BetBatchItem]
+    placed: int
+    staked: float
+
 BetCreate = BetRequest
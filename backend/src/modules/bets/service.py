@@ -1,44 +1,308 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+from sqlalchemy import String, and_, cast, exists, func, insert, literal, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.modules.bets.schemas import BetCreate
+from sqlalchemy.future import select
+from src.modules.bets.schemas import BetCreate, BatchMode
 from src.modules.users.models import User
-from src.modules.markets.models import Bet, Market
+from src.modules.markets.models import Bet, BetDirection, BetResult, Market, MarketStatus
 from src.modules.wallet.models import Wallet, WalletLedger, TransactionType
 from fastapi import HTTPException
 
-async def place_bet(db: AsyncSession, user: User, bet_in: BetCreate):
-    # 1. Check Market
-    market = await db.get(Market, bet_in.market_id)
-    if not market:
+# Placeholder for fixed odds
+FIXED_ODDS = 1.9
+# Batch plans re-read after a concurrent change (a market closing, the balance moving)
+BATCH_ATTEMPTS = 3
+
+def _market_id(bet_in: BetCreate) -> int:
+    try:
+        return int(bet_in.marketId)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Market not found")
-    
-    # 2. Check Wallet
-    result = await db.execute(select(Wallet).where(Wallet.user_id == user.id))
-    wallet = result.scalars().first()
-    if not wallet or wallet.balance < bet_in.amount:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
-    
-    # 3. Create Bet
-    db_bet = Bet(
-        user_id=user.id,
-        market_id=bet_in.market_id,
-        direction=bet_in.direction,
-        amount=bet_in.amount,
-        odds=1.9 # Placeholder for fixed odds
+
+def _bet_out(bet) -> dict:
+    return {
+        "id": str(bet.id),
+        "marketId": str(bet.market_id),
+        "direction": bet.direction,
+        "amount": bet.amount,
+        "result": bet.result,
+    }
+
+def _debit(user_id: int, amount: Decimal, market_open, idempotency_key: Optional[str]):
+    """
+    Conditional debit: only applies if the balance covers `amount`, the market
+    condition holds and the idempotency key is unused, all evaluated in the UPDATE.
+    """
+    conditions = [
+        Wallet.user_id == user_id,
+        Wallet.balance >= amount,
+        market_open
+    ]
+    if idempotency_key is not None:
+        conditions.append(~exists().where(Bet.user_id == user_id, Bet.idempotency_key == idempotency_key))
+    return (
+        update(Wallet)
+        .where(and_(*conditions))
+        .values(balance=Wallet.balance - amount)
+        .returning(Wallet.user_id)
     )
-    db.add(db_bet)
-    
-    # 4. Deduct Balance & Log
-    wallet.balance -= bet_in.amount
-    transaction = WalletLedger(
-        wallet_id=wallet.id,
-        amount=-bet_in.amount,
-        type=TransactionType.BET_PLACEMENT,
-        reference_id=str(db_bet.id)
+
+def _market_open(market_id: int, now: datetime):
+    return exists().where(
+        Market.id == market_id,
+        Market.status == MarketStatus.OPEN,
+        Market.close_time > now
+    )
+
+async def _place_single_statement(db: AsyncSession, user_id: int, market_id: int, bet_in: BetCreate,
+                                  amount: Decimal, idempotency_key: Optional[str], now: datetime) -> Optional[int]:
+    # debit -> bet -> ledger as data-modifying CTEs: one round trip, one snapshot
+    debit = _debit(user_id, amount, _market_open(market_id, now), idempotency_key).cte("debit")
+    new_bet = (
+        insert(Bet)
+        .from_select(
+            ["user_id", "market_id", "amount", "direction", "odds", "result", "idempotency_key"],
+            select(
+                debit.c.user_id,
+                literal(market_id, Bet.market_id.type),
+                literal(bet_in.amount, Bet.amount.type),
+                literal(BetDirection(bet_in.direction.value), Bet.direction.type),
+                literal(FIXED_ODDS, Bet.odds.type),
+                literal(BetResult.PENDING, Bet.result.type),
+                literal(idempotency_key, Bet.idempotency_key.type)
+            )
+        )
+        .returning(Bet.id)
+        .cte("new_bet")
     )
-    db.add(transaction)
-    
+    ledger = (
+        insert(WalletLedger)
+        .from_select(
+            ["wallet_id", "type", "amount", "reference_id"],
+            select(
+                literal(user_id, WalletLedger.wallet_id.type),
+                literal(TransactionType.BET_PLACEMENT, WalletLedger.type.type),
+                literal(-amount, WalletLedger.amount.type),
+                cast(new_bet.c.id, String)
+            )
+        )
+        .returning(WalletLedger.id)
+        .cte("ledger")
+    )
+    result = await db.execute(select(new_bet.c.id).add_cte(ledger))
+    return result.scalar()
+
+async def _place_statements(db: AsyncSession, user_id: int, market_id: int, bet_in: BetCreate,
+                            amount: Decimal, idempotency_key: Optional[str], now: datetime) -> Optional[int]:
+    # Same steps for databases without data-modifying CTEs; the conditional debit is still the guard
+    result = await db.execute(_debit(user_id, amount, _market_open(market_id, now), idempotency_key))
+    if result.first() is None:
+        return None
+    result = await db.execute(
+        insert(Bet)
+        .values(
+            user_id=user_id,
+            market_id=market_id,
+            amount=bet_in.amount,
+            direction=BetDirection(bet_in.direction.value),
+            odds=FIXED_ODDS,
+            result=BetResult.PENDING,
+            idempotency_key=idempotency_key
+        )
+        .returning(Bet.id)
+    )
+    bet_id = result.scalar_one()
+    await db.execute(insert(WalletLedger).values(
+        wallet_id=user_id,
+        type=TransactionType.BET_PLACEMENT,
+        amount=-amount,
+        reference_id=str(bet_id)
+    ))
+    return bet_id
+
+async def _rejected(db: AsyncSession, user_id: int, market_id: int, bet_in: BetCreate,
+                    idempotency_key: Optional[str], now: datetime) -> dict:
+    """
+    Why a placement wrote nothing: a replayed idempotency key returns the original
+    bet, anything else is raised.
+    """
+    if idempotency_key is not None:
+        result = await db.execute(
+            select(Bet).where(Bet.user_id == user_id, Bet.idempotency_key == idempotency_key)
+        )
+        existing = result.scalars().first()
+        if existing is not None:
+            if (existing.market_id, existing.direction.value, existing.amount) != (market_id, bet_in.direction.value, bet_in.amount):
+                raise HTTPException(status_code=409, detail="Idempotency key already used for a different bet")
+            return _bet_out(existing)
+
+    market = await db.get(Market, market_id)
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+    if market.status != MarketStatus.OPEN or market.close_time.replace(tzinfo=None) <= now:
+        raise HTTPException(status_code=400, detail="Market is not open for betting")
+    raise HTTPException(status_code=400, detail="Insufficient balance")
+
+async def place_bet(db: AsyncSession, user: User, bet_in: BetCreate, idempotency_key: Optional[str] = None):
+    """
+    Debits the wallet, records the bet and its ledger row in one statement (PostgreSQL)
+    that only writes if the market is open, the balance covers the stake and
+    `idempotency_key` was not used yet. A retry with the same key returns the first bet.
+    """
+    market_id = _market_id(bet_in)
+    amount = Decimal(str(bet_in.amount))
+    now = datetime.utcnow()
+
+    place = _place_single_statement if db.bind.dialect.name == "postgresql" else _place_statements
+    try:
+        bet_id = await place(db, user.id, market_id, bet_in, amount, idempotency_key, now)
+    except IntegrityError:
+        # A concurrent request with the same idempotency key won
+        await db.rollback()
+        bet_id = None
+
+    if bet_id is None:
+        await db.rollback()
+        return await _rejected(db, user.id, market_id, bet_in, idempotency_key, now)
+
     await db.commit()
-    await db.refresh(db_bet)
-    return db_bet
+    return {
+        "id": str(bet_id),
+        "marketId": str(market_id),
+        "direction": bet_in.direction,
+        "amount": bet_in.amount,
+        "result": BetResult.PENDING,
+    }
+
+def _markets_open(market_ids: List[int], now: datetime):
+    # All distinct markets of a batch still open, checked inside the debit
+    open_count = (
+        select(func.count())
+        .select_from(Market)
+        .where(
+            Market.id.in_(market_ids),
+            Market.status == MarketStatus.OPEN,
+            Market.close_time > now
+        )
+        .scalar_subquery()
+    )
+    return open_count == len(market_ids)
+
+async def _plan_batch(db: AsyncSession, user_id: int, bets: List[BetCreate], now: datetime):
+    """
+    Splits a batch into accepted items and errors, from one read of its markets and
+    the wallet balance. Items are accepted in order while the balance covers them.
+    """
+    market_ids = {}
+    for i, bet_in in enumerate(bets):
+        try:
+            market_ids[i] = int(bet_in.marketId)
+        except ValueError:
+            pass
+
+    # One row per existing market, each carrying the balance (NULL without a wallet)
+    balance = select(Wallet.balance).where(Wallet.user_id == user_id).scalar_subquery()
+    result = await db.execute(
+        select(Market.id, Market.status, Market.close_time, balance)
+        .where(Market.id.in_(set(market_ids.values())))
+    )
+    rows = result.all()
+    funds = rows[0][3] if rows and rows[0][3] is not None else Decimal(0)
+    markets = {market_id: (status, close_time) for market_id, status, close_time, _ in rows}
+
+    accepted: Dict[int, int] = {}
+    errors: Dict[int, str] = {}
+    total = Decimal(0)
+    for i, bet_in in enumerate(bets):
+        market = markets.get(market_ids.get(i))
+        amount = Decimal(str(bet_in.amount))
+        if market is None:
+            errors[i] = "Market not found"
+        elif market[0] != MarketStatus.OPEN or market[1].replace(tzinfo=None) <= now:
+            errors[i] = "Market is not open for betting"
+        elif total + amount > funds:
+            errors[i] = "Insufficient balance"
+        else:
+            accepted[i] = market_ids[i]
+            total += amount
+    return accepted, errors, total
+
+async def place_bets(db: AsyncSession, user: User, bets: List[BetCreate], mode: BatchMode) -> dict:
+    """
+    Places many bets with one wallet debit for their total and bulk inserts of the
+    bets and their ledger rows, in one transaction.
+    The debit re-checks the balance and that every market is still open; if either
+    moved since the batch was planned, the plan is rebuilt (up to BATCH_ATTEMPTS).
+    """
+    for _ in range(BATCH_ATTEMPTS):
+        now = datetime.utcnow()
+        # 1. Validate every market and the balance in one query
+        accepted, errors, total = await _plan_batch(db, user.id, bets, now)
+        if errors and mode == BatchMode.ALL_OR_NOTHING:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=[
+                {"index": i, "error": error} for i, error in sorted(errors.items())
+            ])
+        if not accepted:
+            await db.rollback()
+            break
+
+        # 2. One conditional debit for the whole batch
+        result = await db.execute(_debit(user.id, total, _markets_open(sorted(set(accepted.values())), now), None))
+        if result.first() is not None:
+            break
+        await db.rollback()
+    else:
+        raise HTTPException(status_code=409, detail="Markets or balance changed during placement, retry")
+
+    placed = {}
+    if accepted:
+        # 3. Bulk insert bets, then one ledger row per bet
+        indexes = sorted(accepted)
+        result = await db.execute(
+            insert(Bet).returning(Bet.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user.id,
+                    "market_id": accepted[i],
+                    "amount": bets[i].amount,
+                    "direction": BetDirection(bets[i].direction.value),
+                    "odds": FIXED_ODDS,
+                    "result": BetResult.PENDING,
+                }
+                for i in indexes
+            ]
+        )
+        placed = dict(zip(indexes, result.scalars().all()))
+        await db.execute(insert(WalletLedger), [
+            {
+                "wallet_id": user.id,
+                "type": TransactionType.BET_PLACEMENT,
+                "amount": -Decimal(str(bets[i].amount)),
+                "reference_id": str(bet_id),
+            }
+            for i, bet_id in placed.items()
+        ])
+        await db.commit()
 
-from sqlalchemy.future import select # Inner import fix
+    return {
+        "items": [
+            {
+                "index": i,
+                "bet": {
+                    "id": str(placed[i]),
+                    "marketId": str(accepted[i]),
+                    "direction": bet_in.direction,
+                    "amount": bet_in.amount,
+                    "result": BetResult.PENDING,
+                } if i in placed else None,
+                "error": errors.get(i),
+            }
+            for i, bet_in in enumerate(bets)
+        ],
+        "placed": len(placed),
+        "staked": float(total) if placed else 0.0,
+    }
@@ -1,29 +1,35 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, and_
-from datetime import datetime
+from sqlalchemy import update, insert, and_, or_, exists, bindparam
+from collections import defaultdict
+from datetime import datetime, timedelta
+from celery import group
+from src.config.config import settings
 from src.modules.markets.models import Market, MarketStatus
-from src.modules.assets.models import MacroEventHistory
-from typing import List
+from src.modules.assets.models import MacroEventHistory, PriceSnapshot, SnapshotType
+from src.common.cache.reference_data import reference_data
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MarketManager:
     @staticmethod
-    async def close_expired_markets(db: AsyncSession):
+    async def close_expired_markets(db: AsyncSession, event_ids: Optional[List[int]] = None):
         """
         Transition OPEN markets to CLOSED when close_time is reached.
+        `event_ids` limits the transition to markets of those events.
         """
         now = datetime.utcnow()
+        conditions = [
+            Market.status == MarketStatus.OPEN,
+            Market.close_time <= now
+        ]
+        if event_ids is not None:
+            conditions.append(Market.event_id.in_(event_ids))
         stmt = (
             update(Market)
-            .where(
-                and_(
-                    Market.status == MarketStatus.OPEN,
-                    Market.close_time <= now
-                )
-            )
+            .where(and_(*conditions))
             .values(status=MarketStatus.CLOSED)
         )
         result = await db.execute(stmt)
@@ -32,59 +38,155 @@ class MarketManager:
             logger.info(f"Closed {result.rowcount} expired markets")
 
     @staticmethod
-    async def capture_t0_prices(db: AsyncSession, price_fetcher):
+    async def capture_t0_prices(db: AsyncSession, price_fetcher, event_ids: Optional[List[int]] = None):
         """
         Identify markets at T0 (publish_time) and capture base_price if not yet captured.
+        `event_ids` limits the capture to markets of those events.
+        Returns the number of markets left without a base price (no price fetched).
         """
         now = datetime.utcnow()
+        conditions = [
+            Market.status == MarketStatus.CLOSED,
+            MacroEventHistory.publish_time <= now,
+            Market.base_price == None
+        ]
+        if event_ids is not None:
+            conditions.append(Market.event_id.in_(event_ids))
         query = (
-            select(Market, Asset.symbol)
+            select(Market)
             .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
-            .join(Asset, Market.asset_id == Asset.id)
-            .where(
-                and_(
-                    Market.status == MarketStatus.CLOSED,
-                    MacroEventHistory.publish_time <= now,
-                    Market.base_price == None
-                )
-            )
+            .where(and_(*conditions))
         )
         result = await db.execute(query)
-        matches = result.all()
-        
-        for market, symbol in matches:
-            price = await price_fetcher.fetch_current_price(symbol)
+        markets = result.scalars().all()
+        if not markets:
+            return 0
+
+        # Symbols from the reference data cache
+        assets = (await reference_data.get(db, {m.asset_id for m in markets})).assets
+        matches = [(market, assets[market.asset_id]) for market in markets if market.asset_id in assets]
+
+        # One concurrent fetch per distinct symbol
+        prices = await price_fetcher.fetch_prices(
+            [asset.symbol for _, asset in matches],
+            {asset.symbol: asset.asset_class for _, asset in matches}
+        )
+
+        captured = 0
+        for market, asset in matches:
+            price = prices.get(asset.symbol)
+            if price is None:
+                continue
             market.base_price = price
-            logger.info(f"Captured T0 base price {price} for market {market.id} ({symbol})")
+            captured += 1
+            logger.info(f"Captured T0 base price {price} for market {market.id} ({asset.symbol})")
         
         await db.commit()
+        return len(markets) - captured
 
     @staticmethod
-    async def trigger_eligible_settlements(db: AsyncSession, price_fetcher, dispatch_settlement_task):
+    async def trigger_eligible_settlements(db: AsyncSession, price_fetcher, dispatch_settlement_task,
+                                           event_ids: Optional[List[int]] = None):
         """
         Find markets ready for settlement, fetch T30 price, and dispatch background tasks.
+        `event_ids` limits the search to markets of those events.
+
+        Markets are claimed atomically (CLOSED -> SETTLING with a dispatched_at lease), so
+        each one is dispatched exactly once; a market still SETTLING after
+        SETTLEMENT_LEASE_SECONDS is claimed again. The T30 price is captured once, stored
+        on the market (and as a T30 snapshot) before dispatch and reused on re-dispatch.
+        Tasks go out as one Celery group per event.
+        Returns the number of claimed markets released for lack of a T30 price.
         """
         now = datetime.utcnow()
-        query = (
-            select(Market, Asset.symbol)
-            .join(MacroEventHistory, Market.event_id == MacroEventHistory.id)
-            .join(Asset, Market.asset_id == Asset.id)
-            .where(
+        lease_expired = now - timedelta(seconds=settings.SETTLEMENT_LEASE_SECONDS)
+        conditions = [
+            or_(
+                Market.status == MarketStatus.CLOSED,
+                and_(Market.status == MarketStatus.SETTLING, Market.dispatched_at <= lease_expired)
+            ),
+            Market.settle_time <= now,
+            Market.base_price != None,
+            exists().where(
                 and_(
-                    Market.status == MarketStatus.CLOSED,
-                    Market.settle_time <= now,
-                    Market.base_price != None,
+                    MacroEventHistory.id == Market.event_id,
                     MacroEventHistory.actual_value != None
                 )
             )
+        ]
+        if event_ids is not None:
+            conditions.append(Market.event_id.in_(event_ids))
+
+        # 1. Claim; a concurrent tick (or replica) cannot claim the same rows
+        result = await db.execute(
+            update(Market)
+            .where(and_(*conditions))
+            .values(status=MarketStatus.SETTLING, dispatched_at=now)
+            .returning(Market.id)
+            .execution_options(synchronize_session=False)
         )
-        result = await db.execute(query)
-        eligible = result.all()
-        
-        for market, symbol in eligible:
-            # 1. Fetch T30 price
-            t30_price = await price_fetcher.fetch_current_price(symbol)
-            
-            # 2. Dispatch background task
-            dispatch_settlement_task.delay(market.id, t30_price)
-            logger.info(f"Dispatched settlement task for market {market.id} with T30 price {t30_price}")
+        claimed_ids = result.scalars().all()
+        await db.commit()
+        if not claimed_ids:
+            return 0
+
+        result = await db.execute(
+            select(Market.id, Market.event_id, Market.asset_id, Market.settlement_price)
+            .where(Market.id.in_(claimed_ids))
+        )
+        claimed = result.all()
+        # Symbols from the reference data cache
+        assets = (await reference_data.get(db, {m.asset_id for m in claimed})).assets
+
+        # 2. Fetch T30 prices for markets without one, one concurrent fetch per distinct symbol.
+        # A market whose asset is missing from the snapshot gets no price and is released
+        unpriced = [(m, assets.get(m.asset_id)) for m in claimed if m.settlement_price is None]
+        symbols = [asset for _, asset in unpriced if asset is not None]
+        prices = await price_fetcher.fetch_prices(
+            [asset.symbol for asset in symbols],
+            {asset.symbol: asset.asset_class for asset in symbols}
+        )
+
+        t30_prices = {m.id: m.settlement_price for m in claimed if m.settlement_price is not None}
+        released = []
+        snapshots = {}
+        for m, asset in unpriced:
+            price = prices.get(asset.symbol) if asset is not None else None
+            if price is None:
+                released.append(m.id)
+                continue
+            t30_prices[m.id] = price
+            snapshots[m.asset_id] = price
+
+        # 3. Persist the T30 prices before dispatch; markets without a price go back to CLOSED
+        fresh = [{"b_id": m.id, "b_price": t30_prices[m.id]} for m, _ in unpriced if m.id in t30_prices]
+        if fresh:
+            await db.execute(
+                update(Market.__table__)
+                .where(Market.__table__.c.id == bindparam("b_id"))
+                .values(settlement_price=bindparam("b_price")),
+                fresh
+            )
+            await db.execute(insert(PriceSnapshot), [
+                {"asset_id": asset_id, "timestamp": now, "price": price, "snapshot_type": SnapshotType.T30}
+                for asset_id, price in snapshots.items()
+            ])
+        if released:
+            await db.execute(
+                update(Market)
+                .where(Market.id.in_(released))
+                .values(status=MarketStatus.CLOSED, dispatched_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            logger.warning(f"No T30 price for {len(released)} markets, released for the next tick")
+        await db.commit()
+
+        # 4. Dispatch one task per market, grouped by event
+        by_event = defaultdict(list)
+        for m in claimed:
+            if m.id in t30_prices:
+                by_event[m.event_id].append(dispatch_settlement_task.s(m.id, t30_prices[m.id]))
+        for event_id, tasks in by_event.items():
+            group(tasks).apply_async()
+            logger.info(f"Dispatched {len(tasks)} settlement tasks for event {event_id}")
+        return len(released)
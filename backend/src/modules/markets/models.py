@@ -1,13 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum as SQLEnum, UniqueConstraint, Index, true
 import enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from src.common.database.database import Base
+from src.common.versioning import track_table_changes
 
 class MarketStatus(str, enum.Enum):
     UPCOMING = "UPCOMING"
     OPEN = "OPEN"
     CLOSED = "CLOSED"
+    SETTLING = "SETTLING"
     SETTLED = "SETTLED"
 
 class BetDirection(str, enum.Enum):
@@ -34,6 +36,17 @@ class Market(Base):
     base_price = Column(Float, nullable=True)
     # Resulting price at T+30m
     settlement_price = Column(Float, nullable=True)
+    # Settlement task dispatch lease (status SETTLING); re-dispatched once expired
+    dispatched_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('asset_id', 'event_id', name='_market_asset_event_uc'),
+        # Listing: keyset pagination on (close_time, id), alone or behind one filter
+        Index('ix_markets_close_time_id', 'close_time', 'id'),
+        Index('ix_markets_status_close_time_id', 'status', 'close_time', 'id'),
+        Index('ix_markets_asset_id_close_time_id', 'asset_id', 'close_time', 'id'),
+        Index('ix_markets_event_id_close_time_id', 'event_id', 'close_time', 'id'),
+    )
 
     # Relationships
     bets = relationship("Bet", back_populates="market")
@@ -50,10 +63,23 @@ class Bet(Base):
     odds = Column(Float, default=2.0) # Simplified fixed odds for MVP
     result = Column(SQLEnum(BetResult), default=BetResult.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Client-supplied Idempotency-Key; a retry with the same key returns this bet
+    idempotency_key = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'idempotency_key', name='_bet_user_idempotency_uc'),
+    )
 
     # Relationships
     market = relationship("Market", back_populates="bets")
 
+# Bet history: keyset pages of one user's bets, newest first, answered from the index alone
+Index(
+    'ix_bets_user_id_created_at_id',
+    Bet.user_id, Bet.created_at.desc(), Bet.id.desc(),
+    postgresql_include=['market_id', 'direction', 'amount', 'odds', 'result']
+)
+
 class Settlement(Base):
     __tablename__ = "settlements"
 
@@ -65,5 +91,29 @@ class Settlement(Base):
     price_at_t30 = Column(Float, nullable=False)
     settled_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Chunked settlement checkpoint: bets with id <= last_bet_id are already settled
+    last_bet_id = Column(Integer, nullable=False, default=0, server_default="0")
+    is_complete = Column(Boolean, nullable=False, default=True, server_default=true())
+
     # Relationships
     market = relationship("Market", back_populates="settlement")
+
+# Version counter behind the market listing's ETag
+track_table_changes(Market.__tablename__)
+
+class MarketGenerationState(Base):
+    __tablename__ = "market_generation_state"
+
+    # Single row (id = 1)
+    id = Column(Integer, primary_key=True)
+    # Events / assets with id <= these have already been crossed with everything
+    last_event_id = Column(Integer, nullable=False, default=0, server_default="0")
+    last_asset_id = Column(Integer, nullable=False, default=0, server_default="0")
+    # Highest ids seen at pending_since; they become the watermarks once
+    # MARKET_WATERMARK_LAG_SECONDS have passed (lower ids may still be committing)
+    pending_event_id = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_asset_id = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_since = Column(DateTime(timezone=True), nullable=True)
+    # Events publishing up to this time have entered the generation window
+    horizon_end = Column(DateTime(timezone=True), nullable=True)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,30 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import tuple_
 from typing import List, Optional
+from datetime import datetime
 from src.common.database.database import get_db
-from src.modules.markets.models import Market as MarketModel
-from src.modules.markets.schemas import Market
+from src.common.pagination import encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.common.versioning import get_version, weak_etag, etag_matches
+from src.modules.markets.models import Market as MarketModel, MarketStatus
+from src.modules.markets.schemas import MarketPage
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Market])
-async def list_markets(assetId: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+@router.get("/", response_model=MarketPage)
+async def list_markets(
+    response: Response,
+    assetId: Optional[int] = None,
+    eventId: Optional[int] = None,
+    status: Optional[MarketStatus] = None,
+    closeFrom: Optional[datetime] = None,
+    closeTo: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Markets ordered by (close_time, id), one page at a time.
+    Responses carry a weak ETag tied to the markets change counter, so an unchanged
+    page is answered with 304 without querying the DB.
+    """
+    # Read the version before the rows, so a concurrent change can only make the ETag older
+    version = await get_version(MarketModel.__tablename__)
+    etag = None
+    if version is not None:
+        etag = weak_etag(MarketModel.__tablename__, version, assetId, eventId, status, closeFrom, closeTo, cursor, limit)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
     query = select(MarketModel)
-    if assetId:
+    if assetId is not None:
         query = query.where(MarketModel.asset_id == assetId)
-    
-    result = await db.execute(query)
+    if eventId is not None:
+        query = query.where(MarketModel.event_id == eventId)
+    if status is not None:
+        query = query.where(MarketModel.status == status)
+    if closeFrom is not None:
+        query = query.where(MarketModel.close_time >= closeFrom)
+    if closeTo is not None:
+        query = query.where(MarketModel.close_time < closeTo)
+    if cursor:
+        close_time, market_id = decode_cursor(cursor, datetime, int)
+        query = query.where(tuple_(MarketModel.close_time, MarketModel.id) > tuple_(close_time, market_id))
+
+    # One extra row tells whether there is a next page
+    result = await db.execute(query.order_by(MarketModel.close_time, MarketModel.id).limit(limit + 1))
     markets = result.scalars().all()
-    
+    next_cursor = None
+    if len(markets) > limit:
+        markets = markets[:limit]
+        next_cursor = encode_cursor(markets[-1].close_time, markets[-1].id)
+
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
     # Transform to match schema (e.g. odds might need transformation)
-    return [
-        {
-            "id": str(m.id),
-            "assetId": str(m.asset_id),
-            "eventId": str(m.event_id),
-            "status": m.status, # Market still has 'status' (UPCOMING/OPEN/CLOSED/SETTLED)
-            "odds": m.odds if hasattr(m, 'odds') else {"UP": 1.9, "DOWN": 1.9}
-        }
-        for m in markets
-    ]
+    return {
+        "items": [
+            {
+                "id": str(m.id),
+                "assetId": str(m.asset_id),
+                "eventId": str(m.event_id),
+                "status": m.status, # Market still has 'status' (UPCOMING/OPEN/CLOSED/SETTLING/SETTLED)
+                "odds": m.odds if hasattr(m, 'odds') else {"UP": 1.9, "DOWN": 1.9}
+            }
+            for m in markets
+        ],
+        "nextCursor": next_cursor,
+    }
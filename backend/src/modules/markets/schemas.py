@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 from enum import Enum
 
@@ -7,6 +7,7 @@ class MarketStatus(str, Enum):
     UPCOMING = "UPCOMING"
     OPEN = "OPEN"
     CLOSED = "CLOSED"
+    SETTLING = "SETTLING"
     SETTLED = "SETTLED"
 
 class Market(BaseModel):
@@ -18,3 +19,8 @@ class Market(BaseModel):
 
     class Config:
         from_attributes = True
+
+class MarketPage(BaseModel):
+    items: List[Market]
+    # Pass as `cursor` for the next page; None on the last page
+    nextCursor: Optional[str] = None
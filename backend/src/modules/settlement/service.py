@@ -1,23 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from decimal import Decimal
-from datetime import datetime
-from src.modules.markets.models import Market, MarketStatus, Bet, BetResult, BetDirection
-from src.modules.wallet.models import Wallet, WalletLedger, TransactionType
-from src.common.database.database import engine
+from src.modules.markets.models import Market, MarketStatus, Settlement
+from src.common.database.database import engine, CommitAwareSession
+from src.jobs.settlement_runner.run_settlement import settle_locked_market
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Create a sessionmaker for the worker (outside of FastAPI request context)
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=CommitAwareSession)
 
 class SettlementService:
     @staticmethod
     async def settle_market(market_id: int, settlement_price: float):
         """
-        Calculates winners, updates bet statuses, and distributes payouts.
-        Everything runs inside a single transaction.
+        Calculates winners, updates bet statuses, and distributes payouts with the
+        T30 price captured at dispatch. Everything runs inside a single transaction.
         """
         async with SessionLocal() as db:
             try:
@@ -35,58 +33,24 @@ class SettlementService:
                     logger.warning(f"Market {market_id} already settled")
                     return True
 
+                # A chunked settlement owns the market until its Settlement row is complete
+                result = await db.execute(
+                    select(Settlement.is_complete).where(Settlement.market_id == market_id)
+                )
+                is_complete = result.scalar()
+                if is_complete is not None:
+                    logger.warning(f"Market {market_id} has a settlement in progress (complete: {is_complete}), skipping")
+                    return bool(is_complete)
+
                 if market.base_price is None:
                     logger.error(f"Market {market_id} missing base_price")
                     return False
 
+                # 2. Same settlement as the runners: Settlement row (seen by rollback and
+                # resume), wallets locked once in user_id order, stats updated
                 market.settlement_price = settlement_price
-                market.status = MarketStatus.SETTLED
+                await settle_locked_market(db, market)
 
-                # 2. Determine Outcome
-                price_change = settlement_price - market.base_price
-                if price_change > 0:
-                    winning_direction = BetDirection.UP
-                elif price_change < 0:
-                    winning_direction = BetDirection.DOWN
-                else:
-                    # Stagnant price - in binary market, usually House wins or push. 
-                    # For MVP: treat as LOST for both directions.
-                    winning_direction = None
-                
-                # 3. Resolve Bets
-                result = await db.execute(
-                    select(Bet).where(Bet.market_id == market_id, Bet.result == BetResult.PENDING)
-                )
-                bets = result.scalars().all()
-                
-                for bet in bets:
-                    if winning_direction and bet.direction == winning_direction:
-                        bet.result = BetResult.WON
-                        # odds are stored as float, convert to Decimal for precise calculation
-                        payout_amount = Decimal(str(bet.amount)) * Decimal(str(bet.odds))
-                        
-                        # 4. Update User Wallet
-                        res_wallet = await db.execute(
-                            select(Wallet).where(Wallet.user_id == bet.user_id).with_for_update()
-                        )
-                        wallet = res_wallet.scalars().first()
-                        
-                        if wallet:
-                            wallet.balance += payout_amount
-                            
-                            # 5. Log Transaction
-                            db_transaction = WalletLedger(
-                                wallet_id=wallet.id,
-                                type=TransactionType.PAYOUT,
-                                amount=payout_amount,
-                                reference_id=str(bet.id)
-                            )
-                            db.add(db_transaction)
-                        else:
-                            logger.error(f"Wallet not found for user_id {bet.user_id} in bet {bet.id}")
-                    else:
-                        bet.result = BetResult.LOST
-                
                 await db.commit()
                 logger.info(f"Successfully settled market {market_id} with price {settlement_price}")
                 return True
@@ -31,7 +31,7 @@ class WalletLedger(Base):
     type = Column(SQLEnum(TransactionType), nullable=False)
     amount = Column(Numeric(precision=18, scale=8), nullable=False)
     # reference_id can point to a bet_id or a deposit_id
-    reference_id = Column(String, nullable=True)
+    reference_id = Column(String, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -1,37 +1,147 @@
+import asyncio
+import logging
 import random
+import time
 from datetime import datetime
-from src.modules.assets.models import Asset
+from typing import Dict, Iterable, Optional, Tuple
+from src.config.config import settings
+from src.modules.assets.models import Asset, AssetCategory
+from src.utils.price_sources import get_price_router
+from src.common.cache.price_store import PriceStore
+
+logger = logging.getLogger(__name__)
 
 class DataFetcher:
     """
     Utility for fetching asset prices and macro data.
-    In MVP, this simulates data if external APIs are unavailable.
+    Prices come from the source router in price_sources.py (simulated sources in MVP).
+
+    Price lookups go through a short TTL cache (PRICE_CACHE_TTL_SECONDS) and are
+    single-flight: concurrent callers for the same symbol share one upstream request.
+    Misses check the shared Redis store (PriceStore) before going upstream, and
+    upstream results are published there. Upstream requests are capped at
+    PRICE_FETCH_CONCURRENCY at a time.
     """
-    
+    # symbol -> (price, expires_at on the monotonic clock)
+    _cache: Dict[str, Tuple[float, float]] = {}
+    # symbol -> upstream request in flight
+    _inflight: Dict[str, asyncio.Task] = {}
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+    stats = {"hits": 0, "misses": 0, "coalesced": 0, "store_hits": 0, "upstream_requests": 0}
+
     @staticmethod
-    async def fetch_current_price(symbol: str) -> float:
+    async def fetch_live_price(symbol: str, asset_class: Optional[AssetCategory] = None) -> float:
         """
-        Fetch price from Polygon.io or fallback to simulation.
-        Prices updated for Dec 2025 context.
+        Fetch price through the multi-source router (priority failover, hedged requests).
+        Bypasses the cache.
         """
-        simulated_prices = {
-            "BTC": 88436.39,
-            "ETH": 2976.20,
-            "SP500": 6834.49,
-            "GOLD": 4338.38,
-            "SILVER": 67.40,
-            "US10Y": 4.14
+        return await get_price_router().fetch(symbol, asset_class)
+
+    @staticmethod
+    def _get_semaphore() -> asyncio.Semaphore:
+        # Semaphores bind to one event loop; Celery tasks may run on a fresh loop each time
+        loop = asyncio.get_running_loop()
+        if DataFetcher._semaphore is None or DataFetcher._semaphore_loop is not loop:
+            DataFetcher._semaphore = asyncio.Semaphore(settings.PRICE_FETCH_CONCURRENCY)
+            DataFetcher._semaphore_loop = loop
+        return DataFetcher._semaphore
+
+    @staticmethod
+    def _remember(symbol: str, price: float):
+        if settings.PRICE_CACHE_TTL_SECONDS > 0:
+            DataFetcher._cache[symbol] = (price, time.monotonic() + settings.PRICE_CACHE_TTL_SECONDS)
+
+    @staticmethod
+    async def _fetch_and_cache(symbol: str, asset_class: Optional[AssetCategory], check_store: bool) -> float:
+        # Another process may have fetched it recently
+        shared = await PriceStore.get_many([symbol], max_age=settings.PRICE_STORE_MAX_AGE_SECONDS) if check_store else {}
+        if symbol in shared:
+            DataFetcher.stats["store_hits"] += 1
+            price = shared[symbol][0]
+        else:
+            async with DataFetcher._get_semaphore():
+                DataFetcher.stats["upstream_requests"] += 1
+                price = await DataFetcher.fetch_live_price(symbol, asset_class)
+            await PriceStore.publish({symbol: (price, time.time())})
+        DataFetcher._remember(symbol, price)
+        return price
+
+    @staticmethod
+    async def _get_price(symbol: str, asset_class: Optional[AssetCategory], check_store: bool = True) -> float:
+        cached = DataFetcher._cache.get(symbol)
+        if cached and cached[1] > time.monotonic():
+            DataFetcher.stats["hits"] += 1
+            return cached[0]
+
+        loop = asyncio.get_running_loop()
+        task = DataFetcher._inflight.get(symbol)
+        if task is not None and task.get_loop() is loop:
+            DataFetcher.stats["coalesced"] += 1
+        else:
+            DataFetcher.stats["misses"] += 1
+            task = loop.create_task(DataFetcher._fetch_and_cache(symbol, asset_class, check_store))
+            DataFetcher._inflight[symbol] = task
+
+            def _done(t: asyncio.Task, symbol: str = symbol):
+                if DataFetcher._inflight.get(symbol) is t:
+                    del DataFetcher._inflight[symbol]
+
+            task.add_done_callback(_done)
+
+        # Shielded: a cancelled caller must not cancel the request other callers share
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def fetch_current_price(symbol: str, asset_class: Optional[AssetCategory] = None) -> float:
+        """
+        Current price of a symbol: local TTL cache, then the shared store, then upstream.
+        """
+        return await DataFetcher._get_price(symbol, asset_class)
+
+    @staticmethod
+    async def fetch_prices(symbols: Iterable[str], asset_classes: Optional[Dict[str, AssetCategory]] = None) -> Dict[str, float]:
+        """
+        Current prices of many symbols, fetched concurrently (one request per distinct symbol).
+        `asset_classes` (symbol -> class) selects each symbol's source route.
+        Symbols whose lookup fails are logged and left out of the result.
+        """
+        asset_classes = asset_classes or {}
+        unique = list(dict.fromkeys(symbols))
+
+        # Warm the local cache from the shared store in one round trip
+        now = time.monotonic()
+        stale = [s for s in unique if not (s in DataFetcher._cache and DataFetcher._cache[s][1] > now)]
+        shared = await PriceStore.get_many(stale, max_age=settings.PRICE_STORE_MAX_AGE_SECONDS)
+        for symbol, (price, _) in shared.items():
+            DataFetcher.stats["store_hits"] += 1
+            DataFetcher._remember(symbol, price)
+
+        # Store misses are already known, go straight upstream for them
+        results = await asyncio.gather(
+            *[DataFetcher._get_price(symbol, asset_classes.get(symbol), check_store=False) for symbol in unique],
+            return_exceptions=True
+        )
+        prices = {}
+        for symbol, result in zip(unique, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to fetch price for {symbol}: {result}")
+                continue
+            prices[symbol] = result
+        return prices
+
+    @staticmethod
+    def cache_stats() -> dict:
+        lookups = DataFetcher.stats["hits"] + DataFetcher.stats["misses"] + DataFetcher.stats["coalesced"]
+        return {
+            **DataFetcher.stats,
+            "hit_ratio": round(DataFetcher.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "cached_symbols": len(DataFetcher._cache),
         }
-        
-        # Check for direct match or substring match
-        for key, price in simulated_prices.items():
-            if key in symbol or symbol in key:
-                 # Add small jitter
-                jitter = random.uniform(-0.001, 0.001) * price
-                return round(price + jitter, 2)
-
-        # Fallback
-        return round(random.uniform(50000, 60000), 2) if "BTC" in symbol else round(random.uniform(100, 200), 2)
+
+    @staticmethod
+    def clear_cache():
+        DataFetcher._cache.clear()
 
     @staticmethod
     async def fetch_macro_actual(event_code: str) -> float:
@@ -0,0 +1,241 @@
+import abc
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+from src.config.config import settings
+from src.modules.assets.models import AssetCategory
+
+logger = logging.getLogger(__name__)
+
+class SourceConfig(NamedTuple):
+    name: str
+    priority: int  # 1 = highest
+
+# Data source registry per asset class (docs/Data.md, sections 1.5 and 2.1).
+# Poll pacing is per asset class and event window, see POLL_INTERVALS in jobs/price_ingestion.py
+SOURCE_REGISTRY: Dict[AssetCategory, List[SourceConfig]] = {
+    AssetCategory.CRYPTO: [SourceConfig("Binance", 1), SourceConfig("TradingView", 2), SourceConfig("CoinGecko", 3)],
+    AssetCategory.EQUITY: [SourceConfig("Polygon", 1), SourceConfig("Yahoo", 2), SourceConfig("TradingView", 3)],
+    AssetCategory.INDEX: [SourceConfig("TradingView", 1), SourceConfig("Polygon", 2), SourceConfig("CME", 3)],
+    AssetCategory.FOREX: [SourceConfig("OANDA", 1), SourceConfig("TradingView", 2), SourceConfig("ECB", 3)],
+    AssetCategory.COMMODITY: [SourceConfig("CME", 1), SourceConfig("TradingView", 2), SourceConfig("Reuters", 3)],
+    AssetCategory.RATES: [SourceConfig("FRED", 1), SourceConfig("TradingView", 2), SourceConfig("Treasury", 3)],
+}
+# Used when the asset class of a symbol is unknown
+DEFAULT_SOURCES = [SourceConfig("TradingView", 1)]
+
+# EWMA smoothing factor for per-source latency and error rate
+EWMA_ALPHA = 0.2
+# A source is routed after healthy ones once its error EWMA passes this rate
+MAX_ERROR_RATE = 0.5
+# A degraded source without new samples for this long is tried in priority order again
+RECOVERY_AFTER = 30.0
+
+class PriceSourceError(Exception):
+    pass
+
+class PriceSource(abc.ABC):
+    """
+    One upstream price provider. Subclasses implement `fetch`.
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    async def fetch(self, symbol: str) -> float:
+        ...
+
+class SimulatedSource(PriceSource):
+    """
+    MVP stand-in for a real provider: reference prices with small jitter.
+    Prices updated for Dec 2025 context.
+    """
+    SIMULATED_PRICES = {
+        "BTC": 88436.39,
+        "ETH": 2976.20,
+        "SP500": 6834.49,
+        "GOLD": 4338.38,
+        "SILVER": 67.40,
+        "US10Y": 4.14
+    }
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def fetch(self, symbol: str) -> float:
+        # Check for direct match or substring match
+        for key, price in self.SIMULATED_PRICES.items():
+            if key in symbol or symbol in key:
+                # Add small jitter
+                jitter = random.uniform(-0.001, 0.001) * price
+                return round(price + jitter, 2)
+
+        # Fallback
+        return round(random.uniform(50000, 60000), 2) if "BTC" in symbol else round(random.uniform(100, 200), 2)
+
+class FakeSource(PriceSource):
+    """
+    Local fake with injectable latency, failure rate and stalls, for tests and benchmarks.
+    """
+    def __init__(self, name: str, latency: float = 0.0, jitter: float = 0.0, fail_rate: float = 0.0,
+                 stall: bool = False, price: Callable[[str], float] = lambda symbol: 100.0, seed: int = 42):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.stall = stall
+        self.price = price
+        self.calls = 0
+        self.rng = random.Random(seed)
+
+    async def fetch(self, symbol: str) -> float:
+        self.calls += 1
+        if self.stall:
+            # Hangs until cancelled
+            await asyncio.Event().wait()
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.fail_rate:
+            raise PriceSourceError(f"{self.name} failed for {symbol}")
+        return self.price(symbol)
+
+class SourceHealth:
+    """
+    Exponentially weighted latency (seconds) and error rate of one source.
+    """
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.last_sample = 0.0
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        self.last_sample = time.monotonic()
+        self.latency = latency if self.latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency
+        self.error_rate = EWMA_ALPHA * (0.0 if ok else 1.0) + (1 - EWMA_ALPHA) * self.error_rate
+
+    def degraded(self, latency_budget: float) -> bool:
+        if time.monotonic() - self.last_sample > RECOVERY_AFTER:
+            return False
+        return self.error_rate > MAX_ERROR_RATE or (self.latency is not None and self.latency > latency_budget)
+
+class PriceRouter:
+    """
+    Routes price lookups over the registered sources of an asset class.
+    Sources are tried in priority order, with degraded ones (error or latency EWMA
+    over budget) moved to the back. If the current source has not answered within the
+    hedge delay, the next one is raced against it; a failure fails over immediately.
+    The first successful answer wins and the rest are cancelled.
+    """
+    def __init__(self, registry: Optional[Dict[AssetCategory, List[SourceConfig]]] = None,
+                 hedge_delay: Optional[float] = None, timeout: Optional[float] = None):
+        self.registry = registry if registry is not None else SOURCE_REGISTRY
+        self.hedge_delay = hedge_delay if hedge_delay is not None else settings.PRICE_HEDGE_DELAY_MS / 1000
+        self.timeout = timeout if timeout is not None else settings.PRICE_FETCH_TIMEOUT_MS / 1000
+        self.sources: Dict[str, PriceSource] = {}
+        self.health: Dict[str, SourceHealth] = {}
+
+    def register(self, source: PriceSource):
+        self.sources[source.name] = source
+        self.health.setdefault(source.name, SourceHealth())
+
+    def route(self, asset_class: Optional[AssetCategory]) -> List[PriceSource]:
+        """
+        Registered sources for an asset class in the order they will be tried.
+        """
+        configs = self.registry.get(asset_class, DEFAULT_SOURCES) if asset_class is not None else DEFAULT_SOURCES
+        ranked = sorted(
+            (c for c in configs if c.name in self.sources),
+            key=lambda c: (self.health[c.name].degraded(self.hedge_delay), c.priority)
+        )
+        return [self.sources[c.name] for c in ranked]
+
+    async def _timed_fetch(self, source: PriceSource, symbol: str) -> float:
+        start = time.perf_counter()
+        try:
+            price = await source.fetch(symbol)
+        except asyncio.CancelledError:
+            # Lost a hedge race or timed out: still a (lower-bound) latency sample
+            self.health[source.name].record(time.perf_counter() - start, ok=True)
+            raise
+        except Exception:
+            self.health[source.name].record(time.perf_counter() - start, ok=False)
+            raise
+        self.health[source.name].record(time.perf_counter() - start, ok=True)
+        return price
+
+    async def fetch(self, symbol: str, asset_class: Optional[AssetCategory] = None,
+                    hedge_delay: Optional[float] = None, timeout: Optional[float] = None) -> float:
+        candidates = self.route(asset_class)
+        if not candidates:
+            raise PriceSourceError(f"No price source registered for {symbol} ({asset_class})")
+
+        hedge_delay = hedge_delay if hedge_delay is not None else self.hedge_delay
+        timeout = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = {}
+        errors = []
+
+        def launch():
+            source = candidates.pop(0)
+            pending[asyncio.ensure_future(self._timed_fetch(source, symbol))] = source
+
+        launch()
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wait = min(hedge_delay, remaining) if candidates else remaining
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Over the latency budget: hedge with the next source
+                    if candidates:
+                        logger.debug(f"Hedging {symbol}: {', '.join(s.name for s in pending.values())} over budget")
+                        launch()
+                    continue
+
+                for task in done:
+                    source = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{source.name}: {task.exception()}")
+                    # Failover: replace the failed request with the next source
+                    if candidates:
+                        launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise PriceSourceError(f"All price sources failed for {symbol}: {'; '.join(errors) or 'timed out'}")
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "requests": h.requests,
+                "latency_ms": round(h.latency * 1000, 2) if h.latency is not None else None,
+                "error_rate": round(h.error_rate, 4),
+            }
+            for name, h in self.health.items()
+        }
+
+_router: Optional[PriceRouter] = None
+
+def get_price_router() -> PriceRouter:
+    """
+    Process-wide router. Until real provider clients exist, every registry
+    source is backed by SimulatedSource.
+    """
+    global _router
+    if _router is None:
+        _router = PriceRouter()
+        names = {c.name for configs in SOURCE_REGISTRY.values() for c in configs}
+        names.update(c.name for c in DEFAULT_SOURCES)
+        for name in sorted(names):
+            _router.register(SimulatedSource(name))
+    return _router
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests run against a throwaway SQLite file; set before src.config is imported
+_db_dir = tempfile.mkdtemp(prefix="macropredict-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.database.database import engine, Base  # noqa: E402
+# Register every table on Base.metadata
+from src.modules.users import models as _users  # noqa: E402,F401
+from src.modules.assets import models as _assets  # noqa: E402,F401
+from src.modules.markets import models as _markets  # noqa: E402,F401
+from src.modules.wallet import models as _wallet  # noqa: E402,F401
+
+engine.sync_engine.echo = False
+
+async def _reset_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture
+def db_schema():
+    """
+    Empty tables for one test. Tests drive async code with asyncio.run, so pooled
+    connections are dropped afterwards instead of outliving their event loop.
+    """
+    asyncio.run(_reset_schema())
+    yield
+    asyncio.run(engine.dispose())
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from src.common import guards
+from src.common.database.database import SessionLocal
+from src.main import app
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Bet, Market, MarketStatus
+from src.modules.users.models import User
+from src.modules.wallet.models import Wallet, WalletLedger
+
+async def seed():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": u, "email": f"u{u}@test", "hashed_password": "x"} for u in (1, 2)])
+        # User 2 has no wallet
+        await db.execute(insert(Wallet), [{"user_id": 1, "balance": Decimal("250")}])
+        await db.execute(insert(Asset), [
+            {"id": 1, "asset_id": "A1", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1", "symbol": "S1",
+             "name": "S1", "symbol_source": "test", "price_type": "Spot", "settlement_source": "test"}
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": e, "type_id": 1, "publish_time": now + timedelta(hours=2)} for e in (1, 2, 3)
+        ])
+        await db.execute(insert(Market), [
+            {"id": 1, "asset_id": 1, "event_id": 1, "status": MarketStatus.OPEN,
+             "close_time": now + timedelta(hours=1), "settle_time": now + timedelta(hours=3)},
+            {"id": 2, "asset_id": 1, "event_id": 2, "status": MarketStatus.OPEN,
+             "close_time": now + timedelta(hours=1), "settle_time": now + timedelta(hours=3)},
+            {"id": 3, "asset_id": 1, "event_id": 3, "status": MarketStatus.CLOSED,
+             "close_time": now - timedelta(hours=1), "settle_time": now + timedelta(hours=3)},
+        ])
+        await db.commit()
+
+async def post_batch(user_id, bets, mode=None):
+    app.dependency_overrides[guards.get_current_user] = lambda: User(id=user_id, email=f"u{user_id}@test")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            body = {"bets": bets, **({"mode": mode} if mode else {})}
+            return await client.post("/api/v1/bets/batch", json=body)
+    finally:
+        app.dependency_overrides.pop(guards.get_current_user, None)
+
+async def wallet_state(user_id):
+    async with SessionLocal() as db:
+        balance = (await db.execute(select(Wallet.balance).where(Wallet.user_id == user_id))).scalar()
+        bets = (await db.execute(select(func.count()).select_from(Bet).where(Bet.user_id == user_id))).scalar()
+        ledger = (await db.execute(select(func.coalesce(func.sum(WalletLedger.amount), 0)).where(WalletLedger.wallet_id == user_id))).scalar()
+    return balance, bets, Decimal(str(ledger))
+
+def bet(market_id, amount):
+    return {"marketId": str(market_id), "direction": "UP", "amount": amount}
+
+def test_per_item_places_valid_bets_with_one_debit(db_schema):
+    async def scenario():
+        await seed()
+        response = await post_batch(1, [bet(1, 100), bet(3, 10), bet(99, 10), bet("x", 10), bet(2, 100), bet(2, 100)], mode="PER_ITEM")
+        return response, await wallet_state(1)
+
+    response, (balance, bets, ledger) = asyncio.run(scenario())
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["error"] for item in body["items"]] == [
+        None, "Market is not open for betting", "Market not found", "Market not found", None, "Insufficient balance"
+    ]
+    assert (body["placed"], body["staked"]) == (2, 200.0)
+    assert (balance, bets, ledger) == (Decimal("50"), 2, Decimal("-200"))
+
+def test_all_or_nothing_rejects_without_writing(db_schema):
+    async def scenario():
+        await seed()
+        response = await post_batch(1, [bet(1, 100), bet(3, 10)])
+        return response, await wallet_state(1)
+
+    response, state = asyncio.run(scenario())
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"index": 1, "error": "Market is not open for betting"}]
+    assert state == (Decimal("250"), 0, Decimal("0"))
+
+def test_user_without_wallet_gets_insufficient_balance(db_schema):
+    async def scenario():
+        await seed()
+        return await post_batch(2, [bet(1, 10), bet(99, 10)], mode="PER_ITEM")
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert [item["error"] for item in response.json()["items"]] == ["Insufficient balance", "Market not found"]
@@ -0,0 +1,80 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import insert
+
+from src.common import guards
+from src.common.database.database import SessionLocal
+from src.main import app
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Bet, BetDirection, BetResult, Market, MarketStatus
+from src.modules.users.models import User
+
+async def seed():
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    bets = [
+        {"user_id": 1 + (i % 5 == 0), "market_id": 1 + i % 2, "amount": 10.0, "odds": 1.9,
+         "direction": BetDirection.UP, "result": rng.choice(list(BetResult)),
+         # Several bets per timestamp: the cursor must break ties on id
+         "created_at": now - timedelta(seconds=i // 3)}
+        for i in range(120)
+    ]
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": u, "email": f"u{u}@test", "hashed_password": "x"} for u in (1, 2)])
+        await db.execute(insert(Asset), [
+            {"id": 1, "asset_id": "A1", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1", "symbol": "S1",
+             "name": "S1", "symbol_source": "test", "price_type": "Spot", "settlement_source": "test"}
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.execute(insert(MacroEventHistory), [{"id": e, "type_id": 1, "publish_time": now} for e in (1, 2)])
+        await db.execute(insert(Market), [
+            {"id": e, "asset_id": 1, "event_id": e, "status": MarketStatus.OPEN, "close_time": now, "settle_time": now}
+            for e in (1, 2)
+        ])
+        await db.execute(insert(Bet), bets)
+        await db.commit()
+    return [b for b in bets if b["user_id"] == 1]
+
+async def get(path, **params):
+    app.dependency_overrides[guards.get_current_user] = lambda: User(id=1, email="u1@test")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(f"/api/v1/bets{path}", params=params)
+            assert response.status_code == 200, response.text
+            return response.json()
+    finally:
+        app.dependency_overrides.pop(guards.get_current_user, None)
+
+def test_history_pages_through_every_bet_once(db_schema):
+    async def scenario():
+        mine = await seed()
+        pages, cursor = [], None
+        while True:
+            page = await get("/history", limit=30, **({"cursor": cursor} if cursor else {}))
+            pages.append(page)
+            cursor = page["nextCursor"]
+            if not cursor:
+                return mine, pages
+
+    mine, pages = asyncio.run(scenario())
+    ids = [item["id"] for page in pages for item in page["items"]]
+    assert len(ids) == len(set(ids)) == len(mine)
+    # The summary scans every matching bet: only computed on request
+    assert all(page["summary"] is None for page in pages)
+
+def test_summary_is_opt_in(db_schema):
+    async def scenario():
+        mine = await seed()
+        return mine, await get("/history", limit=5, includeSummary=True)
+
+    mine, page = asyncio.run(scenario())
+    pnl = sum(10 * 1.9 - 10 if b["result"] == BetResult.WON else -10 if b["result"] == BetResult.LOST else 0 for b in mine)
+    summary = page["summary"]
+    assert summary["total"] == len(mine)
+    assert summary["won"] == sum(b["result"] == BetResult.WON for b in mine)
+    assert summary["staked"] == 10.0 * len(mine)
+    assert round(summary["pnl"], 6) == round(pnl, 6)
+    assert len(page["items"]) == 5
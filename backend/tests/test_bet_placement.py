@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import httpx
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql
+
+from src.common import guards
+from src.common.database.database import SessionLocal
+from src.main import app
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.bets.schemas import BetCreate
+from src.modules.bets.service import _place_single_statement
+from src.modules.markets.models import Bet, Market, MarketStatus
+from src.modules.users.models import User
+from src.modules.wallet.models import Wallet, WalletLedger
+
+async def seed():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": 1, "email": "u1@test", "hashed_password": "x"}])
+        await db.execute(insert(Wallet), [{"user_id": 1, "balance": Decimal("100")}])
+        await db.execute(insert(Asset), [
+            {"id": 1, "asset_id": "A1", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1", "symbol": "S1",
+             "name": "S1", "symbol_source": "test", "price_type": "Spot", "settlement_source": "test"}
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": e, "type_id": 1, "publish_time": now + timedelta(hours=2)} for e in (1, 2)
+        ])
+        await db.execute(insert(Market), [
+            {"id": 1, "asset_id": 1, "event_id": 1, "status": MarketStatus.OPEN,
+             "close_time": now + timedelta(hours=1), "settle_time": now + timedelta(hours=3)},
+            {"id": 2, "asset_id": 1, "event_id": 2, "status": MarketStatus.CLOSED,
+             "close_time": now - timedelta(hours=1), "settle_time": now + timedelta(hours=3)},
+        ])
+        await db.commit()
+
+async def post_bet(body, key=None):
+    app.dependency_overrides[guards.get_current_user] = lambda: User(id=1, email="u1@test")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/v1/bets/", json=body, headers={"Idempotency-Key": key} if key else {})
+    finally:
+        app.dependency_overrides.pop(guards.get_current_user, None)
+
+async def wallet_state():
+    async with SessionLocal() as db:
+        balance = (await db.execute(select(Wallet.balance).where(Wallet.user_id == 1))).scalar()
+        bets = (await db.execute(select(func.count()).select_from(Bet))).scalar()
+        ledger = (await db.execute(select(WalletLedger.amount, WalletLedger.reference_id))).all()
+    return balance, bets, ledger
+
+def bet(market_id, amount):
+    return {"marketId": str(market_id), "direction": "UP", "amount": amount}
+
+def test_places_one_bet_with_one_debit(db_schema):
+    async def scenario():
+        await seed()
+        response = await post_bet(bet(1, 40))
+        return response, await wallet_state()
+
+    response, (balance, bets, ledger) = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert (balance, bets) == (Decimal("60"), 1)
+    assert ledger == [(Decimal("-40"), response.json()["id"])]
+
+def test_idempotent_replay_returns_the_first_bet(db_schema):
+    async def scenario():
+        await seed()
+        first = await post_bet(bet(1, 40), key="k1")
+        replay = await post_bet(bet(1, 40), key="k1")
+        conflict = await post_bet(bet(1, 50), key="k1")
+        return first, replay, conflict, await wallet_state()
+
+    first, replay, conflict, (balance, bets, ledger) = asyncio.run(scenario())
+    assert first.status_code == replay.status_code == 200
+    assert replay.json()["id"] == first.json()["id"]
+    assert conflict.status_code == 409
+    assert (balance, bets, len(ledger)) == (Decimal("60"), 1, 1)
+
+def test_rejections_write_nothing(db_schema):
+    async def scenario():
+        await seed()
+        closed = await post_bet(bet(2, 10))
+        missing = await post_bet(bet(99, 10))
+        broke = await post_bet(bet(1, 101))
+        return closed, missing, broke, await wallet_state()
+
+    closed, missing, broke, state = asyncio.run(scenario())
+    assert (closed.status_code, closed.json()["detail"]) == (400, "Market is not open for betting")
+    assert missing.status_code == 404
+    assert (broke.status_code, broke.json()["detail"]) == (400, "Insufficient balance")
+    assert state == (Decimal("100"), 0, [])
+
+def test_single_statement_compiles_for_postgresql():
+    class CompilingSession:
+        async def execute(self, statement):
+            self.sql = str(statement.compile(dialect=postgresql.dialect()))
+            return self
+
+        def scalar(self):
+            return None
+
+    db = CompilingSession()
+    bet_in = BetCreate(**bet(1, 40))
+    asyncio.run(_place_single_statement(db, 1, 1, bet_in, Decimal("40"), "k1", datetime.utcnow()))
+    sql = " ".join(db.sql.split())
+    assert sql.startswith("WITH debit AS (UPDATE wallets SET balance=")
+    assert "new_bet AS (INSERT INTO bets" in sql and "ledger AS (INSERT INTO wallet_ledger" in sql
+    assert sql.count("RETURNING") == 3
+    assert sql.endswith("SELECT new_bet.id FROM new_bet")
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from src.common.cache.redis_client import set_redis
+from src.config.config import settings
+from src.utils import data_fetcher
+from src.utils.data_fetcher import DataFetcher
+
+class Upstream:
+    """Fake price source: counts calls, takes a moment, fails for symbols in `failing`."""
+    def __init__(self, failing=()):
+        self.calls = Counter()
+        self.failing = set(failing)
+
+    async def fetch(self, symbol, asset_class=None):
+        self.calls[symbol] += 1
+        await asyncio.sleep(0.01)
+        if symbol in self.failing:
+            raise RuntimeError(f"{symbol} unavailable")
+        return float(len(symbol))
+
+@pytest.fixture
+def upstream(monkeypatch):
+    source = Upstream()
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(DataFetcher, "fetch_live_price", staticmethod(source.fetch))
+    # Only the cache's clock: the event loop keeps the real one
+    monkeypatch.setattr(data_fetcher, "time", SimpleNamespace(monotonic=lambda: clock.now, time=time.time))
+    monkeypatch.setattr(settings, "PRICE_CACHE_TTL_SECONDS", 5.0)
+    monkeypatch.setattr(DataFetcher, "stats", dict.fromkeys(DataFetcher.stats, 0))
+    DataFetcher.clear_cache()
+    DataFetcher._inflight.clear()
+    source.clock = clock
+    yield source
+    DataFetcher.clear_cache()
+
+def no_shared_store():
+    # Every cache miss goes upstream
+    server = fakeredis.FakeServer()
+    server.connected = False
+    set_redis(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+
+def test_markets_over_few_symbols_fetch_each_symbol_once(upstream):
+    symbols = [f"SYM{i % 4}" for i in range(500)]
+
+    async def scenario():
+        no_shared_store()
+        # Concurrent per-market lookups as well as one batched call
+        single = await asyncio.gather(*[DataFetcher.fetch_current_price(s) for s in symbols])
+        DataFetcher.clear_cache()
+        batched = await DataFetcher.fetch_prices(symbols)
+        return single, batched
+
+    single, batched = asyncio.run(scenario())
+    assert single == [4.0] * 500
+    assert batched == {f"SYM{i}": 4.0 for i in range(4)}
+    assert upstream.calls == {f"SYM{i}": 2 for i in range(4)}
+    assert DataFetcher.stats["coalesced"] == 496
+
+def test_cached_price_is_served_until_the_ttl_expires(upstream):
+    async def scenario():
+        no_shared_store()
+        await DataFetcher.fetch_current_price("BTC")
+        upstream.clock.now += 4.9
+        await DataFetcher.fetch_current_price("BTC")
+        hit = upstream.calls["BTC"]
+        upstream.clock.now += 0.2
+        await DataFetcher.fetch_current_price("BTC")
+        return hit, upstream.calls["BTC"]
+
+    hit, expired = asyncio.run(scenario())
+    assert (hit, expired) == (1, 2)
+    assert DataFetcher.stats["hits"] == 1
+
+def test_failed_fetch_does_not_poison_waiters(upstream):
+    upstream.failing.add("BAD")
+
+    async def scenario():
+        no_shared_store()
+        failed = await asyncio.gather(
+            *[DataFetcher.fetch_current_price(s) for s in ["BAD"] * 10 + ["OK"] * 10], return_exceptions=True
+        )
+        inflight = dict(DataFetcher._inflight)
+        # The source recovers: the next caller goes upstream instead of reusing the failure
+        upstream.failing.clear()
+        return failed, inflight, await DataFetcher.fetch_prices(["BAD", "OK"])
+
+    failed, inflight, recovered = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in failed[:10])
+    assert failed[10:] == [2.0] * 10
+    assert inflight == {}
+    assert recovered == {"BAD": 3.0, "OK": 2.0}
+    assert upstream.calls == {"BAD": 2, "OK": 1}
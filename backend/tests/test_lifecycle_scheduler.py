@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from src.common.database.database import SessionLocal
+from src.config.config import settings
+from src.jobs import lifecycle_scheduler
+from src.jobs.lifecycle_scheduler import CLOSE, SETTLE, T0, Deadline, LifecycleScheduler
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Market, MarketStatus
+
+START = datetime(2026, 1, 1, 12, 0)
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+class Manager:
+    """Records the transitions instead of running them; `failures` counts down per kind."""
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = dict(failures or {})
+
+    def _record(self, kind, event_ids):
+        self.calls.append((kind, event_ids[0]))
+        if self.failures.get(kind):
+            self.failures[kind] -= 1
+            raise RuntimeError(f"{kind} failed")
+
+    async def close_expired_markets(self, db, event_ids):
+        self._record(CLOSE, event_ids)
+
+    async def capture_t0_prices(self, db, price_fetcher, event_ids):
+        self._record(T0, event_ids)
+        return 0
+
+    async def trigger_eligible_settlements(self, db, price_fetcher, dispatch_settlement_task, event_ids):
+        self._record(SETTLE, event_ids)
+        return 0
+
+async def add_event(event_id, publish_in, actual_value=None):
+    """One OPEN market without a base price for an event published `publish_in` after START."""
+    publish_time = START + publish_in
+    async with SessionLocal() as db:
+        await db.execute(insert(MacroEventHistory), [
+            {"id": event_id, "type_id": 1, "actual_value": actual_value, "publish_time": publish_time}
+        ])
+        await db.execute(insert(Market), [
+            {"id": event_id, "asset_id": 1, "event_id": event_id, "status": MarketStatus.OPEN,
+             "close_time": publish_time - timedelta(hours=1), "settle_time": publish_time + timedelta(minutes=30)}
+        ])
+        await db.commit()
+
+async def seed():
+    async with SessionLocal() as db:
+        await db.execute(insert(Asset), [
+            {"id": 1, "asset_id": "A1", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1", "symbol": "S1",
+             "name": "S1", "symbol_source": "test", "price_type": "Spot", "settlement_source": "test"}
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.commit()
+
+async def advance(scheduler, clock, to):
+    clock.now = to
+    scheduler._fire_due(clock.now)
+    await asyncio.gather(*scheduler._running)
+
+def new_scheduler(monkeypatch, manager):
+    monkeypatch.setattr(lifecycle_scheduler, "MarketManager", manager)
+    clock = Clock()
+    return LifecycleScheduler(price_fetcher=None, dispatch_settlement_task=None, clock=clock), clock
+
+def test_deadlines_fire_in_order_and_not_early(db_schema, monkeypatch):
+    manager = Manager()
+    scheduler, clock = new_scheduler(monkeypatch, manager)
+
+    async def scenario():
+        await seed()
+        # Event 1 is already out (settle deadline), event 2 is published later
+        await add_event(1, timedelta(hours=2), actual_value=3.5)
+        await add_event(2, timedelta(hours=1, minutes=30))
+        await scheduler.refresh()
+        steps = []
+        for minutes in (29, 30, 60, 90, 120, 150, 180):
+            await advance(scheduler, clock, START + timedelta(minutes=minutes))
+            steps.append(list(manager.calls))
+        return steps
+
+    steps = asyncio.run(scenario())
+    assert steps == [
+        [],
+        [(CLOSE, 2)],
+        [(CLOSE, 2), (CLOSE, 1)],
+        [(CLOSE, 2), (CLOSE, 1), (T0, 2)],
+        [(CLOSE, 2), (CLOSE, 1), (T0, 2), (T0, 1)],
+        [(CLOSE, 2), (CLOSE, 1), (T0, 2), (T0, 1), (SETTLE, 1)],
+        [(CLOSE, 2), (CLOSE, 1), (T0, 2), (T0, 1), (SETTLE, 1)],
+    ]
+    # Every transition started exactly at its deadline
+    assert all(kind["skew_ms"]["max"] == 0.0 for kind in scheduler.stats.to_dict().values())
+
+def test_reload_picks_up_new_events_without_refiring(db_schema, monkeypatch):
+    manager = Manager()
+    scheduler, clock = new_scheduler(monkeypatch, manager)
+
+    async def scenario():
+        await seed()
+        await add_event(1, timedelta(hours=1))
+        await scheduler.refresh()
+        await advance(scheduler, clock, START)
+        # Generated after the last load
+        await add_event(2, timedelta(hours=1, minutes=10))
+        await advance(scheduler, clock, START + timedelta(minutes=10))
+        before_reload = list(manager.calls)
+        await scheduler.refresh()
+        await advance(scheduler, clock, START + timedelta(minutes=10))
+        return before_reload, manager.calls, sorted(d for _, d in scheduler.heap)
+
+    before_reload, calls, pending = asyncio.run(scenario())
+    assert before_reload == [(CLOSE, 1)]
+    # The market is still OPEN in the DB (the manager is a fake), yet CLOSE 1 is not fired again
+    assert calls == [(CLOSE, 1), (CLOSE, 2)]
+    assert pending == [
+        Deadline(START + timedelta(hours=1), T0, 1),
+        Deadline(START + timedelta(hours=1, minutes=10), T0, 2),
+    ]
+
+def test_failed_transition_is_retried_with_backoff(db_schema, monkeypatch):
+    monkeypatch.setattr(settings, "LIFECYCLE_RETRY_SECONDS", 2.0)
+    manager = Manager(failures={CLOSE: 2})
+    scheduler, clock = new_scheduler(monkeypatch, manager)
+    close = Deadline(START, CLOSE, 1)
+
+    async def scenario():
+        await seed()
+        await add_event(1, timedelta(hours=1))
+        await scheduler.refresh()
+        await advance(scheduler, clock, START)
+        first = scheduler.retries[close]
+        # Not due before the backoff elapses
+        await advance(scheduler, clock, START + timedelta(seconds=1.9))
+        await advance(scheduler, clock, START + timedelta(seconds=2))
+        second = scheduler.retries[close]
+        await advance(scheduler, clock, START + timedelta(seconds=5.9))
+        waited = len(manager.calls)
+        await advance(scheduler, clock, START + timedelta(seconds=6))
+        return first, second, waited, manager.calls, dict(scheduler.retries)
+
+    first, second, waited, calls, retries = asyncio.run(scenario())
+    assert first == (1, START + timedelta(seconds=2))
+    # Doubled after the second failure
+    assert second == (2, START + timedelta(seconds=6))
+    assert waited == 2
+    assert calls == [(CLOSE, 1)] * 3
+    assert retries == {}
+    stats = scheduler.stats.to_dict()[CLOSE]
+    # Skew is only measured on the first attempt
+    assert (stats["fired"], stats["failed"]) == (1, 2)
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from src.common.database.database import SessionLocal
+from src.config.config import settings
+from src.jobs.market_generator import generate_markets
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Market, MarketGenerationState
+
+async def add_events(*event_ids):
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(MacroEventHistory), [
+            {"id": e, "type_id": 1, "publish_time": now + timedelta(hours=e)} for e in event_ids
+        ])
+        await db.commit()
+
+async def seed(assets=2):
+    async with SessionLocal() as db:
+        await db.execute(insert(Asset), [
+            {"id": a, "asset_id": f"A{a}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{a}", "name": f"S{a}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for a in range(1, assets + 1)
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.commit()
+
+async def markets_per_event():
+    async with SessionLocal() as db:
+        result = await db.execute(select(Market.event_id, func.count()).group_by(Market.event_id))
+        return dict(result.all())
+
+async def state():
+    async with SessionLocal() as db:
+        return (await db.execute(select(MarketGenerationState))).scalar_one()
+
+def test_ids_committed_out_of_order_are_still_picked_up(db_schema):
+    async def scenario():
+        await seed()
+        await add_events(1, 2, 5)
+        first = await generate_markets()
+        # Id 3 was allocated before 5 but commits after the first run read the maximum
+        await add_events(3)
+        late = await generate_markets()
+        return first, late, await markets_per_event(), await state()
+
+    first, late, per_event, watermark = asyncio.run(scenario())
+    assert (first, late) == (6, 2)
+    assert per_event == {1: 2, 2: 2, 3: 2, 5: 2}
+    # Still waiting out the lag: nothing below id 5 is trusted yet
+    assert (watermark.last_event_id, watermark.pending_event_id) == (0, 5)
+
+def test_watermarks_advance_after_the_lag(db_schema, monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_WATERMARK_LAG_SECONDS", 0)
+
+    async def scenario():
+        await seed()
+        await add_events(1, 2)
+        await generate_markets()
+        await add_events(3)
+        created = await generate_markets()
+        return created, await state()
+
+    created, watermark = asyncio.run(scenario())
+    assert created == 2
+    assert (watermark.last_event_id, watermark.pending_event_id) == (2, 3)
+    assert (watermark.last_asset_id, watermark.pending_asset_id) == (2, 2)
+
+def test_existing_state_row_is_reused(db_schema):
+    async def scenario():
+        await seed()
+        async with SessionLocal() as db:
+            # Another replica created the row first
+            db.add(MarketGenerationState(id=1, last_event_id=0, last_asset_id=0))
+            await db.commit()
+        await add_events(1)
+        return await generate_markets(), await state()
+
+    created, watermark = asyncio.run(scenario())
+    assert created == 2
+    assert watermark.pending_event_id == 1
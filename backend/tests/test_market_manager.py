@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from src.common.cache.reference_data import reference_data
+from src.common.database.database import SessionLocal
+from src.config.config import settings
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType, PriceSnapshot
+from src.modules.markets import manager
+from src.modules.markets.manager import MarketManager
+from src.modules.markets.models import Market, MarketStatus
+
+# market id -> (asset id, event id); asset 99 does not exist (deleted after the market was created)
+MARKETS = {1: (1, 1), 2: (1, 2), 3: (2, 1), 4: (99, 1)}
+
+class Fetcher:
+    def __init__(self, prices):
+        self.prices = prices
+        self.requested = []
+
+    async def fetch_prices(self, symbols, asset_classes=None):
+        self.requested.append(sorted(set(symbols)))
+        return {s: self.prices[s] for s in symbols if s in self.prices}
+
+class SettlementTask:
+    @staticmethod
+    def s(market_id, price):
+        return (market_id, price)
+
+class Dispatched(list):
+    def group(self, tasks):
+        self.extend(tasks)
+        return self
+
+    def apply_async(self):
+        pass
+
+async def seed():
+    reference_data.invalidate()
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(Asset), [
+            {"id": a, "asset_id": f"A{a}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{a}", "name": f"S{a}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for a in (1, 2)
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": e, "type_id": 1, "actual_value": 3.5, "publish_time": now - timedelta(minutes=45)} for e in (1, 2)
+        ])
+        await db.execute(insert(Market), [
+            {"id": m_id, "asset_id": asset_id, "event_id": event_id, "status": MarketStatus.CLOSED, "base_price": 100.0,
+             "close_time": now - timedelta(hours=2), "settle_time": now - timedelta(minutes=15)}
+            for m_id, (asset_id, event_id) in MARKETS.items()
+        ])
+        await db.commit()
+
+async def trigger(fetcher):
+    async with SessionLocal() as db:
+        return await MarketManager.trigger_eligible_settlements(db, fetcher, SettlementTask)
+
+async def markets():
+    async with SessionLocal() as db:
+        result = await db.execute(select(Market.id, Market.status, Market.settlement_price, Market.dispatched_at))
+        return {m_id: (status, price, dispatched_at is not None) for m_id, status, price, dispatched_at in result.all()}
+
+def test_claims_dispatch_once_and_release_unpriced(db_schema, monkeypatch):
+    dispatched = Dispatched()
+    monkeypatch.setattr(manager, "group", dispatched.group)
+    # No price for S2
+    fetcher = Fetcher({"S1": 101.0})
+
+    async def scenario():
+        await seed()
+        released = await trigger(fetcher)
+        first = list(dispatched)
+        # Markets 1 and 2 are still leased; the released ones are claimed again
+        again = await trigger(fetcher)
+        async with SessionLocal() as db:
+            snapshots = (await db.execute(select(PriceSnapshot.asset_id, PriceSnapshot.price))).all()
+        return released, first, again, list(dispatched), await markets(), snapshots
+
+    released, first, again, everything, state, snapshots = asyncio.run(scenario())
+    assert sorted(first) == sorted(everything) == [(1, 101.0), (2, 101.0)]
+    # Market 3 had no price, market 4 no asset: both go back to CLOSED
+    assert released == 2
+    assert again == 2
+    assert fetcher.requested == [["S1", "S2"], ["S2"]]
+    assert state == {
+        1: (MarketStatus.SETTLING, 101.0, True),
+        2: (MarketStatus.SETTLING, 101.0, True),
+        3: (MarketStatus.CLOSED, None, False),
+        4: (MarketStatus.CLOSED, None, False),
+    }
+    assert snapshots == [(1, 101.0)]
+
+def test_expired_lease_is_reclaimed_with_the_stored_price(db_schema, monkeypatch):
+    dispatched = Dispatched()
+    monkeypatch.setattr(manager, "group", dispatched.group)
+    fetcher = Fetcher({"S1": 101.0, "S2": 55.0})
+
+    async def scenario():
+        await seed()
+        await trigger(fetcher)
+        first = list(dispatched)
+        # The task never settled the markets and the lease ran out
+        monkeypatch.setattr(settings, "SETTLEMENT_LEASE_SECONDS", 0)
+        fetcher.prices = {"S1": 200.0, "S2": 200.0}
+        await trigger(fetcher)
+        return first, dispatched[len(first):]
+
+    first, redispatched = asyncio.run(scenario())
+    assert sorted(first) == [(1, 101.0), (2, 101.0), (3, 55.0)]
+    # Same T30 price as the first dispatch, without fetching again
+    assert sorted(redispatched) == sorted(first)
+    assert fetcher.requested[1:] == [[]]
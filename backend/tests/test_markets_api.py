@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+import httpx
+from sqlalchemy import insert, update
+
+from src.common.cache.redis_client import set_redis
+from src.common.database.database import SessionLocal
+from src.main import app
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Market, MarketStatus
+
+async def seed():
+    set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(Asset), [
+            {"id": a, "asset_id": f"A{a}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{a}", "name": f"S{a}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for a in (1, 2, 3)
+        ])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI"}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": e, "type_id": 1, "publish_time": now + timedelta(hours=2)} for e in range(1, 11)
+        ])
+        # Three markets per close time: pages must break ties on id
+        await db.execute(insert(Market), [
+            {"asset_id": a, "event_id": e, "status": MarketStatus.OPEN,
+             "close_time": now + timedelta(hours=e // 2), "settle_time": now + timedelta(hours=3)}
+            for e in range(1, 11) for a in (1, 2, 3)
+        ])
+        await db.commit()
+
+async def get(**params):
+    headers = params.pop("headers", {})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/api/v1/markets/", params=params, headers=headers)
+
+def test_pages_follow_the_cursor_without_gaps(db_schema):
+    async def scenario():
+        await seed()
+        pages, cursor = [], None
+        while True:
+            response = await get(limit=7, **({"cursor": cursor} if cursor else {}))
+            assert response.status_code == 200, response.text
+            pages.append(response.json())
+            cursor = pages[-1]["nextCursor"]
+            if not cursor:
+                return pages, (await get(limit=200)).json()
+
+    pages, everything = asyncio.run(scenario())
+    assert [len(page["items"]) for page in pages] == [7, 7, 7, 7, 2]
+    assert [item["id"] for page in pages for item in page["items"]] == [item["id"] for item in everything["items"]]
+    assert len(everything["items"]) == 30
+
+def test_bad_cursor_is_rejected(db_schema):
+    async def scenario():
+        await seed()
+        return [await get(cursor=cursor) for cursor in ("not-a-cursor", "WzFd", "WyJ4IiwgMV0")]
+
+    responses = asyncio.run(scenario())
+    # Garbage, one value instead of two, and a close time that is not a datetime
+    assert [(r.status_code, r.json()["detail"]) for r in responses] == [(400, "Invalid cursor")] * 3
+
+def test_etag_answers_304_until_a_market_changes(db_schema):
+    async def scenario():
+        await seed()
+        first = await get(limit=5)
+        etag = first.headers["ETag"]
+        unchanged = await get(limit=5, headers={"If-None-Match": etag})
+        other_page = await get(limit=6, headers={"If-None-Match": etag})
+        async with SessionLocal() as db:
+            await db.execute(update(Market).where(Market.id == 1).values(status=MarketStatus.CLOSED))
+            await db.commit()
+        changed = await get(limit=5, headers={"If-None-Match": etag})
+        return first, unchanged, other_page, changed
+
+    first, unchanged, other_page, changed = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert (unchanged.status_code, unchanged.headers["ETag"]) == (304, first.headers["ETag"])
+    # The ETag covers the query, not just the table version
+    assert other_page.status_code == 200
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.json()["items"][0]["status"] == "CLOSED"
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import fakeredis.aioredis
+from sqlalchemy import func, insert, select
+
+from src.common.cache.price_store import PriceStore
+from src.common.cache.redis_client import set_redis
+from src.common.database.database import SessionLocal
+from src.config.config import settings
+from src.jobs.price_ingestion import PriceIngestor, Tick, run_ingestion
+from src.modules.assets.models import Asset, AssetCategory, PriceSnapshot
+
+ASSETS = {1: "BTC", 2: "ETH"}
+
+async def seed_assets():
+    set_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    async with SessionLocal() as db:
+        await db.execute(insert(Asset), [
+            {"id": asset_id, "asset_id": symbol, "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": symbol, "name": symbol, "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for asset_id, symbol in ASSETS.items()
+        ])
+        await db.commit()
+
+async def snapshot_counts():
+    async with SessionLocal() as db:
+        result = await db.execute(select(PriceSnapshot.asset_id, func.count()).group_by(PriceSnapshot.asset_id))
+        return dict(result.all())
+
+def test_ticks_are_flushed_in_batches(db_schema):
+    async def scenario():
+        await seed_assets()
+        ingestor = PriceIngestor(queue_size=100, batch_size=10, flush_interval=0.05, writers=1, symbols=ASSETS)
+        start = datetime.utcnow()
+        for i in range(25):
+            await ingestor.put(Tick(1 + i % 2, 100.0 + i, start + timedelta(milliseconds=i)))
+        ingestor.start()
+        await ingestor.stop()
+        return ingestor.stats, await snapshot_counts(), await PriceStore.get_many(ASSETS.values())
+
+    stats, counts, latest = asyncio.run(scenario())
+    # 25 queued ticks: two full batches and the remainder
+    assert (stats.written, stats.flushes, stats.failed_rows) == (25, 3, 0)
+    assert counts == {1: 13, 2: 12}
+    # The last tick of each asset is published to the shared store
+    assert latest["BTC"][0] == 124.0
+    assert latest["ETH"][0] == 123.0
+
+def test_full_queue_applies_backpressure(db_schema):
+    async def scenario():
+        await seed_assets()
+        ingestor = PriceIngestor(queue_size=5, batch_size=5, flush_interval=0.01, writers=1, symbols=ASSETS)
+        ingestor.start()
+        now = datetime.utcnow()
+        for i in range(50):
+            await ingestor.put(Tick(1, 100.0, now))
+        await ingestor.stop()
+        return ingestor.stats
+
+    stats = asyncio.run(scenario())
+    # The producer waited on the writer instead of growing the queue
+    assert stats.backpressure_waits > 0
+    assert stats.max_queue_depth <= 5
+    assert stats.written == stats.received == 50
+
+def run_fake_source(rate, duration):
+    async def scenario():
+        await seed_assets()
+        stats = await run_ingestion(fake=True, rate=rate, duration=duration, report_every=60.0)
+        return stats, await snapshot_counts()
+
+    return asyncio.run(scenario())
+
+def test_fake_source_sustains_target_rate(db_schema):
+    stats, counts = run_fake_source(rate=10000.0, duration=0.5)
+    assert stats["received"] >= 4000
+    assert (stats["backpressure_waits"], stats["failed_rows"]) == (0, 0)
+    assert stats["written"] == stats["received"] == sum(counts.values())
+    assert 0 < stats["lag_ms"]["p50"] <= stats["lag_ms"]["p99"] <= stats["lag_ms"]["max"]
+
+def test_fake_source_is_throttled_by_a_full_queue(db_schema, monkeypatch):
+    # Each 10ms step of the source produces ~100 ticks, twice the queue
+    monkeypatch.setattr(settings, "PRICE_INGEST_QUEUE_SIZE", 50)
+    monkeypatch.setattr(settings, "PRICE_INGEST_BATCH_SIZE", 25)
+    monkeypatch.setattr(settings, "PRICE_INGEST_WRITERS", 1)
+
+    stats, counts = run_fake_source(rate=10000.0, duration=0.5)
+    assert stats["backpressure_waits"] > 0
+    assert stats["max_queue_depth"] <= 50
+    # The producer slowed down, nothing was dropped
+    assert stats["failed_rows"] == 0
+    assert stats["written"] == stats["received"] == sum(counts.values())
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from src.common.database.database import SessionLocal
+from src.modules.assets.models import Asset, AssetCategory, PriceSnapshot, SnapshotType
+from src.modules.assets.price_lookup import PriceLookup
+
+def test_as_of_multi_picks_latest_snapshot_at_or_before(db_schema):
+    t0 = datetime(2026, 1, 1, 12, 0)
+
+    async def scenario():
+        async with SessionLocal() as db:
+            await db.execute(insert(Asset), [
+                {"id": asset_id, "asset_id": f"A{asset_id}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+                 "symbol": f"S{asset_id}", "name": f"S{asset_id}", "symbol_source": "test", "price_type": "Spot",
+                 "settlement_source": "test"}
+                for asset_id in (1, 2, 3)
+            ])
+            await db.execute(insert(PriceSnapshot), [
+                {"asset_id": asset_id, "timestamp": t0 + timedelta(minutes=minutes), "price": price, "snapshot_type": SnapshotType.TICK}
+                for asset_id, minutes, price in [
+                    (1, -5, 10.0), (1, 0, 11.0), (1, 20, 12.0), (1, 40, 13.0),
+                    (2, 10, 20.0),
+                ]
+            ])
+            await db.commit()
+            return await PriceLookup.as_of_multi(db, [1, 2, 3], [t0, t0 + timedelta(minutes=30)])
+
+    prices = asyncio.run(scenario())
+    assert prices == {
+        1: (11.0, 12.0),
+        # No snapshot yet at T0
+        2: (None, 20.0),
+        3: (None, None),
+    }
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from src.modules.assets.models import AssetCategory
+from src.utils.price_sources import FakeSource, PriceRouter, PriceSource, PriceSourceError, SourceConfig
+
+REGISTRY = {
+    AssetCategory.CRYPTO: [SourceConfig("primary", 1), SourceConfig("secondary", 2), SourceConfig("tertiary", 3)],
+}
+
+def make_router(*sources, hedge_delay=0.05, timeout=1.0) -> PriceRouter:
+    router = PriceRouter(registry=REGISTRY, hedge_delay=hedge_delay, timeout=timeout)
+    for source in sources:
+        router.register(source)
+    return router
+
+def test_primary_answers_alone_when_fast():
+    primary = FakeSource("primary", price=lambda symbol: 1.0)
+    secondary = FakeSource("secondary", price=lambda symbol: 2.0)
+    router = make_router(primary, secondary)
+
+    assert asyncio.run(router.fetch("BTC", AssetCategory.CRYPTO)) == 1.0
+    assert (primary.calls, secondary.calls) == (1, 0)
+
+def test_failure_fails_over_immediately():
+    primary = FakeSource("primary", fail_rate=1.0)
+    secondary = FakeSource("secondary", price=lambda symbol: 2.0)
+    # A long hedge delay: only the failure can bring in the second source
+    router = make_router(primary, secondary, hedge_delay=10.0)
+
+    assert asyncio.run(router.fetch("BTC", AssetCategory.CRYPTO)) == 2.0
+    assert router.health["primary"].error_rate > 0
+
+def test_slow_source_is_hedged_and_cancelled():
+    primary = FakeSource("primary", stall=True, price=lambda symbol: 1.0)
+    secondary = FakeSource("secondary", price=lambda symbol: 2.0)
+    router = make_router(primary, secondary, hedge_delay=0.02)
+
+    async def scenario():
+        price = await router.fetch("BTC", AssetCategory.CRYPTO)
+        # The stalled request was cancelled, nothing is left running
+        return price, [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    price, leftover = asyncio.run(scenario())
+    assert price == 2.0
+    assert leftover == []
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+def test_all_sources_failing_raises():
+    router = make_router(FakeSource("primary", fail_rate=1.0), FakeSource("secondary", fail_rate=1.0))
+
+    with pytest.raises(PriceSourceError, match="primary.*secondary"):
+        asyncio.run(router.fetch("BTC", AssetCategory.CRYPTO))
+
+def test_timeout_raises():
+    router = make_router(FakeSource("primary", stall=True), hedge_delay=0.01, timeout=0.05)
+
+    with pytest.raises(PriceSourceError, match="timed out"):
+        asyncio.run(router.fetch("BTC", AssetCategory.CRYPTO))
+
+def test_failing_source_is_routed_last_then_recovers(monkeypatch):
+    primary = FakeSource("primary", fail_rate=1.0)
+    secondary = FakeSource("secondary", price=lambda symbol: 2.0)
+    router = make_router(primary, secondary, hedge_delay=10.0)
+
+    async def fetch_many(n):
+        for _ in range(n):
+            await router.fetch("BTC", AssetCategory.CRYPTO)
+
+    # Enough failures to push the error EWMA over MAX_ERROR_RATE
+    asyncio.run(fetch_many(5))
+    assert [s.name for s in router.route(AssetCategory.CRYPTO)] == ["secondary", "primary"]
+
+    calls = primary.calls
+    asyncio.run(fetch_many(3))
+    # Open circuit: the healthy source answers without trying the failing one
+    assert primary.calls == calls
+
+    # Without new samples for RECOVERY_AFTER, priority order is restored
+    monkeypatch.setattr("src.utils.price_sources.RECOVERY_AFTER", 0.0)
+    assert [s.name for s in router.route(AssetCategory.CRYPTO)] == ["primary", "secondary"]
+
+def test_class_without_registered_sources_raises():
+    router = make_router(FakeSource("primary"))
+
+    with pytest.raises(PriceSourceError, match="No price source"):
+        asyncio.run(router.fetch("EURUSD", AssetCategory.FOREX))
+
+def test_source_without_fetch_cannot_be_registered():
+    class Incomplete(PriceSource):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        make_router(Incomplete())
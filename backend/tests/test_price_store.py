@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+import fakeredis
+import fakeredis.aioredis
+from sqlalchemy import insert, select
+
+from src.common.cache.price_store import PRICE_CHANNEL, PriceStore, PriceSubscriber
+from src.common.cache.redis_client import get_redis, redis_available, set_redis
+from src.common.database.database import SessionLocal
+from src.common.versioning import get_version
+from src.jobs.update_prices import update_prices
+from src.modules.assets.models import Asset, AssetCategory
+from src.utils.data_fetcher import DataFetcher
+
+def use_fake_redis(server=None):
+    set_redis(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+
+def test_publish_then_get_many():
+    async def scenario():
+        use_fake_redis()
+        now = time.time()
+        await PriceStore.publish({"BTC": (100.5, now), "ETH": (20.0, now - 60)})
+        return await PriceStore.get_many(["BTC", "ETH", "SOL"]), await PriceStore.get_many(["BTC", "ETH"], max_age=5)
+
+    everything, fresh = asyncio.run(scenario())
+    assert set(everything) == {"BTC", "ETH"}
+    assert everything["BTC"][0] == 100.5
+    assert set(fresh) == {"BTC"}
+
+def test_store_degrades_while_redis_is_down():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        server.connected = False
+        use_fake_redis(server)
+        await PriceStore.publish({"BTC": (1.0, time.time())})
+        return await PriceStore.get_many(["BTC"]), redis_available()
+
+    prices, available = asyncio.run(scenario())
+    assert prices == {}
+    assert not available
+
+def test_subscriber_reads_through_to_the_store():
+    async def scenario():
+        use_fake_redis()
+        await PriceStore.publish({"BTC": (100.0, time.time())})
+        subscriber = PriceSubscriber()
+        first = await subscriber.latest(["BTC", "ETH"])
+        # Served from memory afterwards
+        await get_redis().delete("price:BTC")
+        return first, await subscriber.latest(["BTC"])
+
+    first, second = asyncio.run(scenario())
+    assert first["BTC"][0] == 100.0 and "ETH" not in first
+    assert second["BTC"][0] == 100.0
+
+def test_subscriber_ignores_out_of_order_messages():
+    subscriber = PriceSubscriber()
+    subscriber._apply(json.dumps({"BTC": {"price": 2.0, "ts": 20.0}}))
+    subscriber._apply(json.dumps({"BTC": {"price": 1.0, "ts": 10.0}}))
+    assert subscriber.prices["BTC"] == (2.0, 20.0)
+
+def test_subscriber_follows_published_prices():
+    async def scenario():
+        use_fake_redis()
+        subscriber = PriceSubscriber()
+        subscriber.start()
+        try:
+            # Wait for the subscription before publishing
+            while not (await get_redis().pubsub_numsub(PRICE_CHANNEL))[0][1]:
+                await asyncio.sleep(0.01)
+            await PriceStore.publish({"BTC": (42.0, time.time())})
+            for _ in range(200):
+                if "BTC" in subscriber.prices:
+                    break
+                await asyncio.sleep(0.01)
+            return subscriber.prices.get("BTC")
+        finally:
+            await subscriber.stop()
+
+    assert asyncio.run(scenario())[0] == 42.0
+
+def test_write_behind_writes_changed_prices_only(db_schema, monkeypatch):
+    fetched = []
+
+    async def fake_fetch_prices(symbols, asset_classes=None):
+        fetched.extend(symbols)
+        return {symbol: 7.0 for symbol in symbols}
+
+    monkeypatch.setattr(DataFetcher, "fetch_prices", staticmethod(fake_fetch_prices))
+
+    async def scenario():
+        use_fake_redis()
+        async with SessionLocal() as db:
+            await db.execute(insert(Asset), [
+                {"id": i, "asset_id": f"A{i}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+                 "symbol": symbol, "name": symbol, "symbol_source": "test", "price_type": "Spot",
+                 "settlement_source": "test", "current_price": price}
+                for i, (symbol, price) in enumerate([("BTC", 1.0), ("ETH", 5.0), ("SOL", None)], start=1)
+            ])
+            await db.commit()
+        version = await get_version(Asset.__tablename__)
+        await PriceStore.publish({"BTC": (2.0, time.time()), "ETH": (5.0, time.time())})
+        await update_prices()
+        async with SessionLocal() as db:
+            prices = dict((await db.execute(select(Asset.symbol, Asset.current_price))).all())
+        return prices, version, await get_version(Asset.__tablename__)
+
+    prices, version_before, version_after = asyncio.run(scenario())
+    # Symbols missing from Redis are fetched upstream
+    assert fetched == ["SOL"]
+    assert prices == {"BTC": 2.0, "ETH": 5.0, "SOL": 7.0}
+    # Price-only writes do not invalidate the cached reference data
+    assert version_after == version_before
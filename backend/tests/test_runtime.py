@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from src.common.database.database import SessionLocal
+from src.jobs import runtime
+
+async def probe():
+    async with SessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+    return asyncio.get_running_loop()
+
+async def fail():
+    raise RuntimeError("task failed")
+
+def test_tasks_share_one_loop_until_shutdown(db_schema):
+    runtime.init_worker_process()
+    try:
+        loops = [runtime.run_async(probe(), name="probe") for _ in range(3)]
+        with pytest.raises(RuntimeError):
+            runtime.run_async(fail(), name="fail")
+        stats = runtime.runtime_stats()["tasks"]
+    finally:
+        runtime.shutdown_worker_process()
+
+    assert loops[0] is loops[1] is loops[2]
+    # Closed (and forgotten) on shutdown, after the pool was disposed on it
+    assert loops[0].is_closed() and runtime._loop is None
+    assert stats["probe"]["calls"] == 3 and stats["probe"]["failed"] == 0
+    # The pooled connection outlives each task: only the first one connects
+    assert stats["probe"]["new_connections"] == 1
+    assert stats["probe"]["checkouts_per_call"] == 1.0
+    assert (stats["fail"]["calls"], stats["fail"]["failed"]) == (1, 1)
+
+def test_init_starts_a_fresh_loop(db_schema):
+    runtime.init_worker_process()
+    first = runtime.get_loop()
+    runtime.shutdown_worker_process()
+    runtime.init_worker_process()
+    try:
+        assert runtime.get_loop() is not first and not runtime.get_loop().is_closed()
+        assert runtime.runtime_stats()["tasks"] == {}
+    finally:
+        runtime.shutdown_worker_process()
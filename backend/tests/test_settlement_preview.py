@@ -0,0 +1,78 @@
+import asyncio
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from src.common.database.database import SessionLocal
+from src.jobs.settlement_runner.preview import preview_settlement
+from src.jobs.settlement_runner.run_settlement import run_settlement_job
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Bet, BetDirection, BetResult, Market, MarketStatus
+from src.modules.users.models import User
+from src.modules.wallet.models import TransactionType, Wallet, WalletLedger
+
+USERS = range(1, 6)
+# market id -> (T0, T30); None prices cancel the market
+MARKETS = {1: (100.0, 101.0), 2: (100.0, 99.0), 3: (100.0, 100.0), 4: (None, None)}
+
+async def seed():
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": u, "email": f"u{u}@test", "hashed_password": "x"} for u in USERS])
+        await db.execute(insert(Wallet), [{"user_id": u, "balance": Decimal("1000")} for u in USERS])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI", "tolerance": 0.1}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": 1, "type_id": 1, "forecast_value": 3.0, "actual_value": 3.5, "publish_time": now - timedelta(minutes=45)}
+        ])
+        await db.execute(insert(Asset), [
+            {"id": m_id, "asset_id": f"A{m_id}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{m_id}", "name": f"S{m_id}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for m_id in MARKETS
+        ])
+        await db.execute(insert(Market), [
+            {"id": m_id, "asset_id": m_id, "event_id": 1, "status": MarketStatus.CLOSED,
+             "close_time": now - timedelta(hours=2), "settle_time": now - timedelta(minutes=15),
+             "base_price": t0, "settlement_price": t30}
+            for m_id, (t0, t30) in MARKETS.items()
+        ])
+        # Stakes and odds without an exact binary representation
+        await db.execute(insert(Bet), [
+            {"user_id": rng.choice(USERS), "market_id": rng.choice(list(MARKETS)),
+             "amount": rng.choice([0.1, 0.2, 0.3, 10.33, 7.77]), "odds": rng.choice([1.9, 1.7, 2.15]),
+             "direction": rng.choice([BetDirection.UP, BetDirection.DOWN]), "result": BetResult.PENDING}
+            for _ in range(300)
+        ])
+        await db.commit()
+
+async def ledger_totals():
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(WalletLedger.wallet_id, WalletLedger.type, WalletLedger.amount)
+            .where(WalletLedger.type.in_([TransactionType.PAYOUT, TransactionType.REFUND]))
+        )
+        totals = defaultdict(Decimal)
+        per_user = defaultdict(Decimal)
+        for user_id, kind, amount in result.all():
+            totals[kind] += amount
+            if kind == TransactionType.PAYOUT:
+                per_user[user_id] += amount
+        return totals, per_user
+
+def test_preview_matches_bulk_settlement(db_schema):
+    async def scenario():
+        await seed()
+        preview = await preview_settlement(top=len(USERS))
+        await run_settlement_job(bulk=True)
+        return preview, await ledger_totals()
+
+    preview, (totals, per_user) = asyncio.run(scenario())
+    assert preview["markets"] == len(MARKETS)
+    assert totals[TransactionType.PAYOUT] > 0 and totals[TransactionType.REFUND] > 0
+    assert Decimal(str(preview["payout_liability"])) == totals[TransactionType.PAYOUT]
+    assert Decimal(str(preview["refund_liability"])) == totals[TransactionType.REFUND]
+    assert {w["user_id"]: Decimal(str(w["payout"])) for w in preview["top_winners"]} == dict(per_user)
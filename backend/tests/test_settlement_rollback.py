@@ -0,0 +1,108 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+
+from src.common.database.database import SessionLocal
+from src.jobs.settlement_runner.rollback_settlement import rollback_and_resettle, rollback_markets
+from src.jobs.settlement_runner.run_settlement import run_settlement_job
+from src.modules.assets.models import (
+    Asset, AssetCategory, AssetEventStats, MacroEventHistory, MacroEventType, PriceSnapshot, SnapshotType
+)
+from src.modules.markets.models import Bet, BetDirection, BetResult, Market, MarketStatus, Settlement
+from src.modules.users.models import User
+from src.modules.wallet.models import TransactionType, Wallet, WalletLedger
+
+USERS = range(1, 6)
+# market (and asset) id -> T30 price, T0 is 100
+MARKETS = {1: 101.0, 2: 99.0, 3: 102.5}
+
+async def seed():
+    rng = random.Random(3)
+    publish_time = datetime.utcnow() - timedelta(minutes=45)
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": u, "email": f"u{u}@test", "hashed_password": "x"} for u in USERS])
+        await db.execute(insert(Wallet), [{"user_id": u, "balance": Decimal("1000")} for u in USERS])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI", "tolerance": 0.1}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": 1, "type_id": 1, "forecast_value": 3.0, "actual_value": 3.5, "publish_time": publish_time}
+        ])
+        await db.execute(insert(Asset), [
+            {"id": m_id, "asset_id": f"A{m_id}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{m_id}", "name": f"S{m_id}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for m_id in MARKETS
+        ])
+        # T30 comes from the snapshots, so a rolled back market can be settled again
+        await db.execute(insert(PriceSnapshot), [
+            {"asset_id": m_id, "timestamp": publish_time + timedelta(minutes=30), "price": t30,
+             "snapshot_type": SnapshotType.TICK}
+            for m_id, t30 in MARKETS.items()
+        ])
+        await db.execute(insert(Market), [
+            {"id": m_id, "asset_id": m_id, "event_id": 1, "status": MarketStatus.CLOSED, "base_price": 100.0,
+             "close_time": publish_time - timedelta(hours=1), "settle_time": publish_time + timedelta(minutes=30)}
+            for m_id in MARKETS
+        ])
+        await db.execute(insert(Bet), [
+            {"user_id": rng.choice(USERS), "market_id": rng.choice(list(MARKETS)), "amount": rng.choice([5.0, 10.0, 12.5]),
+             "odds": 1.9, "direction": rng.choice([BetDirection.UP, BetDirection.DOWN]), "result": BetResult.PENDING}
+            for _ in range(60)
+        ])
+        await db.commit()
+
+async def snapshot():
+    async with SessionLocal() as db:
+        balances = dict((await db.execute(select(Wallet.user_id, Wallet.balance))).all())
+        ledger = dict((await db.execute(
+            select(WalletLedger.type, func.count()).group_by(WalletLedger.type)
+        )).all())
+        stats = {
+            (s.asset_id, s.scenario): (s.occurrence_count, s.up_count, s.down_count, round(s.avg_move_30m, 9))
+            for s in (await db.execute(select(AssetEventStats))).scalars().all()
+        }
+        results = dict((await db.execute(select(Bet.result, func.count()).group_by(Bet.result))).all())
+        settlements = (await db.execute(select(func.count()).select_from(Settlement))).scalar()
+        return balances, ledger, stats, results, settlements
+
+def test_rollback_reverses_payouts_and_stats(db_schema):
+    async def scenario():
+        await seed()
+        await run_settlement_job(bulk=True)
+        settled = await snapshot()
+        rolled_back = await rollback_markets(event_id=1)
+        return settled, rolled_back, await snapshot()
+
+    (_, settled_ledger, settled_stats, _, _), rolled_back, after = asyncio.run(scenario())
+    balances, ledger, stats, results, settlements = after
+    assert rolled_back == list(MARKETS)
+    assert settled_ledger[TransactionType.PAYOUT] > 0
+    assert ledger[TransactionType.SETTLEMENT_REVERSAL] == settled_ledger[TransactionType.PAYOUT]
+    # Back to the balances right after the bets were placed (the seed skips the debits)
+    assert balances == {u: Decimal("1000") for u in USERS}
+    assert results == {BetResult.PENDING: 60} and settlements == 0
+    assert sum(count for count, _, _, _ in settled_stats.values()) == len(MARKETS)
+    assert all(values == (0, 0, 0, 0.0) for values in stats.values())
+
+def test_resettlement_after_rollback_counts_once(db_schema):
+    async def scenario():
+        await seed()
+        await run_settlement_job(bulk=True)
+        settled = await snapshot()
+        # One worker: SQLite ignores the pool's SKIP LOCKED claims
+        result = await rollback_and_resettle(event_id=1, workers=1, bulk=True)
+        # Settling again is a no-op
+        await run_settlement_job(bulk=True)
+        return settled, result, await snapshot()
+
+    settled, result, resettled = asyncio.run(scenario())
+    balances, ledger, stats, results, settlements = resettled
+    assert result["rolled_back"] == list(MARKETS)
+    assert balances == settled[0]
+    assert stats == settled[2]
+    assert results == settled[3] and settlements == len(MARKETS)
+    # The first payouts are reversed, the live ones are paid once
+    assert ledger[TransactionType.SETTLEMENT_REVERSAL] == settled[1][TransactionType.PAYOUT]
+    assert ledger[TransactionType.PAYOUT] == 2 * settled[1][TransactionType.PAYOUT]
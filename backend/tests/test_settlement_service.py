@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+
+from src.common.database.database import SessionLocal
+from src.modules.assets.models import Asset, AssetCategory, MacroEventHistory, MacroEventType
+from src.modules.markets.models import Bet, BetDirection, BetResult, Market, MarketStatus, Settlement
+from src.modules.settlement.service import SettlementService
+from src.modules.users.models import User
+from src.modules.wallet.models import TransactionType, Wallet, WalletLedger
+
+USERS = (1, 2, 3)
+
+async def seed():
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": u, "email": f"u{u}@test", "hashed_password": "x"} for u in USERS])
+        await db.execute(insert(Wallet), [{"user_id": u, "balance": Decimal("100")} for u in USERS])
+        await db.execute(insert(MacroEventType), [{"id": 1, "code": "CPI", "name": "CPI", "tolerance": 0.1}])
+        await db.execute(insert(MacroEventHistory), [
+            {"id": 1, "type_id": 1, "forecast_value": 3.0, "actual_value": 3.5, "publish_time": now - timedelta(minutes=45)}
+        ])
+        await db.execute(insert(Asset), [
+            {"id": a, "asset_id": f"A{a}", "asset_class": AssetCategory.CRYPTO, "asset_subclass": "L1",
+             "symbol": f"S{a}", "name": f"S{a}", "symbol_source": "test", "price_type": "Spot",
+             "settlement_source": "test"}
+            for a in (1, 2)
+        ])
+        # Claimed by the lifecycle dispatch, same event
+        await db.execute(insert(Market), [
+            {"id": m, "asset_id": m, "event_id": 1, "status": MarketStatus.SETTLING, "base_price": 100.0,
+             "close_time": now - timedelta(hours=2), "settle_time": now - timedelta(minutes=15)}
+            for m in (1, 2)
+        ])
+        # Every user wins in both markets, bets inserted in opposite user order per market
+        await db.execute(insert(Bet), [
+            {"user_id": u, "market_id": m, "amount": 10.0, "odds": 1.9, "result": BetResult.PENDING,
+             "direction": BetDirection.UP if m == 1 else BetDirection.DOWN}
+            for m, users in ((1, USERS), (2, USERS[::-1])) for u in users
+        ])
+        await db.commit()
+
+def test_concurrent_markets_with_shared_users_settle(db_schema):
+    async def scenario():
+        await seed()
+        settled = await asyncio.gather(
+            SettlementService.settle_market(1, 101.0),
+            SettlementService.settle_market(2, 99.0),
+        )
+        async with SessionLocal() as db:
+            balances = dict((await db.execute(select(Wallet.user_id, Wallet.balance))).all())
+            payouts = (await db.execute(
+                select(func.count()).select_from(WalletLedger).where(WalletLedger.type == TransactionType.PAYOUT)
+            )).scalar()
+            settlements = (await db.execute(select(Settlement.market_id, Settlement.is_complete))).all()
+            markets = (await db.execute(select(Market.status))).scalars().all()
+            pending = (await db.execute(
+                select(func.count()).select_from(Bet).where(Bet.result != BetResult.WON)
+            )).scalar()
+        # Replaying a dispatched task is a no-op
+        replay = await SettlementService.settle_market(1, 101.0)
+        return settled, balances, payouts, sorted(settlements), markets, pending, replay
+
+    settled, balances, payouts, settlements, markets, pending, replay = asyncio.run(scenario())
+    assert settled == [True, True] and replay
+    assert balances == {u: Decimal("138") for u in USERS}
+    assert payouts == 6 and pending == 0
+    assert settlements == [(1, True), (2, True)]
+    assert markets == [MarketStatus.SETTLED, MarketStatus.SETTLED]